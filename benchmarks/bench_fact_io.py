@@ -0,0 +1,57 @@
+"""Measures the throughput of writing and loading fact files.
+
+Usage: python benchmarks/bench_fact_io.py [--rows 10000000] [--symbols 100000]
+"""
+from symlog.souffle import Fact, Literal, String, Number, load_facts, write_facts
+
+from tempfile import TemporaryDirectory
+import argparse
+import random
+import time
+
+
+def make_facts(rows, symbols):
+    random.seed(0)
+    names = [String(f"v{i}") for i in range(symbols)]
+    return [
+        Fact(
+            Literal(
+                "points_to",
+                [random.choice(names), random.choice(names), Number(i % 1024)],
+                True,
+            ),
+            [],
+            False,
+        )
+        for i in range(rows)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--symbols", type=int, default=100_000)
+    args = parser.parse_args()
+
+    declarations = {"points_to": ["symbol", "symbol", "number"]}
+    facts = make_facts(args.rows, args.symbols)
+
+    with TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        write_facts(directory, facts)
+        write_time = time.perf_counter() - start
+
+        del facts
+
+        start = time.perf_counter()
+        loaded = load_facts(directory, declarations, ["points_to"])
+        load_time = time.perf_counter() - start
+
+    print(f"rows:  {args.rows}")
+    print(f"write: {args.rows / write_time:,.0f} rows/s ({write_time:.2f} s)")
+    print(f"load:  {args.rows / load_time:,.0f} rows/s ({load_time:.2f} s)")
+    print(f"distinct facts loaded: {len(loaded)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compares grouping meta-program outputs by assignment in Python and with numpy.
+
+Builds a synthetic output relation whose last columns are the values
+assigned to symbolic constants, and times `group_target_outputs` on it with
+and without the columnar path, for a growing number of interested facts.
+
+Usage: python benchmarks/bench_grouping.py [--rows 1000000] [--values 50]
+"""
+from symlog.souffle import Fact, Literal, String
+from symlog.grouping import group_target_outputs
+import symlog.grouping as grouping
+
+import argparse
+import random
+import sys
+import time
+
+ARG_NUM = 2
+BINDING_NUM = 2
+
+
+def make_outputs(rows, values):
+    random.seed(0)
+    constants = [String(f"c{i}") for i in range(values)]
+    constants.append(String("symlog_symbolic_1"))
+    outputs = []
+    for _ in range(rows):
+        args = [random.choice(constants) for _ in range(ARG_NUM + BINDING_NUM)]
+        outputs.append(Fact(Literal("t", args, True), [], False))
+    return outputs
+
+
+def make_interested(num):
+    return frozenset(
+        Fact(Literal("t", [String(f"c{i}"), String(f"c{i + 1}")], True), [], False)
+        for i in range(num)
+    )
+
+
+def measure(outputs, interested, columnar):
+    start = time.perf_counter()
+    groups = group_target_outputs(outputs, BINDING_NUM, interested, columnar)
+    return time.perf_counter() - start, sum(map(len, groups.values()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--values", type=int, default=50)
+    args = parser.parse_args()
+
+    if grouping.np is None:
+        sys.exit("numpy is not installed, see the columnar extra")
+
+    outputs = make_outputs(args.rows, args.values)
+    print(f"rows: {args.rows}, values: {args.values}")
+    for num in (1, 3, 10):
+        interested = make_interested(num)
+        rows_time, targets = measure(outputs, interested, False)
+        columns_time, columnar_targets = measure(outputs, interested, True)
+        assert targets == columnar_targets
+        print(
+            f"{num:>2} interested facts: python {rows_time:.3f} s,"
+            f" numpy {columns_time:.3f} s, {targets} targets"
+        )
+
+
+if __name__ == "__main__":
+    main()
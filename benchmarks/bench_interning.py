@@ -0,0 +1,77 @@
+"""Measures the memory saved by interning terms, literals and facts.
+
+Builds a synthetic points-to EDB in which a few variables, heap objects
+and fields are shared by millions of facts, once with interning and once
+without, each in a fresh process, and reports the resident set size.
+
+Usage: python benchmarks/bench_interning.py [--facts 2000000] [--symbols 100]
+"""
+from symlog.souffle import Fact, Literal, String, clear_intern_pools, set_interning
+
+import argparse
+import random
+import resource
+import subprocess
+import sys
+import time
+
+RELATIONS = {"assign": 2, "new": 2, "load": 3, "store": 3}
+
+
+def rss_mb():
+    # kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_edb(facts, symbols):
+    random.seed(0)
+    names = list(RELATIONS)
+    edb = []
+    for _ in range(facts):
+        name = random.choice(names)
+        # every fact is built from fresh strings, like a fact loader does
+        args = [String(f"v{random.randrange(symbols)}") for _ in range(RELATIONS[name])]
+        edb.append(Fact(Literal(name, args, True), [], False))
+    return edb
+
+
+def measure(facts, symbols, interning):
+    set_interning(interning)
+    before = rss_mb()
+    start = time.perf_counter()
+    edb = make_edb(facts, symbols)
+    elapsed = time.perf_counter() - start
+    distinct = len(set(edb))
+    print(f"{rss_mb() - before:.1f} {elapsed:.2f} {distinct}")
+    clear_intern_pools()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--facts", type=int, default=2_000_000)
+    parser.add_argument("--symbols", type=int, default=100)
+    parser.add_argument("--child", choices=["on", "off"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(args.facts, args.symbols, args.child == "on")
+        return
+
+    print(f"facts: {args.facts}, symbols: {args.symbols}")
+    for mode in ("off", "on"):
+        output = subprocess.run(
+            [sys.executable, __file__, "--facts", str(args.facts)]
+            + ["--symbols", str(args.symbols), "--child", mode],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout
+        rss, elapsed, distinct = output.split()
+        print(
+            f"interning {mode:>3}: {float(rss):8.1f} MB RSS growth,"
+            f" {float(elapsed):.2f} s, {distinct} distinct facts"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -11,4 +11,10 @@ setup(
         "pytest==7.3.1",
         "z3_solver==4.12.2.0",
     ],
+    extras_require={
+        "columnar": ["numpy"],
+    },
+    entry_points={
+        "console_scripts": ["symlog=symlog.cli:main"],
+    },
 )
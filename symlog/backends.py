@@ -0,0 +1,408 @@
+import symlog.common as common
+from symlog.souffle import (
+    Program,
+    Fact,
+    program_digest,
+    run_program,
+    run_program_to,
+    compile_and_run,
+    compile_and_run_to,
+    fact_to_row,
+    compile_program,
+    is_compiled,
+)
+from symlog.evaluator import evaluate_program, is_supported
+from symlog.logger import get_logger
+import symlog.souffle_library as souffle_library
+
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+import csv
+import shutil
+import threading
+import time
+
+logger = get_logger(__name__)
+
+# weight of the latest sample in the moving averages of the timings
+SMOOTHING = 0.3
+
+
+class Backend:
+    """An engine evaluating Datalog programs.
+
+    Backends may have to prepare a program (e.g. compile it) before running it.
+    The default timings are used by the selector until it has observed the
+    backend on a program. The selector passes the `program_fingerprint` it
+    has computed to the methods taking one.
+    """
+
+    name: str = None
+    # whether `run_to` writes the outputs without loading them into memory
+    writes_outputs: bool = False
+    default_prepare_time: float = 0.0
+    default_run_time: float = 0.0
+    default_time_per_fact: float = 0.0
+
+    def is_available(self) -> bool:
+        return True
+
+    def is_applicable(self, program: Program, input_size: int) -> bool:
+        return True
+
+    def is_prepared(self, program: Program, fingerprint: Optional[str] = None) -> bool:
+        return True
+
+    def prepare(self, program: Program):
+        pass
+
+    def run(self, program: Program, facts: Iterable[Fact]) -> Set[Fact]:
+        raise NotImplementedError
+
+    def run_to(self, program: Program, facts: Iterable[Fact], output_directory: Path):
+        """Evaluates the program, writing the output relations to csv files
+        in the directory like souffle does."""
+        grouped_facts = {name: [] for name in program.outputs}
+        for fact in self.run(program, facts):
+            grouped_facts[fact.head.name].append(fact)
+        for name, relation_facts in grouped_facts.items():
+            with open(Path(output_directory) / f"{name}.csv", "w", newline="") as file:
+                csv.writer(file, delimiter="\t").writerows(
+                    map(fact_to_row, relation_facts)
+                )
+
+
+class InterpreterBackend(Backend):
+    name = common.SOUFFLE_INTERPRET_MODE
+    writes_outputs = True
+    default_run_time = 0.1
+    default_time_per_fact = 1e-5
+
+    def is_available(self) -> bool:
+        return shutil.which("souffle") is not None
+
+    def run(self, program, facts):
+        return run_program(program, facts)
+
+    def run_to(self, program, facts, output_directory):
+        run_program_to(program, facts, output_directory)
+
+
+class CompilerBackend(Backend):
+    name = common.SOUFFLE_COMPILE_MODE
+    writes_outputs = True
+    default_prepare_time = 30.0
+    default_run_time = 0.01
+    default_time_per_fact = 1e-6
+
+    def is_available(self) -> bool:
+        return shutil.which("souffle") is not None
+
+    def is_prepared(self, program, fingerprint=None):
+        return is_compiled(program, hex_dig=fingerprint)
+
+    def prepare(self, program):
+        compile_program(program)
+
+    def run(self, program, facts):
+        return compile_and_run(program, facts)
+
+    def run_to(self, program, facts, output_directory):
+        compile_and_run_to(program, facts, output_directory)
+
+
+class LibraryBackend(Backend):
+    name = common.SOUFFLE_LIBRARY_MODE
+    default_prepare_time = 40.0
+    default_run_time = 0.001
+    default_time_per_fact = 1e-6
+
+    def is_available(self) -> bool:
+        # souffle code runs in this process, so it is never selected unasked
+        return common.LIBRARY_BACKEND and souffle_library.is_toolchain_available()
+
+    def is_prepared(self, program, fingerprint=None):
+        return souffle_library.is_loaded(program, fingerprint)
+
+    def prepare(self, program):
+        souffle_library.load_library(program)
+
+    def run(self, program, facts):
+        return souffle_library.run_in_process(program, facts)
+
+
+class NativeBackend(Backend):
+    name = common.NATIVE_MODE
+    default_run_time = 0.0001
+    default_time_per_fact = 2e-5
+
+    def is_applicable(self, program, input_size):
+        return input_size <= common.NATIVE_MAX_FACTS and is_supported(program)
+
+    def run(self, program, facts):
+        return evaluate_program(program, facts)
+
+
+_registry: Dict[str, Backend] = {}
+
+
+def register_backend(backend: Backend):
+    """Registers a backend under its name, replacing any previous one."""
+    _registry[backend.name] = backend
+
+
+def get_backend(name: str) -> Backend:
+    try:
+        return _registry[name]
+    except KeyError:
+        raise ValueError(f"Unknown execution backend: {name}")
+
+
+def available_backends() -> List[Backend]:
+    return [backend for backend in _registry.values() if backend.is_available()]
+
+
+for _backend in (InterpreterBackend(), CompilerBackend(), LibraryBackend(), NativeBackend()):
+    register_backend(_backend)
+
+
+@dataclass
+class Timing:
+    prepare_time: Optional[float] = None
+    run_time: Optional[float] = None
+    input_size: float = 0.0
+    runs: int = 0
+
+
+def _average(previous: Optional[float], sample: float) -> float:
+    if previous is None:
+        return sample
+    return (1 - SMOOTHING) * previous + SMOOTHING * sample
+
+
+def program_fingerprint(program: Program) -> str:
+    # the digest of the program, see `Backend`
+    return program_digest(program)
+
+
+class BackendSelector:
+    """Routes evaluations to the backend expected to finish first.
+
+    The expected cost of a backend is its run time plus, if the program is not
+    prepared yet, its preparation time amortised over the expected number of
+    evaluations of the program. Timings are recorded per program fingerprint.
+    """
+
+    def __init__(self, backends: Optional[List[Backend]] = None):
+        # None selects among the registered backends
+        self._backends = backends
+        self._timings: Dict[Tuple[str, str], Timing] = defaultdict(Timing)
+        self._calls: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def estimate(
+        self, backend: Backend, fingerprint: str, input_size: int, reuse: int
+    ) -> Tuple[float, float]:
+        """Returns the estimated (preparation time, run time) of a backend."""
+        timing = self._timings.get((fingerprint, backend.name), Timing())
+
+        prepare_time = (
+            backend.default_prepare_time
+            if timing.prepare_time is None
+            else timing.prepare_time
+        )
+
+        if timing.run_time is None:
+            run_time = (
+                backend.default_run_time + backend.default_time_per_fact * input_size
+            )
+        else:
+            # scale the observed run time with the input size
+            run_time = timing.run_time * max(1.0, input_size / max(timing.input_size, 1))
+
+        # a program evaluated often in the past is likely to be evaluated again
+        expected_runs = max(reuse, self._calls[fingerprint], 1)
+
+        return prepare_time / expected_runs, run_time
+
+    def select(
+        self,
+        program: Program,
+        fingerprint: str,
+        input_size: int,
+        reuse: int = 1,
+        writes_outputs: bool = False,
+    ) -> Backend:
+        """Returns the backend expected to finish first.
+
+        :param writes_outputs: Whether to select among the backends writing the
+            outputs to files without loading them into memory
+        """
+        backends = available_backends() if self._backends is None else self._backends
+        candidates = [
+            backend
+            for backend in backends
+            if backend.is_available()
+            and backend.is_applicable(program, input_size)
+            and (backend.writes_outputs or not writes_outputs)
+        ]
+        if not candidates:
+            raise RuntimeError("No execution backend is available. Is souffle installed?")
+
+        def cost(backend):
+            prepare_time, run_time = self.estimate(
+                backend, fingerprint, input_size, reuse
+            )
+            if backend.is_prepared(program, fingerprint):
+                prepare_time = 0.0
+            return prepare_time + run_time
+
+        return min(candidates, key=cost)
+
+    def record(
+        self,
+        backend: Backend,
+        fingerprint: str,
+        input_size: int,
+        prepare_time: Optional[float],
+        run_time: float,
+    ):
+        with self._lock:
+            timing = self._timings[(fingerprint, backend.name)]
+            if prepare_time is not None:
+                timing.prepare_time = prepare_time
+            timing.run_time = _average(timing.run_time, run_time)
+            timing.input_size = _average(
+                timing.input_size if timing.runs else None, input_size
+            )
+            timing.runs += 1
+
+    def _get_backend(self, name: str) -> Backend:
+        if self._backends is None:
+            return get_backend(name)
+        for backend in self._backends:
+            if backend.name == name:
+                return backend
+        raise ValueError(f"Unknown execution backend: {name}")
+
+    def _run(
+        self,
+        program: Program,
+        facts: Iterable[Fact],
+        reuse: int,
+        mode: Optional[str],
+        run: Callable[[Backend, List[Fact]], object],
+        writes_outputs: bool = False,
+    ):
+        facts = list(facts)
+        input_size = len(facts) + len(program.facts)
+        fingerprint = program_fingerprint(program)
+
+        with self._lock:
+            self._calls[fingerprint] += 1
+
+        if mode is None:
+            mode = common.EXECUTION_MODE
+            # the forced backend of all evaluations may not write the outputs
+            if (
+                writes_outputs
+                and mode is not None
+                and not self._get_backend(mode).writes_outputs
+            ):
+                mode = None
+        backend = None
+        if mode is not None:
+            backend = self._get_backend(mode)
+            if not backend.is_applicable(program, input_size):
+                logger.warning(
+                    f"The {mode} backend cannot evaluate the program on"
+                    f" {input_size} facts, selecting another one"
+                )
+                backend = None
+        if backend is None:
+            backend = self.select(
+                program, fingerprint, input_size, reuse, writes_outputs
+            )
+
+        prepare_time = None
+        if not backend.is_prepared(program, fingerprint):
+            start = time.perf_counter()
+            backend.prepare(program)
+            prepare_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = run(backend, facts)
+        run_time = time.perf_counter() - start
+
+        self.record(backend, fingerprint, input_size, prepare_time, run_time)
+
+        return result
+
+    def execute(
+        self,
+        program: Program,
+        facts: Iterable[Fact],
+        reuse: int = 1,
+        mode: Optional[str] = None,
+    ) -> Set[Fact]:
+        """Evaluates the program on the facts with the given or the cheapest backend.
+
+        :param reuse: The number of times the caller expects to evaluate the program
+        :param mode: The name of a backend to use instead of selecting one, if
+            it can evaluate the program
+        """
+        return self._run(
+            program, facts, reuse, mode, lambda backend, facts: backend.run(program, facts)
+        )
+
+    def execute_to(
+        self,
+        program: Program,
+        facts: Iterable[Fact],
+        output_directory: Path,
+        reuse: int = 1,
+        mode: Optional[str] = None,
+    ):
+        """Like `execute`, but writes the outputs to csv files in the directory.
+
+        Unless the mode is given, the outputs are written by a backend that
+        does not load them into memory, i.e., by souffle.
+        """
+        self._run(
+            program,
+            facts,
+            reuse,
+            mode,
+            lambda backend, facts: backend.run_to(program, facts, output_directory),
+            writes_outputs=True,
+        )
+
+
+_default_selector = BackendSelector()
+
+
+def get_selector() -> BackendSelector:
+    return _default_selector
+
+
+def execute(
+    program: Program,
+    facts: Iterable[Fact],
+    reuse: int = 1,
+    mode: Optional[str] = None,
+) -> Set[Fact]:
+    """Evaluates the program with the backend expected to finish first."""
+    return _default_selector.execute(program, facts, reuse, mode)
+
+
+def execute_to(
+    program: Program,
+    facts: Iterable[Fact],
+    output_directory: Path,
+    reuse: int = 1,
+    mode: Optional[str] = None,
+):
+    """Evaluates the program, writing its outputs to csv files in the directory."""
+    _default_selector.execute_to(program, facts, output_directory, reuse, mode)
@@ -0,0 +1,216 @@
+import symlog.common as common
+from symlog.logger import get_logger
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterator, List, Optional, Tuple, Union
+import fcntl
+import os
+import threading
+
+logger = get_logger(__name__)
+
+LOCK_SUFFIX = ".lock"
+CACHE_LOCK_NAME = ".cache" + LOCK_SUFFIX
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    builds: int = 0
+    evictions: int = 0
+
+
+class BinaryCache:
+    """A content-addressed cache of compiled artifacts shared between processes.
+
+    Every entry is guarded by its own lock file. Users of an entry hold a shared
+    lock while the artifact is in use, while building and evicting an entry
+    require an exclusive lock. Hence, concurrent callers asking for the same
+    key wait for a single build, and entries in use are never evicted. Evicting
+    an entry removes its lock file as well; callers that were waiting for the
+    removed file lock the new one instead.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.cache_dir = Path(
+            common.BINARY_CACHE_DIR if cache_dir is None else cache_dir
+        ).expanduser()
+        self.max_entries = (
+            common.BINARY_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.max_bytes = common.BINARY_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, key: str) -> Path:
+        """Returns the path of the artifact stored under the given key."""
+        if not key or os.sep in key or key.startswith(".") or key.endswith(LOCK_SUFFIX):
+            raise ValueError(f"invalid cache key {key}")
+        return self.cache_dir / key
+
+    def _lock_path_for(self, key: str) -> Path:
+        return self.cache_dir / (key + LOCK_SUFFIX)
+
+    def _lock(self, lock_file, key: str, operation: int) -> bool:
+        """Locks the lock file of the entry.
+
+        Returns False if the file was removed by an eviction meanwhile, hence
+        the lock no longer guards the entry.
+        """
+        fcntl.flock(lock_file, operation)
+        try:
+            lock_stat = self._lock_path_for(key).stat()
+        except FileNotFoundError:
+            return False
+        return os.fstat(lock_file.fileno()).st_ino == lock_stat.st_ino
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+
+    @contextmanager
+    def acquire(self, key: str, build: Callable[[Path], None]) -> Iterator[Path]:
+        """Yields the path of the artifact under `key`, building it if missing.
+
+        `build` receives a temporary path inside the cache directory and must
+        produce the artifact there. The artifact is guaranteed to exist until the
+        context exits.
+        """
+        path = self.path_for(key)
+
+        try:
+            while True:
+                with open(self._lock_path_for(key), "a") as lock_file:
+                    try:
+                        if not self._lock(lock_file, key, fcntl.LOCK_SH):
+                            continue
+                        if path.exists():
+                            self._count("hits")
+                        else:
+                            # upgrade to an exclusive lock; another caller may have
+                            # built the entry while we were waiting for it
+                            if not self._lock(lock_file, key, fcntl.LOCK_EX):
+                                continue
+                            if path.exists():
+                                self._count("hits")
+                            else:
+                                self._count("misses")
+                                try:
+                                    self._build(path, build)
+                                except BaseException:
+                                    # no entry is left, so its lock file goes too
+                                    self._lock_path_for(key).unlink(missing_ok=True)
+                                    raise
+                            # converting the lock releases it, so the entry may
+                            # have been evicted meanwhile
+                            is_locked = self._lock(lock_file, key, fcntl.LOCK_SH)
+                            if not is_locked or not path.exists():
+                                continue
+
+                        # mark the entry as recently used
+                        os.utime(path)
+
+                        yield path
+                        break
+                    finally:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        finally:
+            # the body or a failed build may have raised, too
+            self.evict()
+
+    def _build(self, path: Path, build: Callable[[Path], None]):
+        with TemporaryDirectory(dir=self.cache_dir, prefix=".build_") as build_dir:
+            temp_path = Path(build_dir) / path.name
+            build(temp_path)
+            if not temp_path.exists():
+                raise RuntimeError(f"Building cache entry {path.name} produced nothing.")
+            # atomically publish the artifact
+            os.replace(temp_path, path)
+        self._count("builds")
+
+    def entries(self) -> List[Tuple[Path, float, int]]:
+        """Returns (path, last use time, size) of every cached artifact."""
+        result = []
+        for path in self.cache_dir.iterdir():
+            if path.name.startswith(".") or path.name.endswith(LOCK_SUFFIX):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted concurrently
+            result.append((path, stat.st_mtime, stat.st_size))
+        return result
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits its limits."""
+        with open(self.cache_dir / CACHE_LOCK_NAME, "a") as cache_lock:
+            fcntl.flock(cache_lock, fcntl.LOCK_EX)
+
+            entries = sorted(self.entries(), key=lambda entry: entry[1])
+            entry_num = len(entries)
+            total_bytes = sum(size for _, _, size in entries)
+
+            for path, _, size in entries:
+                if entry_num <= self.max_entries and total_bytes <= self.max_bytes:
+                    break
+                if self._try_remove(path):
+                    entry_num -= 1
+                    total_bytes -= size
+
+    def _try_remove(self, path: Path) -> bool:
+        lock_path = self._lock_path_for(path.name)
+        with open(lock_path, "a") as lock_file:
+            try:
+                if not self._lock(lock_file, path.name, fcntl.LOCK_EX | fcntl.LOCK_NB):
+                    return False  # removed by another eviction
+            except BlockingIOError:
+                return False  # the entry is in use or being built
+            try:
+                path.unlink()
+                # nobody holds the lock, so nobody uses the removed file
+                lock_path.unlink()
+            except FileNotFoundError:
+                return False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+        self._count("evictions")
+        logger.info(f"Evicted {path.name} from the binary cache.")
+        return True
+
+    def clear(self):
+        """Removes all unused entries."""
+        with open(self.cache_dir / CACHE_LOCK_NAME, "a") as cache_lock:
+            fcntl.flock(cache_lock, fcntl.LOCK_EX)
+            for path, _, _ in self.entries():
+                self._try_remove(path)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_binary_cache() -> BinaryCache:
+    """Returns the process-wide binary cache."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = BinaryCache()
+        return _default_cache
+
+
+def set_binary_cache(cache: Optional[BinaryCache]):
+    """Replaces the process-wide binary cache (None resets to the default)."""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
@@ -0,0 +1,100 @@
+from symlog.logger import get_logger
+
+import argparse
+import os
+import signal
+import sys
+
+logger = get_logger(__name__)
+
+
+def _warm(args):
+    from symlog.warmup import warm
+
+    try:
+        report = warm(args.manifest, jobs=args.jobs)
+    except ValueError as e:
+        logger.error(str(e), exc_info=False)
+        return 1
+
+    print(
+        f"compiled: {len(report.compiled)}, cached: {len(report.cached)},"
+        f" failed: {len(report.failed)}"
+    )
+    return 1 if report.failed else 0
+
+
+def _worker(args):
+    from symlog.distributed import serve, get_transport, resolve_authkey
+    from multiprocessing import Process
+
+    try:
+        get_transport(args.address)
+        resolve_authkey(None)
+    except ValueError as e:
+        logger.error(str(e), exc_info=False)
+        return 1
+
+    # each process pulls tasks through its own connection
+    processes = [
+        Process(target=serve, args=(args.address,), kwargs={"retry_delay": args.retry})
+        for _ in range(args.jobs or os.cpu_count() or 1)
+    ]
+    for process in processes:
+        process.start()
+    # stop the processes when the daemon is terminated
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        return 0
+    return 1 if any(process.exitcode for process in processes) else 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="symlog")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = commands.add_parser(
+        "warm",
+        help="compile the programs of a manifest into the binary cache",
+    )
+    warm_parser.add_argument("manifest", help="path of the JSON manifest")
+    warm_parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="programs compiled in parallel"
+    )
+    warm_parser.set_defaults(func=_warm)
+
+    worker_parser = commands.add_parser(
+        "worker",
+        help="run symbolic execution tasks of a coordinator, see SYMLOG_DISTRIBUTED_ADDRESS",
+    )
+    worker_parser.add_argument(
+        "address", help="address of the coordinator, e.g. tcp://host:7100"
+    )
+    worker_parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="tasks run in parallel"
+    )
+    worker_parser.add_argument(
+        "--retry",
+        type=float,
+        default=5.0,
+        help="seconds to wait before reconnecting to the coordinator",
+    )
+    worker_parser.set_defaults(func=_worker)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,6 +10,9 @@ HEAD_RECORD_ARG_PREFIX = "_symlog_head_record_"
 BODY_RECORD_ARG_PREFIX = "_symlog_body_record_"
 SYMBOLIC_SYMBOL_PLACEHOLDER = "symlog_symbol_placeholder_"
 SYMBOLIC_NUMBER_PLACEHOLDER = "symlog_number_placeholder_"
+FILTER_PREDICATE_PREFIX = "symlog_filter_"
+MAGIC_PREDICATE_PREFIX = "symlog_magic_"
+ADORNED_PREDICATE_PREFIX = "symlog_adorned_"
 SYMLOG_NUM_POOL_SIZE = 1001
 SYMLOG_NUM_POOL = [-sys.maxsize + i for i in range(1, SYMLOG_NUM_POOL_SIZE)]
 
@@ -26,6 +29,50 @@ SOUFFLE_INTRINSIC_PREDS = {SOUFFLE_CONTAINS, SOUFFLE_SUBSTR}
 
 SOUFFLE_COMPILE_MODE = "compile"
 SOUFFLE_INTERPRET_MODE = "interpret"
+SOUFFLE_LIBRARY_MODE = "library"
+NATIVE_MODE = "native"
+# how facts are exchanged with souffle: fact files or named pipes
+SOUFFLE_FILE_IO = "file"
+SOUFFLE_STREAM_IO = "stream"
+SOUFFLE_IO_MODE = os.environ.get("SYMLOG_IO_MODE", SOUFFLE_FILE_IO)
+# forces one of the execution modes above; None selects them per call
+EXECUTION_MODE = os.environ.get("SYMLOG_EXECUTION_MODE")
+# lets the selector load programs in-process, see symlog.souffle_library
+LIBRARY_BACKEND = os.environ.get("SYMLOG_LIBRARY_BACKEND", "0") == "1"
+# the largest number of facts evaluated by the native evaluator
+NATIVE_MAX_FACTS = int(os.environ.get("SYMLOG_NATIVE_MAX_FACTS", 2000))
+# equal terms, literals and facts share one object, see symlog.souffle
+INTERNING = os.environ.get("SYMLOG_INTERNING", "1") != "0"
+INTERN_POOL_MAX_SIZE = int(os.environ.get("SYMLOG_INTERN_POOL_MAX_SIZE", 100_000))
+# program instances of the libraries loaded in-process, see symlog.souffle_library
+LOADED_LIBRARY_MAX_NUM = int(os.environ.get("SYMLOG_LOADED_LIBRARY_MAX_NUM", 8))
+# processes computing the constraints of symbolic execution
+SYMEX_MAX_WORKERS = int(
+    os.environ.get("SYMLOG_SYMEX_MAX_WORKERS", max(1, (os.cpu_count() or 1) // 2))
+)
+# programs each of these processes keeps in memory
+WORKER_PROGRAM_CACHE_SIZE = 8
+# the address at which a coordinator distributes these computations to workers
+# on other machines, e.g. tcp://0.0.0.0:7100 (None computes them locally)
+DISTRIBUTED_ADDRESS = os.environ.get("SYMLOG_DISTRIBUTED_ADDRESS")
+# the key shared by the coordinator and its workers
+DISTRIBUTED_AUTHKEY = os.environ.get("SYMLOG_DISTRIBUTED_AUTHKEY", "")
+# the number of workers a task may take down before it fails
+DISTRIBUTED_MAX_ATTEMPTS = int(os.environ.get("SYMLOG_DISTRIBUTED_MAX_ATTEMPTS", 3))
+# restricts the outputs of meta-programs to the interested facts
+META_OUTPUT_FILTER = os.environ.get("SYMLOG_META_OUTPUT_FILTER", "1") != "0"
+# rewrites meta-programs with magic sets to only derive the demanded tuples
+META_MAGIC_SETS = os.environ.get("SYMLOG_META_MAGIC_SETS", "0") == "1"
+# relations of meta-program outputs with fewer tuples are grouped by assignment
+# in Python even if numpy is installed
+COLUMNAR_MIN_ROWS = int(os.environ.get("SYMLOG_COLUMNAR_MIN_ROWS", 1000))
+# keeps the outputs of meta-programs on disk, partitioned by assignment
+META_SPILL = os.environ.get("SYMLOG_META_SPILL", "0") == "1"
+META_SPILL_PARTITIONS = int(os.environ.get("SYMLOG_META_SPILL_PARTITIONS", 64))
+# None spills to the default temporary directory
+META_SPILL_DIR = os.environ.get("SYMLOG_META_SPILL_DIR")
+# counters and timers of the stages of symbolic execution, see symlog.instrumentation
+INSTRUMENTATION = os.environ.get("SYMLOG_INSTRUMENTATION", "0") == "1"
 OPTIMIZATION_MODE = "optmization"
 
 DELIMITER = ", "
@@ -58,6 +105,42 @@ NEG_QUERY = "neg_query"
 
 TMP_DIR = os.path.join(os.getcwd(), "tmp")
 
+# caches
+SYMLOG_CACHE_DIR = os.environ.get(
+    "SYMLOG_CACHE_DIR",
+    os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "symlog",
+    ),
+)
+BINARY_CACHE_DIR = os.environ.get(
+    "SYMLOG_BINARY_CACHE_DIR", os.path.join(SYMLOG_CACHE_DIR, "binaries")
+)
+GRAMMAR_CACHE_DIR = os.path.join(SYMLOG_CACHE_DIR, "grammar")
+PARSE_CACHE_DIR = os.environ.get(
+    "SYMLOG_PARSE_CACHE_DIR", os.path.join(SYMLOG_CACHE_DIR, "parsed")
+)
+PARSE_CACHE_MAX_BYTES = int(
+    os.environ.get("SYMLOG_PARSE_CACHE_MAX_BYTES", 256 * 1024 * 1024)
+)
+RESULT_STORE = os.environ.get("SYMLOG_RESULT_STORE", "0") == "1"
+RESULT_STORE_PATH = os.environ.get(
+    "SYMLOG_RESULT_STORE_PATH", os.path.join(SYMLOG_CACHE_DIR, "results.sqlite")
+)
+RESULT_STORE_MAX_ENTRIES = int(os.environ.get("SYMLOG_RESULT_STORE_MAX_ENTRIES", 10_000))
+RESULT_STORE_MAX_BYTES = int(
+    os.environ.get("SYMLOG_RESULT_STORE_MAX_BYTES", 1024 * 1024 * 1024)
+)
+# results and matched symbolic pairs kept in memory by the symbolic executor
+SYMEX_MEMORY_CACHE_SIZE = int(os.environ.get("SYMLOG_SYMEX_MEMORY_CACHE_SIZE", 64))
+MATCHED_PAIRS_CACHE_SIZE = 65536
+# z3 constants of symbols and facts shared by the conditions
+Z3_CONST_CACHE_SIZE = 65536
+BINARY_CACHE_MAX_ENTRIES = int(os.environ.get("SYMLOG_BINARY_CACHE_MAX_ENTRIES", 256))
+BINARY_CACHE_MAX_BYTES = int(
+    os.environ.get("SYMLOG_BINARY_CACHE_MAX_BYTES", 4 * 1024 * 1024 * 1024)
+)
+
 # type
 PredTuplesDict = Dict[str, List[List[str]]]
 
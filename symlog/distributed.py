@@ -0,0 +1,352 @@
+import symlog.common as common
+from symlog.souffle import Program, stable_digest
+from symlog.worker_pool import _MergingFuture
+from symlog.logger import get_logger
+import symlog.instrumentation as instrumentation
+
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, InvalidStateError
+from multiprocessing.connection import Client, Listener, AuthenticationError
+from typing import Callable, Dict, Optional, Tuple
+import pickle
+import queue
+import threading
+import time
+
+logger = get_logger(__name__)
+
+# A coordinator publishes the tasks of symbolic execution, e.g., the
+# dependencies under an assignment, and worker daemons on any machine pull and
+# run them. The messages are pickled, hence both ends authenticate with a
+# shared key. Addresses name their transport, e.g., tcp://host:port or
+# unix:///path/to/socket.
+
+
+class Transport:
+    """Carries messages between a coordinator and its workers.
+
+    A listener accepts connections, and connections send and receive Python
+    objects, like those of `multiprocessing.connection`.
+    """
+
+    def listen(self, address: str, authkey: bytes):
+        raise NotImplementedError
+
+    def connect(self, address: str, authkey: bytes):
+        raise NotImplementedError
+
+    def format_address(self, address) -> str:
+        """Returns the address a listener is bound to in the form of `listen`."""
+        raise NotImplementedError
+
+
+class TcpTransport(Transport):
+    def _parse(self, address: str) -> Tuple[str, int]:
+        host, _, port = address.rpartition(":")
+        return host, int(port)
+
+    def listen(self, address, authkey):
+        return Listener(self._parse(address), family="AF_INET", authkey=authkey)
+
+    def connect(self, address, authkey):
+        return Client(self._parse(address), family="AF_INET", authkey=authkey)
+
+    def format_address(self, address):
+        host, port = address
+        return f"tcp://{host}:{port}"
+
+
+class UnixTransport(Transport):
+    def listen(self, address, authkey):
+        return Listener(address, family="AF_UNIX", authkey=authkey)
+
+    def connect(self, address, authkey):
+        return Client(address, family="AF_UNIX", authkey=authkey)
+
+    def format_address(self, address):
+        return f"unix://{address}"
+
+
+_transports: Dict[str, Transport] = {}
+
+
+def register_transport(scheme: str, transport: Transport):
+    """Registers a transport for the addresses of the scheme, replacing any previous one."""
+    _transports[scheme] = transport
+
+
+register_transport("tcp", TcpTransport())
+register_transport("unix", UnixTransport())
+
+
+def get_transport(address: str) -> Tuple[Transport, str]:
+    """Returns the transport of the address and the address without its scheme."""
+    scheme, separator, rest = address.partition("://")
+    if not separator:
+        raise ValueError(f"The address {address} has no scheme, e.g. tcp://.")
+    try:
+        return _transports[scheme], rest
+    except KeyError:
+        raise ValueError(f"Unknown transport: {scheme}")
+
+
+def resolve_authkey(authkey: Optional[bytes]) -> bytes:
+    """Returns the given key or the one of SYMLOG_DISTRIBUTED_AUTHKEY."""
+    authkey = common.DISTRIBUTED_AUTHKEY.encode() if authkey is None else authkey
+    if not authkey:
+        raise ValueError(
+            "Distributed execution requires a shared key; set"
+            " SYMLOG_DISTRIBUTED_AUTHKEY."
+        )
+    return authkey
+
+
+def _remember(programs: OrderedDict, fingerprint: str, program=None):
+    # the coordinator mirrors the programs each worker keeps
+    programs[fingerprint] = program
+    programs.move_to_end(fingerprint)
+    while len(programs) > common.WORKER_PROGRAM_CACHE_SIZE:
+        programs.popitem(last=False)
+
+
+class Coordinator:
+    """Distributes tasks to the workers connected to its address.
+
+    It has the interface of `WorkerPool`. A program is pickled once and sent to
+    a worker with its first task that refers to it, and dropped once no task
+    refers to it and it is not among the programs the workers keep. The tasks
+    of a worker that disconnects are handed to the other workers, up to
+    DISTRIBUTED_MAX_ATTEMPTS times.
+    """
+
+    def __init__(
+        self, address: Optional[str] = None, authkey: Optional[bytes] = None
+    ):
+        address = common.DISTRIBUTED_ADDRESS if address is None else address
+        transport, raw_address = get_transport(address)
+        self._listener = transport.listen(raw_address, resolve_authkey(authkey))
+        self.address = transport.format_address(self._listener.address)
+
+        self._tasks = queue.Queue()
+        self._programs: "OrderedDict[str, bytes]" = OrderedDict()
+        # the number of unfinished tasks of each program
+        self._pending = Counter()
+        self._latest = (None, None)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._connections = set()
+        # the threads serving the connections
+        self._threads = []
+
+        threading.Thread(target=self._accept, daemon=True).start()
+        logger.info(f"Waiting for workers at {self.address}...")
+
+    def _accept(self):
+        while not self._closed:
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                logger.warning("Rejected a worker with a wrong key.")
+                continue
+            except (OSError, EOFError) as e:
+                if self._closed:
+                    return  # the listener is closed
+                # e.g., a port probe closing the connection during the handshake
+                logger.warning(f"Dropped a connection during the handshake: {e!r}")
+                continue
+            thread = threading.Thread(
+                target=self._serve, args=(connection,), daemon=True
+            )
+            with self._lock:
+                self._connections.add(connection)
+                self._threads = [t for t in self._threads if t.is_alive()]
+                self._threads.append(thread)
+            thread.start()
+
+    def _serve(self, connection):
+        sent = OrderedDict()
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    self._tasks.put(None)  # stop the other connections as well
+                    return
+                future, fingerprint, call, attempts = task
+                if future.cancelled():
+                    continue
+
+                with self._lock:
+                    program = None if fingerprint in sent else self._programs[fingerprint]
+                try:
+                    connection.send((fingerprint, program, call))
+                    is_ok, value = connection.recv()
+                except (OSError, EOFError):
+                    # the worker is gone, another one runs the task
+                    if self._closed:
+                        future.cancel()
+                    elif attempts + 1 < common.DISTRIBUTED_MAX_ATTEMPTS:
+                        self._tasks.put((future, fingerprint, call, attempts + 1))
+                    else:
+                        self._fail(future, attempts + 1)
+                    return
+                _remember(sent, fingerprint)
+
+                try:
+                    if is_ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+                except InvalidStateError:
+                    pass  # cancelled while running
+        finally:
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+
+    @staticmethod
+    def _fail(future: Future, attempts: int):
+        error = RuntimeError(f"The workers running the task died {attempts} times.")
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            pass  # cancelled meanwhile
+
+    def _publish(self, program: Program) -> str:
+        # requires the lock
+        latest_program, fingerprint = self._latest
+        if latest_program is not program:
+            fingerprint = stable_digest(program)
+            self._latest = (program, fingerprint)
+
+        if fingerprint not in self._programs:
+            self._programs[fingerprint] = pickle.dumps(
+                program, protocol=pickle.HIGHEST_PROTOCOL
+            )
+        self._programs.move_to_end(fingerprint)
+        return fingerprint
+
+    def _evict(self):
+        # requires the lock
+        kept = list(self._programs)[-common.WORKER_PROGRAM_CACHE_SIZE :]
+        for fingerprint in list(self._programs):
+            if fingerprint not in kept and not self._pending[fingerprint]:
+                del self._programs[fingerprint]
+
+    def _release(self, fingerprint: str):
+        with self._lock:
+            self._pending[fingerprint] -= 1
+            if not self._pending[fingerprint]:
+                del self._pending[fingerprint]
+                self._evict()
+
+    def publish(self, program: Program) -> str:
+        """Makes the program available to the workers and returns its fingerprint."""
+        with self._lock:
+            fingerprint = self._publish(program)
+            self._evict()
+        return fingerprint
+
+    def submit(self, fn: Callable, program: Program, *args, **kwargs) -> Future:
+        """Schedules fn(program, *args, **kwargs) in a worker."""
+        if self._closed:
+            raise RuntimeError("Cannot submit tasks after shutdown.")
+        with self._lock:
+            fingerprint = self._publish(program)
+            self._pending[fingerprint] += 1
+        future = Future()
+        future.add_done_callback(lambda _: self._release(fingerprint))
+        # the workers record the stats of instrumented tasks and send them back
+        collect = instrumentation.is_enabled()
+        self._tasks.put((future, fingerprint, (fn, args, kwargs, collect), 0))
+        if collect:
+            return _MergingFuture(future)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        """Cancels the tasks no worker has taken and disconnects the workers.
+
+        :param wait: Whether to wait for the tasks the workers are running
+        """
+        self._closed = True
+        # tasks no worker has taken are cancelled
+        while True:
+            try:
+                task = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is not None:
+                task[0].cancel()
+        self._tasks.put(None)
+        self._listener.close()
+        with self._lock:
+            connections = list(self._connections)
+            threads = list(self._threads)
+        if wait:
+            # the threads serving the workers return after their running tasks
+            for thread in threads:
+                thread.join()
+        else:
+            # workers running a task see the end of the connection
+            for connection in connections:
+                connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+def _run_task(program: Program, call) -> Tuple[bool, object]:
+    fn, args, kwargs, collect = call
+    try:
+        if collect:
+            return True, instrumentation.call_collecting(fn, program, *args, **kwargs)
+        return True, fn(program, *args, **kwargs)
+    except Exception as e:
+        return False, e
+
+
+def run_worker(address: str, authkey: Optional[bytes] = None) -> int:
+    """Runs the tasks of the coordinator at the address until it disconnects.
+
+    Returns the number of tasks run.
+    """
+    transport, raw_address = get_transport(address)
+    connection = transport.connect(raw_address, resolve_authkey(authkey))
+    programs = OrderedDict()
+    task_num = 0
+    with connection:
+        while True:
+            try:
+                fingerprint, program, call = connection.recv()
+            except (OSError, EOFError):
+                return task_num
+
+            if program is not None:
+                _remember(programs, fingerprint, pickle.loads(program))
+            else:
+                _remember(programs, fingerprint, programs[fingerprint])
+
+            result = _run_task(programs[fingerprint], call)
+            try:
+                connection.send(result)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                connection.send((False, RuntimeError(f"Unpicklable result: {e}")))
+            except (OSError, EOFError):
+                return task_num
+            task_num += 1
+
+
+def serve(address: str, authkey: Optional[bytes] = None, retry_delay: float = 5.0):
+    """Runs tasks of the coordinator at the address, reconnecting forever."""
+    while True:
+        try:
+            task_num = run_worker(address, authkey)
+            logger.info(f"Ran {task_num} tasks of {address}.")
+        except AuthenticationError:
+            logger.error(f"The coordinator at {address} rejected the key.")
+            raise
+        except (OSError, EOFError):
+            pass  # the coordinator is not up (yet), or went away
+        time.sleep(retry_delay)
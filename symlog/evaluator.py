@@ -0,0 +1,259 @@
+from symlog.souffle import (
+    Program,
+    Rule,
+    Fact,
+    Literal,
+    Variable,
+    String,
+    Number,
+    Underscore,
+    SymbolicString,
+    SymbolicNumber,
+    SymbolicStringWrapper,
+    SymbolicNumberWrapper,
+    NUM,
+)
+
+from collections import defaultdict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+# argument patterns of compiled literals
+CONST = 0
+VAR = 1
+WILDCARD = 2
+
+
+def _normalise_constant(term) -> String | Number:
+    """Returns the value souffle sees for the given constant of a program."""
+    if isinstance(term, String):
+        return String(term.value.replace('"', ""))
+    elif isinstance(term, Number):
+        return term
+    elif isinstance(term, SymbolicString):
+        return String(term.name)
+    elif isinstance(term, SymbolicNumber):
+        return Number(term.name)
+    elif isinstance(term, (SymbolicStringWrapper, SymbolicNumberWrapper)):
+        return _normalise_constant(term.payload)
+    else:
+        assert False, f"unknown term {term}. Bug?"
+
+
+def _normalise_input_arg(arg, decl_type: str) -> String | Number:
+    """Returns the value souffle reads for the given argument of an input fact."""
+    value = arg
+    if isinstance(arg, (SymbolicStringWrapper, SymbolicNumberWrapper)):
+        value = arg.payload
+    if isinstance(value, (String, SymbolicString)):
+        raw = value.value if isinstance(value, String) else value.name
+        raw = raw.replace('"', "").replace("'", "")
+    else:
+        raw = str(value.value if isinstance(value, Number) else value.name)
+    return Number(int(raw)) if decl_type == NUM else String(raw)
+
+
+class _Relation:
+    """A set of tuples with hash indexes on bound argument positions."""
+
+    __slots__ = ["tuples", "indexes"]
+
+    def __init__(self):
+        self.tuples = set()
+        self.indexes = {}
+
+    def add(self, tup: Tuple) -> bool:
+        if tup in self.tuples:
+            return False
+        self.tuples.add(tup)
+        for positions, index in self.indexes.items():
+            index[tuple(tup[i] for i in positions)].append(tup)
+        return True
+
+    def lookup(self, positions: Tuple[int, ...], key: Tuple) -> Iterable[Tuple]:
+        if not positions:
+            return self.tuples
+        index = self.indexes.get(positions)
+        if index is None:
+            index = defaultdict(list)
+            for tup in self.tuples:
+                index[tuple(tup[i] for i in positions)].append(tup)
+            self.indexes[positions] = index
+        return index.get(key, ())
+
+
+class _CompiledRule:
+    __slots__ = ["head_name", "head", "body"]
+
+    def __init__(self, rule: Rule):
+        self.head_name = rule.head.name
+        self.head = [self._compile_arg(arg) for arg in rule.head.args]
+        if any(kind == WILDCARD for kind, _ in self.head):
+            raise ValueError(f"Underscore in the head of {rule} is not allowed.")
+
+        self.body = []
+        for literal in rule.body:
+            if not isinstance(literal, Literal):
+                raise ValueError(f"unknown body element {literal}")
+            if not literal.positive:
+                raise NotImplementedError(
+                    "Negated atoms are not supported. Please convert them to positive"
+                    " atoms"
+                )
+            self.body.append(
+                (literal.name, [self._compile_arg(arg) for arg in literal.args])
+            )
+
+    @staticmethod
+    def _compile_arg(arg) -> Tuple[int, Any]:
+        if isinstance(arg, Underscore) or (
+            isinstance(arg, Variable) and arg.name == "_"
+        ):
+            return WILDCARD, None
+        if isinstance(arg, Variable):
+            return VAR, arg.name
+        return CONST, _normalise_constant(arg)
+
+
+def is_supported(program: Program) -> bool:
+    """Returns True if the evaluator supports the rules of the program."""
+    try:
+        for rule in program.rules:
+            _CompiledRule(rule)
+    except (ValueError, NotImplementedError):
+        return False
+    return True
+
+
+class Evaluator:
+    """A semi-naive evaluator of positive Datalog programs."""
+
+    def __init__(self, program: Program):
+        self.program = program
+        self.rules = [_CompiledRule(rule) for rule in program.rules]
+        self.relations: Dict[str, _Relation] = defaultdict(_Relation)
+
+    def _join(
+        self,
+        body: List[Tuple[str, List]],
+        delta_idx: Optional[int],
+        delta: Dict[str, Set[Tuple]],
+    ) -> Iterator[Dict[str, Any]]:
+        # evaluate the delta literal first, since it is the most selective one
+        order = list(range(len(body)))
+        if delta_idx is not None:
+            order.remove(delta_idx)
+            order.insert(0, delta_idx)
+
+        def match(pos: int, binding: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+            if pos == len(order):
+                yield binding
+                return
+
+            idx = order[pos]
+            name, pattern = body[idx]
+
+            positions = []
+            key = []
+            for i, (kind, value) in enumerate(pattern):
+                if kind == CONST:
+                    positions.append(i)
+                    key.append(value)
+                elif kind == VAR and value in binding:
+                    positions.append(i)
+                    key.append(binding[value])
+
+            if idx == delta_idx:
+                candidates = (
+                    tup
+                    for tup in delta.get(name, ())
+                    if all(tup[i] == k for i, k in zip(positions, key))
+                )
+            else:
+                candidates = self.relations[name].lookup(tuple(positions), tuple(key))
+
+            for tup in candidates:
+                new_binding = binding
+                consistent = True
+                for i, (kind, value) in enumerate(pattern):
+                    if kind != VAR or value in binding:
+                        continue
+                    if new_binding is binding:
+                        new_binding = dict(binding)
+                    # a variable may occur several times in a literal
+                    if value in new_binding and new_binding[value] != tup[i]:
+                        consistent = False
+                        break
+                    new_binding[value] = tup[i]
+                if consistent:
+                    yield from match(pos + 1, new_binding)
+
+        return match(0, {})
+
+    def _fire(self, rule: _CompiledRule, delta_idx, delta) -> Iterator[Tuple]:
+        if not rule.body:
+            yield tuple(value for _, value in rule.head)
+            return
+
+        for binding in self._join(rule.body, delta_idx, delta):
+            yield tuple(
+                value if kind == CONST else binding[value] for kind, value in rule.head
+            )
+
+    def _add_derived(self, derived) -> Dict[str, Set[Tuple]]:
+        new_delta = defaultdict(set)
+        for rule, tuples in derived:
+            relation = self.relations[rule.head_name]
+            for tup in tuples:
+                if relation.add(tup):
+                    new_delta[rule.head_name].add(tup)
+        return new_delta
+
+    def evaluate(self, facts: Iterable[Fact]) -> Dict[str, Set[Tuple]]:
+        """Computes the fixpoint of the program on the given input facts."""
+        declarations = self.program.declarations
+
+        delta = defaultdict(set)
+
+        # like souffle, only load the facts of input relations
+        for fact in facts:
+            name = fact.head.name
+            if name not in self.program.inputs:
+                continue
+            tup = tuple(
+                _normalise_input_arg(arg, declarations[name][idx])
+                for idx, arg in enumerate(fact.head.args)
+            )
+            if self.relations[name].add(tup):
+                delta[name].add(tup)
+
+        for fact in self.program.facts:
+            tup = tuple(_normalise_constant(arg) for arg in fact.head.args)
+            if self.relations[fact.head.name].add(tup):
+                delta[fact.head.name].add(tup)
+
+        # the first round evaluates every rule on all known tuples
+        derived = [(rule, list(self._fire(rule, None, delta))) for rule in self.rules]
+        delta = self._add_derived(derived)
+
+        # the following rounds join at least one literal with the latest delta
+        while delta:
+            derived = [
+                (rule, list(self._fire(rule, idx, delta)))
+                for rule in self.rules
+                for idx, (name, _) in enumerate(rule.body)
+                if name in delta
+            ]
+            delta = self._add_derived(derived)
+
+        return {name: relation.tuples for name, relation in self.relations.items()}
+
+
+def evaluate_program(program: Program, facts: Iterable[Fact]) -> Set[Fact]:
+    """Evaluates the program in Python, returning what `run_program` returns."""
+    relations = Evaluator(program).evaluate(facts)
+
+    return {
+        Fact(Literal(name, list(tup), True), [], False)
+        for name in program.outputs
+        for tup in relations.get(name, ())
+    }
@@ -0,0 +1,147 @@
+from symlog.souffle import Fact, Literal
+from symlog.utils import is_arg_symbolic
+import symlog.common as common
+
+from collections import defaultdict
+from itertools import chain, count
+from operator import attrgetter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Sequence, Set, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, grouping falls back to Python
+    np = None
+
+# Groups the output tuples of a meta-program by the values of their binding
+# columns, i.e., by assignments of symbolic constants, and keeps the tuples
+# matching an interested fact. Facts are only built for these tuples.
+
+_head_args = attrgetter("head.args")
+
+
+def _interested_by_relation(
+    interested_facts: Iterable[Fact],
+) -> Dict[Tuple[str, int], List[Sequence]]:
+    by_relation = defaultdict(list)
+    for fact in interested_facts:
+        by_relation[(fact.head.name, len(fact.head.args))].append(fact.head.args)
+    return by_relation
+
+
+def _group_rows(
+    rows: List[Fact], arg_num: int, patterns: List[Sequence]
+) -> Dict[Tuple, List[Fact]]:
+    # the Python version of `_group_columns`
+    symbolic = {}
+    groups = defaultdict(list)
+    for fact in rows:
+        args = fact.head.args
+        for pattern in patterns:
+            for arg, value in zip(args, pattern):
+                if arg != value:
+                    is_symbolic = symbolic.get(arg)
+                    if is_symbolic is None:
+                        is_symbolic = symbolic[arg] = is_arg_symbolic(arg)
+                    if not is_symbolic:
+                        break
+            else:
+                groups[tuple(args[arg_num:])].append(fact)
+                break
+    return groups
+
+
+def _group_columns(
+    rows: List[Fact], arg_num: int, patterns: List[Sequence]
+) -> Dict[Tuple, List[Fact]]:
+    # integer-encode the arguments, one row per tuple
+    codes = defaultdict(count().__next__)
+    size = len(rows[0].head.args)
+    encoded = np.fromiter(
+        map(codes.__getitem__, chain.from_iterable(map(_head_args, rows))),
+        dtype=np.int64,
+        count=len(rows) * size,
+    ).reshape(len(rows), size)
+    values = list(codes)
+    symbolic = np.fromiter(map(is_arg_symbolic, values), dtype=bool, count=len(values))
+
+    # a tuple matches if every argument equals that of the pattern or is symbolic
+    columns = encoded[:, :arg_num]
+    symbolic_columns = symbolic[columns]
+    matched = np.zeros(len(rows), dtype=bool)
+    for pattern in patterns:
+        pattern_codes = np.array([codes.get(value, -1) for value in pattern])
+        matched |= ((columns == pattern_codes) | symbolic_columns).all(axis=1)
+
+    selected = np.flatnonzero(matched)
+    if not len(selected):
+        return {}
+
+    bindings = encoded[selected, arg_num:]
+    if not bindings.shape[1]:
+        return {(): [rows[idx] for idx in selected]}
+
+    # sort the matched tuples by their binding columns to split them into groups
+    assignments, inverse = np.unique(bindings, axis=0, return_inverse=True)
+    order = np.argsort(inverse.reshape(-1), kind="stable")
+    bounds = np.flatnonzero(np.diff(inverse.reshape(-1)[order])) + 1
+
+    groups = {}
+    for assignment, indexes in zip(assignments, np.split(selected[order], bounds)):
+        groups[tuple(values[code] for code in assignment)] = [
+            rows[idx] for idx in indexes
+        ]
+    return groups
+
+
+def group_target_outputs(
+    output_facts: Iterable[Fact],
+    binding_num: int,
+    interested_facts: FrozenSet[Fact],
+    columnar: Optional[bool] = None,
+) -> Dict[Tuple, Set[Fact]]:
+    """Maps the assigned values to the target outputs under them.
+
+    The last `binding_num` arguments of the output facts are the assigned
+    values. The target outputs are the output facts without them that match an
+    interested fact, where symbolic arguments match any value. Assignments
+    without target outputs are left out.
+
+    :param columnar: Whether to group with numpy; by default, it is used if it
+        is installed and the relation has at least SYMLOG_COLUMNAR_MIN_ROWS
+        tuples, see benchmarks/bench_grouping.py
+    """
+    if columnar and np is None:
+        raise ValueError("Columnar grouping requires numpy.")
+
+    # the tuples of a relation have the same number of arguments
+    relations = defaultdict(list)
+    for fact in output_facts:
+        relations[fact.head.name].append(fact)
+
+    interested = _interested_by_relation(interested_facts)
+
+    targets = defaultdict(set)
+    for name, rows in relations.items():
+        arg_num = len(rows[0].head.args) - binding_num
+        assert arg_num > 0, "Output tuple has less args than the number of symbols?"
+        patterns = interested.get((name, arg_num))
+        if not patterns:
+            continue
+
+        use_numpy = (
+            np is not None and len(rows) >= common.COLUMNAR_MIN_ROWS
+            if columnar is None
+            else columnar
+        )
+        group = _group_columns if use_numpy else _group_rows
+        for assignment, facts in group(rows, arg_num, patterns).items():
+            targets[assignment].update(
+                Fact(
+                    Literal(name, fact.head.args[:arg_num], True),
+                    [],
+                    fact.symbolic_sign,
+                )
+                for fact in facts
+            )
+
+    return targets
@@ -0,0 +1,158 @@
+import symlog.common as common
+
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+from typing import Callable, Dict, Iterator
+import json
+import marshal
+import threading
+import time
+
+# Counters and timers of the stages of symbolic execution. They are switched
+# off by default, in which case recording them costs a flag check.
+
+_enabled = common.INSTRUMENTATION
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+# name -> [calls, total seconds, max seconds]
+_timers: Dict[str, list] = {}
+# names of the timers running in the current thread, to ignore nested calls
+_running = threading.local()
+
+_NULL_CONTEXT = nullcontext()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def reset():
+    """Drops all recorded counters and timers."""
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def count(name: str, n: int = 1):
+    """Adds n to the counter with the given name."""
+    if not _enabled:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def _record(name: str, calls: int, total: float, maximum: float):
+    with _lock:
+        timer = _timers.get(name)
+        if timer is None:
+            _timers[name] = [calls, total, maximum]
+        else:
+            timer[0] += calls
+            timer[1] += total
+            timer[2] = max(timer[2], maximum)
+
+
+@contextmanager
+def _timer(name: str) -> Iterator[None]:
+    running = _running.__dict__.setdefault("names", set())
+    if name in running:
+        # a nested call is part of the outer one
+        yield
+        return
+
+    running.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        running.discard(name)
+        _record(name, 1, elapsed, elapsed)
+
+
+def timer(name: str):
+    """Returns a context manager that times its body under the given name."""
+    if not _enabled:
+        return _NULL_CONTEXT
+    return _timer(name)
+
+
+def timed(name: str) -> Callable:
+    """Decorates a function to time its calls under the given name."""
+
+    def decorator(fn: Callable) -> Callable:
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with _timer(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def snapshot() -> dict:
+    """Returns a copy of the recorded counters and timers."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "timers": {
+                name: {"calls": calls, "total": total, "max": maximum}
+                for name, (calls, total, maximum) in _timers.items()
+            },
+        }
+
+
+def merge(stats: dict):
+    """Adds a snapshot, e.g. of a worker process, to the recorded values."""
+    with _lock:
+        for name, n in stats["counters"].items():
+            _counters[name] = _counters.get(name, 0) + n
+    for name, timer in stats["timers"].items():
+        _record(name, timer["calls"], timer["total"], timer["max"])
+
+
+def to_json(indent: int = 2) -> str:
+    return json.dumps(snapshot(), indent=indent, sort_keys=True)
+
+
+def export_json(path: str):
+    with open(path, "w") as file:
+        file.write(to_json())
+
+
+def dump_stats(path: str):
+    """Writes the timers in the format of `cProfile`, readable by `pstats.Stats`.
+
+    Every timer is a function of the pseudo file `symlog`. Stages contain other
+    stages, so the internal time of a timer equals its cumulative time.
+    """
+    stats = {}
+    for name, timer in snapshot()["timers"].items():
+        calls, total = timer["calls"], timer["total"]
+        stats[("symlog", 0, name)] = (calls, calls, total, total, {})
+    with open(path, "wb") as file:
+        marshal.dump(stats, file)
+
+
+def call_collecting(fn: Callable, *args, **kwargs):
+    """Calls fn with instrumentation on and returns (result, snapshot of the call).
+
+    Meant for worker processes, which run one task at a time.
+    """
+    enable()
+    reset()
+    result = fn(*args, **kwargs)
+    return result, snapshot()
@@ -0,0 +1,134 @@
+import symlog.common as common
+from symlog.souffle import Program, parse, souffle_grammar, LALR_PARSER
+from symlog.logger import get_logger
+
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from typing import Optional, Union
+import hashlib
+import os
+import pickle
+
+logger = get_logger(__name__)
+
+# bump when the pickled AST changes shape, so that old entries are ignored
+CACHE_FORMAT_VERSION = "1"
+
+_GRAMMAR_DIGEST = hashlib.sha256(souffle_grammar.encode()).hexdigest()
+
+
+class ParseCache:
+    """A cache of parsed programs, keyed by file path and content.
+
+    Entries are pickled `Program`s published atomically, so concurrent
+    processes may share the cache directory. An unreadable entry is treated as
+    a miss and overwritten. Least recently used entries are removed once the
+    entries take more than `max_bytes`.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.cache_dir = Path(
+            common.PARSE_CACHE_DIR if cache_dir is None else cache_dir
+        ).expanduser()
+        self.max_bytes = common.PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+
+    def key_for(self, program_path: str, program_str: str, parser: str) -> str:
+        sha256 = hashlib.sha256()
+        for part in (
+            CACHE_FORMAT_VERSION,
+            _GRAMMAR_DIGEST,
+            parser,
+            os.path.abspath(program_path),
+            program_str,
+        ):
+            sha256.update(part.encode())
+            sha256.update(b"\0")
+        return sha256.hexdigest()
+
+    def _path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pickle"
+
+    def get(self, key: str) -> Optional[Program]:
+        path = self._path_for(key)
+        try:
+            with path.open("rb") as file:
+                program = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring a corrupted parse cache entry {key}: {e}")
+            return None
+
+        # mark the entry as recently used
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass  # evicted concurrently
+        return program
+
+    def put(self, key: str, program: Program):
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with NamedTemporaryFile(
+            dir=self.cache_dir, prefix=".tmp_", delete=False
+        ) as temp_file:
+            try:
+                pickle.dump(program, temp_file, protocol=pickle.HIGHEST_PROTOCOL)
+            except BaseException:
+                os.unlink(temp_file.name)
+                raise
+        os.replace(temp_file.name, self._path_for(key))
+        self.evict()
+
+    def evict(self):
+        """Removes least recently used entries until the cache fits its limit."""
+        entries = []
+        for path in self.cache_dir.glob("*.pickle"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue  # evicted concurrently
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total_bytes = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_bytes <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total_bytes -= size
+
+    def parse(
+        self, program_path: str, program_str: str, parser: str = LALR_PARSER
+    ) -> Program:
+        """Returns the parsed program, parsing it only on a cache miss."""
+        key = self.key_for(program_path, program_str, parser)
+        program = self.get(key)
+        if program is None:
+            program = parse(program_str, parser)
+            try:
+                self.put(key, program)
+            except OSError as e:
+                logger.warning(f"Failed to write the parse cache: {e}")
+        return program
+
+    def clear(self):
+        """Removes all entries."""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.iterdir():
+            if path.suffix == ".pickle":
+                path.unlink(missing_ok=True)
+
+
+_default_cache = None
+
+
+def get_parse_cache() -> ParseCache:
+    """Returns the process-wide parse cache."""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = ParseCache()
+    return _default_cache
@@ -14,10 +14,11 @@ from symlog.souffle import (
     SYM,
     NUM,
     transform,
-    collect,
+    iter_collect,
 )
 from symlog.type_analyser import TypeAnalyser
 from symlog.syntax_checker import SyntaxChecker
+import symlog.instrumentation as instrumentation
 from symlog.utils import recursive_flatten
 from symlog.common import SYMBOLIC_CONSTANT_MAX_NUM
 
@@ -94,12 +95,14 @@ class ProgramBuilder:
         """
 
         # check syntax of rules and facts
-        syntax_checker = SyntaxChecker()
-        syntax_checker.check_syntax(rules, facts)
+        with instrumentation.timer("syntax_check"):
+            syntax_checker = SyntaxChecker()
+            syntax_checker.check_syntax(rules, facts)
 
         # infer the declarations of the program
-        type_analyser = TypeAnalyser()
-        declarations = type_analyser.infer_declarations(rules, facts)
+        with instrumentation.timer("type_inference"):
+            type_analyser = TypeAnalyser()
+            declarations = type_analyser.infer_declarations(rules, facts)
 
         # get the list of symbols
         symbol_list = ProgramBuilder.extract_symbols_from_facts(facts)
@@ -150,7 +153,7 @@ class ProgramBuilder:
         symbol_list = list(
             unique_everseen(
                 chain.from_iterable(
-                    collect(
+                    iter_collect(
                         f,
                         lambda x: isinstance(
                             x, (SymbolicStringWrapper, SymbolicNumberWrapper)
@@ -198,8 +201,9 @@ class ProgramBuilder:
     @staticmethod
     def preprocess_parsed_program(parsed_program, input_facts, outputs):
         # check syntax of rules and facts NOTE: must be done before dropping wrappers
-        syntax_checker = SyntaxChecker()
-        syntax_checker.check_syntax(parsed_program.rules, input_facts)
+        with instrumentation.timer("syntax_check"):
+            syntax_checker = SyntaxChecker()
+            syntax_checker.check_syntax(parsed_program.rules, input_facts)
 
         symbol_list = ProgramBuilder.extract_symbols_from_facts(input_facts)
         updated_facts = ProgramBuilder.drop_symbol_wrappers(input_facts)
@@ -1,6 +1,8 @@
-from symlog.souffle import Program, pprint, Fact, compile_and_run
+from symlog.souffle import Program, pprint, pprint_to, Fact
+from symlog.backends import execute
 from symlog.utils import is_sublist
 from symlog.program_builder import ProgramBuilder
+import symlog.instrumentation as instrumentation
 
 from subprocess import Popen, PIPE
 from tempfile import NamedTemporaryFile
@@ -74,7 +76,7 @@ class Provenancer:
         """Returns the dependent facts of the given fact in the given bare program and input facts."""
 
         # quick check if the target fact is derivable
-        derived_facts = compile_and_run(bare_program, facts=input_facts)
+        derived_facts = execute(bare_program, input_facts)
 
         if target_fact not in derived_facts:
             return []
@@ -91,9 +93,10 @@ class Provenancer:
     def _base_provenance(self, program: Program, target_fact: Fact) -> FrozenSet[Fact]:
         """Returns the provenance of the given fact in the given program."""
 
+        instrumentation.count("explain_calls")
         try:
-            with NamedTemporaryFile() as datalog_script:
-                datalog_script.write(pprint(program).encode())
+            with NamedTemporaryFile(mode="w") as datalog_script:
+                pprint_to(program, datalog_script)
                 datalog_script.flush()
 
                 cmd = [
@@ -165,6 +168,7 @@ class Provenancer:
                 return prev_result
         return None
 
+    @instrumentation.timed("monotonic_all")
     def monotonic_all(
         self, bare_program: Program, target_output: Fact, input_facts: Set[Fact]
     ) -> list:
@@ -173,6 +177,7 @@ class Provenancer:
         program_target_key = ProgramTargetKey(bare_program, target_output)
 
         def dfs(current_input_facts):
+            instrumentation.count("dfs_nodes")
             results = []
 
             # try to reuse the minimized input computed previously
@@ -1,7 +1,8 @@
 from symlog.souffle import Rule
-from symlog.symbolic_executor import symex
+from symlog.symbolic_executor import symex, symex_iter
 from symlog.logger import get_logger
 
+from contextlib import closing
 from typing import Set, List
 from z3 import Solver, sat, Not
 
@@ -15,24 +16,30 @@ def repair(
     wanted_out_facts: Set[Rule],
     unwanted_out_facts: Set[Rule],
 ):
+    solver = Solver()
+
     try:
         constraints_for_wanted = symex(rules, facts, wanted_out_facts)
-        constraints_for_unwanted = symex(rules, facts, unwanted_out_facts)
+        for out_condition in constraints_for_wanted.values():
+            solver.add(out_condition.to_z3())
+
+        logger.info("Searching raw patches...")
+        result = solver.check()
+        if result == sat:
+            # an unwanted fact must violate each of its conditions, so they are
+            # added while the others are still computed, and these are
+            # cancelled once the constraints conflict
+            with closing(symex_iter(rules, facts, unwanted_out_facts)) as conditions:
+                for _, condition in conditions:
+                    solver.add(Not(condition.to_z3()))
+                    result = solver.check()
+                    if result != sat:
+                        break
     except Exception as e:
         logger.error(f"Failed to generate constraints: {e}")
         return None
 
-    solver = Solver()
-
-    for constraint_dict, negate in [
-        (constraints_for_wanted, False),
-        (constraints_for_unwanted, True),
-    ]:
-        for _, out_condition in constraint_dict.items():
-            solver.add(Not(out_condition.to_z3()) if negate else out_condition.to_z3())
-
-    logger.info("Searching raw patches...")
-    if solver.check() == sat:
+    if result == sat:
         logger.info("Found raw patches.")
         model = solver.model()
         return model
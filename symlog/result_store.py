@@ -0,0 +1,196 @@
+import symlog.common as common
+from symlog.souffle import stable_digest
+from symlog.binary_cache import CacheStats
+from symlog.logger import get_logger
+
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Optional, Union
+import hashlib
+import importlib.metadata
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+@lru_cache(maxsize=None)
+def symlog_version() -> str:
+    """Returns the installed symlog version, or a digest of the sources of a
+    checkout that is not installed."""
+    try:
+        return importlib.metadata.version("symlog")
+    except importlib.metadata.PackageNotFoundError:
+        sha256 = hashlib.sha256()
+        for source in sorted(Path(__file__).parent.glob("*.py")):
+            sha256.update(source.read_bytes())
+        return f"0+{sha256.hexdigest()[:16]}"
+
+
+class ResultStore:
+    """A bounded store of symbolic execution results in an SQLite database.
+
+    Results are keyed by a digest of the rules or program, the input facts and
+    the interested output facts that is stable across processes. The database
+    runs in WAL mode, so that concurrent processes read while one of them
+    writes. Least recently used results are evicted once a limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        path: Optional[Union[str, Path]] = None,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+    ):
+        self.path = Path(
+            common.RESULT_STORE_PATH if path is None else path
+        ).expanduser()
+        self.max_entries = (
+            common.RESULT_STORE_MAX_ENTRIES if max_entries is None else max_entries
+        )
+        self.max_bytes = common.RESULT_STORE_MAX_BYTES if max_bytes is None else max_bytes
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+        # sqlite connections must not cross threads or forks
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(_SCHEMA)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def _count(self, name: str):
+        with self._stats_lock:
+            setattr(self.stats, name, getattr(self.stats, name) + 1)
+
+    def key_for(self, rules_or_program, input_facts, interested_output_facts) -> str:
+        sha256 = hashlib.sha256()
+        for part in (
+            # results of another symlog version may differ in shape or content
+            symlog_version(),
+            stable_digest(rules_or_program),
+            stable_digest(frozenset(input_facts)),
+            stable_digest(frozenset(interested_output_facts)),
+        ):
+            sha256.update(part.encode())
+            sha256.update(b"\0")
+        return sha256.hexdigest()
+
+    def get(self, key: str) -> Optional[Any]:
+        connection = self._connection()
+        row = connection.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            self._count("misses")
+            return None
+
+        try:
+            result = pickle.loads(row[0])
+        except Exception as e:
+            logger.warning(f"Ignoring a corrupted result store entry {key}: {e}")
+            connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            self._count("misses")
+            return None
+
+        # mark the entry as recently used
+        connection.execute(
+            "UPDATE results SET last_used = ? WHERE key = ?", (time.time(), key)
+        )
+        self._count("hits")
+        return result
+
+    def put(self, key: str, result: Any):
+        value = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        self._connection().execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (key, value, len(value), time.time()),
+        )
+        self._count("builds")
+        self.evict()
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def evict(self):
+        """Removes least recently used entries until the store fits its limits."""
+        connection = self._connection()
+        # an immediate transaction keeps concurrent writers from evicting twice
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            entry_num, total_bytes = connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+            if entry_num > self.max_entries or total_bytes > self.max_bytes:
+                evicted = []
+                for key, size in connection.execute(
+                    "SELECT key, size FROM results ORDER BY last_used"
+                ):
+                    if entry_num <= self.max_entries and total_bytes <= self.max_bytes:
+                        break
+                    evicted.append((key,))
+                    entry_num -= 1
+                    total_bytes -= size
+                connection.executemany("DELETE FROM results WHERE key = ?", evicted)
+                for _ in evicted:
+                    self._count("evictions")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+
+    def clear(self):
+        """Removes all entries."""
+        self._connection().execute("DELETE FROM results")
+
+
+_default_store = None
+_default_store_disabled = False
+_default_store_lock = threading.Lock()
+
+
+def get_result_store() -> Optional[ResultStore]:
+    """Returns the process-wide result store, or None if it is disabled."""
+    global _default_store
+    if not common.RESULT_STORE or _default_store_disabled:
+        return None
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ResultStore()
+        return _default_store
+
+
+def set_result_store(store: Optional[ResultStore]):
+    """Replaces the process-wide result store (None resets to the default)."""
+    global _default_store, _default_store_disabled
+    with _default_store_lock:
+        _default_store = store
+        _default_store_disabled = False
+
+
+def disable_result_store(reason: Exception):
+    """Stops using the process-wide result store, e.g. once it is unwritable."""
+    global _default_store_disabled
+    with _default_store_lock:
+        if not _default_store_disabled:
+            logger.warning(f"Disabling the result store: {reason}")
+        _default_store_disabled = True
@@ -1,6 +1,7 @@
 import symlog.souffle as souffle
 import symlog.symbolic_executor as symbolic_executor
 from symlog.program_builder import ProgramBuilder
+from symlog.parse_cache import get_parse_cache
 
 
 def Number(value):
@@ -43,12 +44,17 @@ def SymbolicConstant(name=None, type=souffle.SYM):
     return ProgramBuilder.SymbolicConstant(name, type)
 
 
-def parse(program_path):
+def parse(program_path, use_cache=True, parser=souffle.LALR_PARSER):
     """
     Parses the given program.
 
     :param program_path: The path of the program to be parsed
     :type program_path: str
+    :param use_cache: Whether to reuse the result of a previous parse of the same
+        file content
+    :type use_cache: bool
+    :param parser: The Lark parser to use, "lalr" or "earley"
+    :type parser: str
     :returns: The parsed program
     :rtype: Program
     """
@@ -60,7 +66,9 @@ def parse(program_path):
     except PermissionError:
         raise ValueError(f"Permission denied: {program_path}")
 
-    return souffle.parse(program_str)
+    if use_cache:
+        return get_parse_cache().parse(program_path, program_str, parser)
+    return souffle.parse(program_str, parser)
 
 
 def load_facts(directory_path, declarations, inputs=None):
@@ -100,3 +108,37 @@ def symex(rules, facts, interested_output_facts):
     :rtype: dict
     """
     return symbolic_executor.symex(rules, facts, interested_output_facts)
+
+
+def symex_iter(rules, facts, interested_output_facts, stop=None):
+    """Symbolically executes the given rules and facts, yielding the conditions of
+    the interested facts as soon as they are computed.
+
+    :param stop: Called with every yielded pair; returning True stops the execution
+    :type stop: callable
+    :returns: Pairs of an interested fact and a condition
+    :rtype: iterator
+    """
+    return symbolic_executor.symex_iter(rules, facts, interested_output_facts, stop)
+
+
+def symex_result(rules, facts, interested_output_facts):
+    """Symbolically executes the given rules and facts, keeping what an
+    incremental update needs.
+
+    :returns: The result, whose constraints are those returned by `symex`
+    :rtype: SymexResult
+    """
+    return symbolic_executor.symex_result(rules, facts, interested_output_facts)
+
+
+def symex_incremental(previous, added_facts=(), removed_facts=()):
+    """Updates a previous result of `symex_result` to changed input facts.
+
+    :param previous: The result of symbolically executing the old facts
+    :type previous: SymexResult
+    :param added_facts: The input facts that are added
+    :param removed_facts: The input facts that are removed
+    :rtype: SymexResult
+    """
+    return symbolic_executor.symex_incremental(previous, added_facts, removed_facts)
@@ -2,11 +2,15 @@ from tempfile import TemporaryDirectory, NamedTemporaryFile
 from pathlib import Path
 from subprocess import run, DEVNULL, CalledProcessError
 import itertools
+from operator import is_
 import csv
-from collections import namedtuple
+from collections import namedtuple, defaultdict, OrderedDict
 import os
 import hashlib
-from typing import List, Union, Callable, Optional, Set, Dict
+import json
+import io
+import threading
+from typing import List, Union, Callable, Optional, Set, Dict, Iterable, Iterator, TextIO
 from lark import Lark, Transformer, v_args, UnexpectedInput, LarkError, UnexpectedEOF
 
 
@@ -15,13 +19,34 @@ from symlog.common import (
     BINDING_VARIABLE_PREFIX,
     DOMAIN_PREDICATE_PREFIX,
     SYMLOG_NUM_POOL,
+    SOUFFLE_FILE_IO,
+    SOUFFLE_STREAM_IO,
+    SOUFFLE_IO_MODE,
+    GRAMMAR_CACHE_DIR,
+    INTERNING,
+    INTERN_POOL_MAX_SIZE,
 )
+from symlog.binary_cache import BinaryCache, get_binary_cache
 from symlog.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def _freeze(value):
+    """Returns a hashable value equal-hashing to any value equal to the given one."""
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(value)
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    return value
+
+
 class ExtendedNamedTuple:
+    # immutable nodes cache their hash and text on the instance
+    _is_mutable = False
+
     def __repr__(self):
         return pprint(self).replace("\n", "")
 
@@ -29,20 +54,110 @@ class ExtendedNamedTuple:
         return pprint(self).replace("\n", "")
 
     def __hash__(self):
-        return hash(pprint(self).replace("\n", ""))
+        if self._is_mutable:
+            return hash(tuple(map(_freeze, self)))
+
+        cached = self.__dict__.get("_hash")
+        if cached is None:
+            # the fields of rules, literals and facts are terms, nodes or flat
+            # lists of them
+            cached = hash(tuple([tuple(f) if type(f) is list else f for f in self]))
+            self.__dict__["_hash"] = cached
+        return cached
+
+    def __reduce__(self):
+        # the cached hash and text are not part of the state; in particular,
+        # string hashes differ between processes
+        return (self.__class__, tuple(self))
+
+
+def namedtuple_with_methods(namedtuple_cls, is_mutable=False):
+    return type(
+        namedtuple_cls.__name__,
+        (ExtendedNamedTuple, namedtuple_cls),
+        {"_is_mutable": is_mutable},
+    )
+
+
+# Hash-consing: constructing a term, literal or fact equal to a live one returns
+# the existing object. Terms are keyed by their value and type, literals and facts
+# by the identities of their (interned) children, so equal nodes share one object
+# and comparisons of interned children succeed on identity. Only literals and
+# facts whose arguments or body are tuples are interned, so that no two nodes
+# share a mutable list. Tuple subclasses cannot be weakly referenced, hence the
+# pools hold their nodes strongly and drop the least recently used ones beyond
+# INTERN_POOL_MAX_SIZE; dropped nodes stay valid.
+_interning = INTERNING
+_intern_pools: Dict[type, OrderedDict] = {}
+
+
+def set_interning(enabled: bool):
+    """Enables or disables interning of newly constructed nodes."""
+    global _interning
+    _interning = enabled
+    if not enabled:
+        clear_intern_pools()
+
+
+def clear_intern_pools():
+    for pool in _intern_pools.values():
+        pool.clear()
+
+
+def intern_pool_sizes() -> Dict[str, int]:
+    return {cls.__name__: len(pool) for cls, pool in _intern_pools.items()}
 
 
-def namedtuple_with_methods(namedtuple_cls):
-    return type(namedtuple_cls.__name__, (ExtendedNamedTuple, namedtuple_cls), {})
+def _intern(cls, key, fields):
+    pool = _intern_pools[cls]
+    node = pool.get(key)
+    if node is None:
+        node = pool[key] = tuple.__new__(cls, fields)
+        if len(pool) > INTERN_POOL_MAX_SIZE:
+            pool.popitem(last=False)
+    else:
+        try:
+            pool.move_to_end(key)
+        except KeyError:
+            # dropped by another thread meanwhile
+            pass
+    return node
+
+
+def _interned_term(namedtuple_cls):
+    """Returns a subclass of the term type whose instances are interned."""
+
+    def __new__(cls, value):
+        if not _interning:
+            return tuple.__new__(cls, (value,))
+        return _intern(cls, (value.__class__, value), (value,))
+
+    def _make(cls, iterable):
+        return cls(*iterable)
+
+    cls = type(
+        namedtuple_cls.__name__,
+        (namedtuple_cls,),
+        {
+            "__slots__": (),
+            "__new__": __new__,
+            "_make": classmethod(_make),
+            # interned terms are immutable
+            "__copy__": lambda self: self,
+            "__deepcopy__": lambda self, memo: self,
+        },
+    )
+    _intern_pools[cls] = OrderedDict()
+    return cls
 
 
 # relation_decls: name -> argument types
 # output: list of names
 # rules: list of rules
 
-Variable = namedtuple("Variable", ["name"])
-String = namedtuple("String", ["value"])
-Number = namedtuple("Number", ["value"])
+Variable = _interned_term(namedtuple("Variable", ["name"]))
+String = _interned_term(namedtuple("String", ["value"]))
+Number = _interned_term(namedtuple("Number", ["value"]))
 Underscore = namedtuple("UnderScore", [])
 
 
@@ -95,6 +210,30 @@ SymbolicNumberWrapper = namedtuple("SymbolicNumberWrapper", ["name", "payload"])
 Rule = namedtuple_with_methods(namedtuple("Rule", ["head", "body"]))
 Literal = namedtuple_with_methods(namedtuple("Literal", ["name", "args", "positive"]))
 Fact = namedtuple_with_methods(namedtuple("Fact", ["head", "body", "symbolic_sign"]))
+
+
+def _new_literal(cls, name, args, positive):
+    if not _interning or type(args) is not tuple:
+        return tuple.__new__(cls, (name, args, positive))
+    return _intern(cls, (name, positive, *map(id, args)), (name, args, positive))
+
+
+def _new_fact(cls, head, body, symbolic_sign):
+    if not _interning or type(body) is not tuple:
+        return tuple.__new__(cls, (head, body, symbolic_sign))
+    return _intern(
+        cls, (id(head), symbolic_sign, *map(id, body)), (head, body, symbolic_sign)
+    )
+
+
+def _make_node(cls, iterable):
+    return cls(*iterable)
+
+
+for _cls, _new in ((Literal, _new_literal), (Fact, _new_fact)):
+    _cls.__new__ = _new
+    _cls._make = classmethod(_make_node)
+    _intern_pools[_cls] = OrderedDict()
 Program = namedtuple_with_methods(
     namedtuple(
         "Program",
@@ -106,7 +245,8 @@ Program = namedtuple_with_methods(
             "facts",
             "symbols",
         ],
-    )
+    ),
+    is_mutable=True,
 )
 
 # types
@@ -114,7 +254,7 @@ SYM = "symbol"
 NUM = "number"
 
 
-souffle_grammar = """
+souffle_grammar = r"""
     start: (relation_decl | rule | fact | directive | output | input )*
     directive: "#" NAME ESCAPED_STRING
     relation_decl: ".decl" NAME "(" [typed_var ("," typed_var)*] ")"
@@ -201,169 +341,291 @@ class ASTConstructor(Transformer):
         return self.program
 
 
-def pprint(node):
-    def pprint_inner(node):
-        if isinstance(node, Program):
-            return pprint_program(node)
-        if isinstance(node, Rule):
-            return pprint_rule(node)
-        if isinstance(node, Literal):
-            return pprint_literal(node)
-        if isinstance(node, Variable):
-            return pprint_term(node)
-        if isinstance(node, String):
-            return pprint_term(node)
-        if isinstance(node, Number):
-            return pprint_term(node)
-        if isinstance(node, SymbolicNumber):
-            return pprint_term(node)
-        if isinstance(node, SymbolicString):
-            return pprint_term(node)
-        if isinstance(node, Fact):
-            return pprint_fact(node)
-        raise NotImplementedError(f"pprint for {type(node)} is not implemented")
-
-    def pprint_term(term):
-        if isinstance(term, Variable):
-            return term.name
-        elif isinstance(term, String):
-            return '"' + term.value.replace('"', "") + '"'
-        elif isinstance(term, SymbolicString):
-            return '"' + term.name + '"'
-        elif isinstance(term, SymbolicNumber):
-            return str(term.name)
-        elif isinstance(term, Number):
-            return str(term.value)
-        elif isinstance(term, SymbolicNumberWrapper):
-            return str(term.payload.name)
-        elif isinstance(term, SymbolicStringWrapper):
-            return str(term.payload.name)
-        elif isinstance(term, Underscore):
-            return "_"
-        else:
-            assert False, f"unknown term {term}. Bug?"
+def _pprint_term(term) -> str:
+    try:
+        return _TERM_PRINTERS[type(term)](term)
+    except KeyError:
+        assert False, f"unknown term {term}. Bug?"
 
-    def pprint_literal(l):
-        literal_result = ""
-        if not l.positive:
-            literal_result += "!"
-        args_result = ", ".join([pprint_term(t) for t in l.args])
-        literal_result += f"{l.name}({args_result})"
-        return literal_result
 
-    def pprint_rule(rule):
-        result = ""
-        result += pprint_literal(rule.head)
+def _pprint_literal(l) -> str:
+    cached = l.__dict__.get("_pprint")
+    if cached is None:
+        args_result = ", ".join([_pprint_term(t) for t in l.args])
+        cached = f"{'' if l.positive else '!'}{l.name}({args_result})"
+        l.__dict__["_pprint"] = cached
+    return cached
 
+
+def _pprint_rule(rule) -> str:
+    cached = rule.__dict__.get("_pprint")
+    if cached is None:
+        cached = _pprint_literal(rule.head)
         if rule.body:
-            result += " :- "
             body_results = []
-            if rule.body:
-                for el in rule.body:
-                    if isinstance(el, Literal):
-                        body_results.append(pprint_literal(el))
-                    else:
-                        raise ValueError(f"unknown body element {el}")
-            result += ", ".join(body_results) + ".\n"
-        return result
-
-    def pprint_fact(fact):
+            for el in rule.body:
+                if isinstance(el, Literal):
+                    body_results.append(_pprint_literal(el))
+                else:
+                    raise ValueError(f"unknown body element {el}")
+            cached += " :- " + ", ".join(body_results) + ".\n"
+        rule.__dict__["_pprint"] = cached
+    return cached
+
+
+def _pprint_fact(fact) -> str:
+    cached = fact.__dict__.get("_pprint")
+    if cached is None:
         assert not fact.body, "fact body is not empty. Bug?"
-        result = ""
-        result += pprint_literal(fact.head)
-        result += ".\n"
-        return result
+        cached = _pprint_literal(fact.head) + ".\n"
+        fact.__dict__["_pprint"] = cached
+    return cached
 
-    def pprint_program(program):
-        result = ""
 
-        for name, types in program.declarations.items():
-            result += f".decl {name}("
-            types_results = [f"v{i}:{t}" for i, t in enumerate(types)]
-            result += ", ".join(types_results) + ")\n"
+def _pprint_declaration(name, types) -> str:
+    types_results = [f"v{i}:{t}" for i, t in enumerate(types)]
+    return f".decl {name}(" + ", ".join(types_results) + ")\n"
 
-        for name in program.inputs:
-            result += f".input {name}\n"
 
-        for name in program.outputs:
-            result += f".output {name}\n"
+def _pprint_program_to(program, stream: TextIO):
+    for name, types in program.declarations.items():
+        stream.write(_pprint_declaration(name, types))
 
-        for rule in program.rules:
-            result += pprint_rule(rule)
+    for name in program.inputs:
+        stream.write(f".input {name}\n")
 
-        for fact in program.facts:
-            result += pprint_fact(fact)
+    for name in program.outputs:
+        stream.write(f".output {name}\n")
 
-        return result
+    for rule in program.rules:
+        stream.write(_pprint_rule(rule))
 
-    return pprint_inner(node)
+    for fact in program.facts:
+        stream.write(_pprint_fact(fact))
 
 
-def transform(node, f):
-    def transform_inner(node, f):
-        if (
-            isinstance(node, Variable)
-            or isinstance(node, String)
-            or isinstance(node, Number)
-            or isinstance(node, SymbolicNumber)
-            or isinstance(node, SymbolicString)
-            or isinstance(node, SymbolicNumberWrapper)
-            or isinstance(node, SymbolicStringWrapper)
-        ):
-            return transform_term(node, f)
-
-        if isinstance(node, Literal):
-            return transform_literal(node, f)
-        if isinstance(node, Rule):
-            return transform_rule(node, f)
-        if isinstance(node, Fact):
-            return transform_fact(node, f)
-        if isinstance(node, Program):
-            return transform_program(node, f)
-
-    def transform_term(t, f):
-        return f(t)
-
-    def transform_literal(l, f):
-        return f(Literal(l.name, [transform_term(t, f) for t in l.args], l.positive))
-
-    def transform_rule(rule, f):
-        return f(
-            Rule(
-                transform_literal(rule.head, f),
-                [transform_inner(n, f) for n in rule.body] if rule.body else [],
-            )
-        )
+_TERM_PRINTERS = {
+    Variable: lambda term: term.name,
+    String: lambda term: '"' + term.value.replace('"', "") + '"',
+    SymbolicString: lambda term: '"' + term.name + '"',
+    SymbolicNumber: lambda term: str(term.name),
+    Number: lambda term: str(term.value),
+    SymbolicNumberWrapper: lambda term: str(term.payload.name),
+    SymbolicStringWrapper: lambda term: str(term.payload.name),
+    Underscore: lambda term: "_",
+}
+
+# the nodes that can be printed on their own; rules, literals and facts cache
+# their text, since they are immutable
+_NODE_PRINTERS = {
+    Rule: _pprint_rule,
+    Literal: _pprint_literal,
+    Fact: _pprint_fact,
+    Variable: _pprint_term,
+    String: _pprint_term,
+    Number: _pprint_term,
+    SymbolicNumber: _pprint_term,
+    SymbolicString: _pprint_term,
+}
+
+
+def pprint_to(node, stream: TextIO):
+    """Writes the Souffle text of the node to the given text stream."""
+    if isinstance(node, Program):
+        _pprint_program_to(node, stream)
+        return
+
+    for node_type, printer in _NODE_PRINTERS.items():
+        if isinstance(node, node_type):
+            stream.write(printer(node))
+            return
+    raise NotImplementedError(f"pprint for {type(node)} is not implemented")
 
-    def transform_fact(fact, f):
-        return f(
-            Fact(
-                transform_literal(fact.head, f),
-                [],
-                fact.symbolic_sign,
+
+def pprint(node) -> str:
+    """Returns the Souffle text of the node."""
+    printer = _NODE_PRINTERS.get(type(node))
+    if printer is not None:
+        return printer(node)
+
+    stream = io.StringIO()
+    pprint_to(node, stream)
+    return stream.getvalue()
+
+
+class _HashStream:
+    def __init__(self):
+        self.hash = hashlib.sha256()
+
+    def write(self, text: str):
+        self.hash.update(text.encode())
+
+
+def program_digest(program) -> str:
+    """Returns the sha256 hex digest of the program text without building it.
+
+    Souffle programs do not depend on the order of their declarations, rules and
+    facts, so the digest does not either. Programs built from sets of rules and
+    facts have no order that is stable across processes.
+    """
+    stream = _HashStream()
+    declarations = program.declarations
+    for name in sorted(declarations):
+        stream.write(_pprint_declaration(name, declarations[name]))
+    for name in sorted(program.inputs):
+        stream.write(f".input {name}\n")
+    for name in sorted(program.outputs):
+        stream.write(f".output {name}\n")
+    for text in sorted(map(_pprint_rule, program.rules)):
+        stream.write(text)
+    for text in sorted(map(_pprint_fact, program.facts)):
+        stream.write(text)
+    return stream.hash.hexdigest()
+
+
+def _canonical(value) -> str:
+    """Returns a text that identifies the value independently of the process."""
+    if isinstance(value, ExtendedNamedTuple) and not value._is_mutable:
+        cached = value.__dict__.get("_canonical")
+        if cached is None:
+            cached = (
+                type(value).__name__ + "(" + ",".join(map(_canonical, value)) + ")"
+            )
+            value.__dict__["_canonical"] = cached
+        return cached
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        return type(value).__name__ + "(" + ",".join(map(_canonical, value)) + ")"
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(map(_canonical, value)) + "]"
+    if isinstance(value, (set, frozenset)):
+        return "{" + ",".join(sorted(map(_canonical, value))) + "}"
+    if isinstance(value, dict):
+        return (
+            "{"
+            + ",".join(
+                sorted(_canonical(k) + ":" + _canonical(v) for k, v in value.items())
             )
+            + "}"
         )
+    if isinstance(value, str):
+        return json.dumps(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)
+    raise TypeError(f"Cannot digest {type(value)}")
+
+
+def stable_digest(value) -> str:
+    """Returns a sha256 hex digest of the value that is stable across processes.
+
+    Unlike `program_digest`, the digest covers the structure of the value, e.g.
+    the symbols of a program and the symbolic signs of facts, and sets are
+    digested independently of their iteration order.
+    """
+    return hashlib.sha256(_canonical(value).encode()).hexdigest()
+
+
+TERM_TYPES = (
+    Variable,
+    String,
+    Number,
+    SymbolicNumber,
+    SymbolicString,
+    SymbolicNumberWrapper,
+    SymbolicStringWrapper,
+)
 
-    def transform_program(program, f):
-        return f(
-            Program(
-                program.declarations,
-                program.inputs,
-                program.outputs,
-                [transform_rule(r, f) for r in program.rules],
-                [transform_fact(fact, f) for fact in program.facts],
-                program.symbols,
-            )
+
+class _DispatchTable(dict):
+    """Maps node types to handlers, resolving subclasses through their bases."""
+
+    def __missing__(self, cls):
+        for base in cls.__mro__[1:]:
+            if base in self:
+                handler = self[cls] = dict.__getitem__(self, base)
+                return handler
+        self[cls] = None
+        return None
+
+
+# The AST has a fixed depth (program, rule or fact, literal, term), so the
+# handlers below are flat loops over the levels instead of a recursion.
+
+
+def _transform_term(term, f):
+    return f(term)
+
+
+def _transform_literal(literal, f):
+    args = literal.args
+    new_args = [f(t) for t in args]
+    if all(map(is_, new_args, args)):
+        # share unchanged nodes
+        return f(literal)
+    return f(Literal(literal.name, new_args, literal.positive))
+
+
+def _transform_rule(rule, f):
+    head = _transform_literal(rule.head, f)
+    body = rule.body
+    if not body:
+        new_body = []
+    else:
+        new_body = []
+        for n in body:
+            handler = _TRANSFORMERS[type(n)]
+            new_body.append(None if handler is None else handler(n, f))
+    if head is rule.head and body is not None and all(map(is_, new_body, body)):
+        return f(rule)
+    return f(Rule(head, new_body))
+
+
+def _transform_fact(fact, f):
+    head = _transform_literal(fact.head, f)
+    if head is fact.head and fact.body == []:
+        return f(fact)
+    return f(Fact(head, [], fact.symbolic_sign))
+
+
+def _transform_program(program, f):
+    # programs are mutable, hence always copied
+    return f(
+        Program(
+            program.declarations,
+            program.inputs,
+            program.outputs,
+            [_transform_rule(r, f) for r in program.rules],
+            [_transform_fact(fact, f) for fact in program.facts],
+            program.symbols,
         )
+    )
 
-    # re-orgainze the program, since the transform function may convert facts to rules
-    tmp_inner = transform_inner(node, f)
+
+_TRANSFORMERS = _DispatchTable(
+    {
+        **{term_type: _transform_term for term_type in TERM_TYPES},
+        Literal: _transform_literal,
+        Rule: _transform_rule,
+        Fact: _transform_fact,
+        Program: _transform_program,
+    }
+)
+
+
+def transform(node, f):
+    """Applies f bottom-up to every node and returns the transformed node.
+
+    A node whose children are all returned unchanged is passed to f as is, so
+    untouched subtrees are shared with the original node.
+    """
+    handler = _TRANSFORMERS[type(node)]
+    tmp_inner = None if handler is None else handler(node, f)
     if not isinstance(tmp_inner, Program):
         return tmp_inner
 
+    # re-orgainze the program, since the transform function may convert facts to rules
     rules = []
     facts = []
-    for fact_rule in tmp_inner.facts + tmp_inner.rules:
+    for fact_rule in itertools.chain(tmp_inner.facts, tmp_inner.rules):
         if isinstance(fact_rule, Rule):
             rules.append(fact_rule)
         elif isinstance(fact_rule, Fact):
@@ -380,118 +642,87 @@ def transform(node, f):
     )
 
 
-def collect(node, p):
-    result = []
-
-    def collect_inner(node, p):
-        if (
-            isinstance(node, Variable)
-            or isinstance(node, String)
-            or isinstance(node, Number)
-            or isinstance(node, SymbolicNumber)
-            or isinstance(node, SymbolicString)
-            or isinstance(node, SymbolicNumberWrapper)
-            or isinstance(node, SymbolicStringWrapper)
-        ):
-            collect_term(node, p)
-
-        if isinstance(node, Literal):
-            collect_literal(node, p)
-        if isinstance(node, Rule):
-            collect_rule(node, p)
-        if isinstance(node, Fact):
-            collect_fact(node, p)
-        if isinstance(node, Program):
-            collect_program(node, p)
-
-    def collect_term(t, p):
-        if p(t):
-            result.append(t)
-
-    def collect_literal(literal, p):
-        for a in literal.args:
-            collect_term(a, p)
-        if p(literal):
-            result.append(literal)
-
-    def collect_rule(rule, p):
-        collect_inner(rule.head, p)
-        if rule.body:
-            for el in rule.body:
-                collect_inner(el, p)
-        if p(rule):
-            result.append(rule)
+def _list_term(term, out):
+    out.append(term)
 
-    def collect_fact(fact, p):
-        collect_inner(fact.head, p)
 
-        assert not fact.body, "fact body is not empty. Bug?"
+def _list_literal(literal, out):
+    out.extend(literal.args)
+    out.append(literal)
 
-        if p(fact):
-            result.append(fact)
 
-    def collect_program(program, p):
-        for r in program.rules:
-            collect_rule(r, p)
-        for fact in program.facts:
-            collect_fact(fact, p)
+def _list_rule(rule, out):
+    _list_literal(rule.head, out)
+    if rule.body:
+        for n in rule.body:
+            lister = _LISTERS[type(n)]
+            if lister is not None:
+                lister(n, out)
+    out.append(rule)
 
-        if p(program):
-            result.append(program)
 
-    collect_inner(node, p)
-    return result
+def _list_fact(fact, out):
+    _list_literal(fact.head, out)
+    assert not fact.body, "fact body is not empty. Bug?"
+    out.append(fact)
 
 
-def walk(node, f):
-    def walk_inner(node, f):
-        if (
-            isinstance(node, Variable)
-            or isinstance(node, String)
-            or isinstance(node, Number)
-            or isinstance(node, SymbolicNumber)
-            or isinstance(node, SymbolicString)
-            or isinstance(node, SymbolicNumberWrapper)
-            or isinstance(node, SymbolicStringWrapper)
-        ):
-            walk_term(node, f)
-        if isinstance(node, Literal):
-            walk_literal(node, f)
-        if isinstance(node, Rule):
-            walk_rule(node, f)
-        if isinstance(node, Fact):
-            walk_fact(node, f)
-        if isinstance(node, Program):
-            walk_program(node, f)
-
-    def walk_term(t, f):
-        f(t)
-
-    def walk_literal(literal, f):
-        for a in literal.args:
-            walk_term(a, f)
-        f(literal)
-
-    def walk_rule(rule, f):
-        walk_literal(rule.head, f)
-        if rule.body:
-            for bl in rule.body:
-                walk_inner(bl, f)
-        f(rule)
+_LISTERS = _DispatchTable(
+    {
+        **{term_type: _list_term for term_type in TERM_TYPES},
+        Literal: _list_literal,
+        Rule: _list_rule,
+        Fact: _list_fact,
+    }
+)
 
-    def walk_fact(fact, f):
-        walk_literal(fact.head, f)
-        assert not fact.body, "fact body is not empty. Bug?"
-        f(fact)
 
-    def walk_program(program, f):
-        for r in program.rules:
-            walk_rule(r, f)
-        for fact in program.facts:
-            walk_fact(fact, f)
-        f(program)
+def _list_nodes(node, out):
+    if isinstance(node, Program):
+        for r in node.rules:
+            _list_rule(r, out)
+        for fact in node.facts:
+            _list_fact(fact, out)
+        out.append(node)
+        return
+
+    lister = _LISTERS[type(node)]
+    if lister is not None:
+        lister(node, out)
+
+
+def iter_nodes(node) -> Iterator:
+    """Yields the node and all nodes below it in post-order."""
+    if not isinstance(node, Program):
+        out = []
+        _list_nodes(node, out)
+        yield from out
+        return
+
+    # programs are expanded one rule or fact at a time
+    for n in itertools.chain(node.rules, node.facts):
+        out = []
+        _list_nodes(n, out)
+        yield from out
+    yield node
 
-    walk_inner(node, f)
+
+def iter_collect(node, p) -> Iterator:
+    """Lazily yields the nodes satisfying p, in the order of `collect`."""
+    return filter(p, iter_nodes(node))
+
+
+def collect(node, p):
+    out = []
+    _list_nodes(node, out)
+    return list(filter(p, out))
+
+
+def walk(node, f):
+    out = []
+    _list_nodes(node, out)
+    for n in out:
+        f(n)
 
 
 def user_arg_check(raw_arg: Union[str, int]) -> Union[str, int]:
@@ -536,12 +767,37 @@ def to_symlog_arg(
         raise ValueError(f"unknown type {type(raw_arg)}")
 
 
-souffle_parser = Lark(souffle_grammar)
+LALR_PARSER = "lalr"
+EARLEY_PARSER = "earley"
+
+_parsers = {}
+
 
+def get_parser(parser: str = LALR_PARSER) -> Lark:
+    """Returns the parser of the given kind, building it on first use.
+
+    The analysis of the LALR grammar is serialized into the cache directory, so
+    later processes load the parse table instead of recomputing it.
+    """
+    if parser not in _parsers:
+        if parser == LALR_PARSER:
+            try:
+                os.makedirs(GRAMMAR_CACHE_DIR, exist_ok=True)
+                cache = os.path.join(GRAMMAR_CACHE_DIR, "souffle_lalr.lark")
+            except OSError as e:
+                logger.warning(f"Not caching the parse table: {e}")
+                cache = False
+            _parsers[parser] = Lark(souffle_grammar, parser=LALR_PARSER, cache=cache)
+        elif parser == EARLEY_PARSER:
+            _parsers[parser] = Lark(souffle_grammar, parser=EARLEY_PARSER)
+        else:
+            raise ValueError(f"Unknown parser: {parser}")
+    return _parsers[parser]
 
-def parse(program_str):
+
+def parse(program_str, parser: str = LALR_PARSER):
     try:
-        return ASTConstructor().transform(souffle_parser.parse(program_str))
+        return ASTConstructor().transform(get_parser(parser).parse(program_str))
 
     except (UnexpectedEOF, UnexpectedInput) as e:
         error_location = f"line {e.line}, column {e.column}"
@@ -577,41 +833,94 @@ def load_facts(
 
         with file.open() as csvfile:
             reader = csv.reader(csvfile, delimiter="\t")
-            for row in reader:
-                try:
-                    facts.add(
-                        Fact(
-                            Literal(
-                                relation_name,
-                                [
-                                    to_symlog_arg(
-                                        ra,
-                                        declarations[relation_name][idx],
-                                        check_func,
-                                    )
-                                    for idx, ra in enumerate(row)
-                                ],
-                                True,
-                            ),
-                            [],
-                            False,
-                        )
-                    )
-                except KeyError:
-                    logger.error(
-                        f"Relation {relation_name} is not declared in the program.",
-                        exc_info=False,
-                    )
-                    exit(1)
-                except IndexError:
-                    logger.error(
-                        f"Too many arguments for relation {relation_name}.",
-                        exc_info=False,
-                    )
-                    exit(1)
+            facts.update(rows_to_facts(relation_name, reader, declarations, check_func))
     return facts
 
 
+def _column_decoder(
+    decl_type: str, check_func: Optional[Callable], interned: Dict
+) -> Callable[[str], Union[String, Number]]:
+    """Returns a function converting raw values of a column with the given type."""
+
+    if decl_type == SYM:
+
+        def decode(raw_arg):
+            try:
+                return interned[raw_arg]
+            except KeyError:
+                arg = String(check_func(raw_arg) if check_func else raw_arg)
+                interned[raw_arg] = arg
+                return arg
+
+    elif decl_type == NUM:
+
+        def decode(raw_arg):
+            try:
+                return interned[raw_arg]
+            except KeyError:
+                # not memoised, since invalid numbers are reported every time
+                arg = to_symlog_arg(raw_arg, decl_type, check_func)
+                if arg is not None:
+                    interned[raw_arg] = arg
+                return arg
+
+    else:
+
+        def decode(raw_arg):
+            return to_symlog_arg(raw_arg, decl_type, check_func)
+
+    return decode
+
+
+def rows_to_facts(
+    relation_name: str,
+    rows: Iterable[List[str]],
+    declarations: Dict[str, List[str]],
+    check_func: Optional[Callable] = None,
+) -> Iterator[Fact]:
+    """Converts raw rows of the given relation to facts."""
+    try:
+        decl_types = declarations[relation_name]
+    except KeyError:
+        decl_types = None
+
+    # raw symbols and numbers repeat a lot, so their terms are shared
+    interned = defaultdict(dict)
+    decoders = None
+    arity = 0
+
+    for row in rows:
+        if decoders is None:
+            if decl_types is None:
+                logger.error(
+                    f"Relation {relation_name} is not declared in the program.",
+                    exc_info=False,
+                )
+                exit(1)
+            decoders = [
+                _column_decoder(decl_type, check_func, interned[decl_type])
+                for decl_type in decl_types
+            ]
+            arity = len(decoders)
+
+        if len(row) > arity:
+            logger.error(
+                f"Too many arguments for relation {relation_name}.",
+                exc_info=False,
+            )
+            exit(1)
+
+        yield Fact(
+            Literal(
+                relation_name,
+                [decode(ra) for decode, ra in zip(decoders, row)],
+                True,
+            ),
+            [],
+            False,
+        )
+
+
 def user_load_facts(
     directory: Union[str, Path], declarations: Dict[str, List[str]], inputs: List[str]
 ) -> Set[Fact]:
@@ -622,44 +931,66 @@ def write_facts(directory, facts):
     """write facts to directory"""
     Path(directory).mkdir(parents=True, exist_ok=True)
 
-    # sort facts by their name
-    sorted_facts = sorted(facts, key=lambda fact: fact.head.name)
-
     # group facts by their name
-    grouped_facts = itertools.groupby(sorted_facts, key=lambda fact: fact.head.name)
+    grouped_facts = defaultdict(list)
+    for fact in facts:
+        grouped_facts[fact.head.name].append(fact)
 
-    for name, facts_group in grouped_facts:
+    for name, facts_group in grouped_facts.items():
         file_path = Path(directory) / (name + ".facts")
 
         with file_path.open(mode="w") as file:
             writer = csv.writer(file, delimiter="\t")
+            writer.writerows(map(fact_to_row, facts_group))
 
-            for fact in facts_group:
-                writer.writerow(
-                    pprint(arg).replace('"', "").replace("'", "")
-                    for arg in fact.head.args
-                )
+
+def _strip_quotes(raw: str) -> str:
+    return raw.replace('"', "").replace("'", "")
 
 
-def compile_and_run(program, facts):
+# converts an argument of a fact to its raw value, like pprint with the quotes removed
+_ARG_ENCODERS = {
+    String: lambda arg: _strip_quotes(arg.value),
+    Number: lambda arg: str(arg.value),
+    SymbolicString: lambda arg: _strip_quotes(arg.name),
+    SymbolicNumber: lambda arg: str(arg.name),
+    SymbolicStringWrapper: lambda arg: _strip_quotes(str(arg.payload.name)),
+    SymbolicNumberWrapper: lambda arg: str(arg.payload.name),
+    Variable: lambda arg: _strip_quotes(arg.name),
+    Underscore: lambda arg: "_",
+}
+
+
+def _encode_arg(arg) -> str:
+    try:
+        return _ARG_ENCODERS[type(arg)](arg)
+    except KeyError:
+        return pprint(arg).replace('"', "").replace("'", "")
+
+
+def fact_to_row(fact: Fact) -> List[str]:
+    """Converts a fact to the raw row that Souffle reads."""
+    return [_encode_arg(arg) for arg in fact.head.args]
+
+
+def _compiled_binary(program, hex_dig: Optional[str] = None):
+    """Returns the cache key of the program's binary and a function building it."""
+
     # hash the content to create a unique identifier
-    encoded_program = pprint(program).encode()
-    hash_object = hashlib.sha256(encoded_program)
-    hex_dig = hash_object.hexdigest()
+    if hex_dig is None:
+        hex_dig = program_digest(program)
 
     binary_name = f"binary_{hex_dig}"
 
-    if not os.path.exists(binary_name):
-        # if binary doesn't exist, write the content to a temp file, compile, and rename binary
-        with NamedTemporaryFile(delete=False, suffix=".dl") as temp_file:
-            temp_file.write(encoded_program)
-            temp_file.flush()
-
-        temp_binary_name = os.path.splitext(temp_file.name)[0]
-        compile_command = ["souffle", "-o", temp_binary_name, temp_file.name, "-w"]
+    def build(binary_path):
+        # write the content to a temp file next to the binary and compile it
+        source_path = binary_path.with_suffix(".dl")
+        with source_path.open("w") as source_file:
+            pprint_to(program, source_file)
+        compile_command = ["souffle", "-o", str(binary_path), str(source_path), "-w"]
 
         try:
-            logger.info(f"Compiling {temp_file.name}...")
+            logger.info(f"Compiling {binary_name}...")
             run(compile_command, check=True)
         except CalledProcessError:
             logger.error(
@@ -668,37 +999,207 @@ def compile_and_run(program, facts):
             )
             exit(1)
 
-        # rename compiled binary to our hashed name
-        os.rename(temp_binary_name, binary_name)
+    return binary_name, build
 
-        # cleanup temp file
-        os.remove(temp_file.name)
 
-    # execute the binary
-    with TemporaryDirectory() as input_directory:
-        write_facts(input_directory, facts)
-        with TemporaryDirectory() as output_directory:
-            cmd = [
-                "./" + binary_name,
-                "-F",
-                input_directory,
-                "-D",
-                output_directory,
-                "--jobs=auto",
-            ]
+def is_compiled(
+    program, cache: Optional[BinaryCache] = None, hex_dig: Optional[str] = None
+) -> bool:
+    """Returns True if the binary of the program is in the cache.
+
+    :param hex_dig: The `program_digest` of the program, if already computed
+    """
+    cache = get_binary_cache() if cache is None else cache
+    binary_name, _ = _compiled_binary(program, hex_dig)
+    return cache.path_for(binary_name).exists()
+
+
+def compile_program(program, cache: Optional[BinaryCache] = None):
+    """Compiles the program into the binary cache unless it is already there."""
+    cache = get_binary_cache() if cache is None else cache
+    binary_name, build = _compiled_binary(program)
+    with cache.acquire(binary_name, build):
+        pass
 
+
+class FactFiles:
+    """Exchanges facts with souffle through fact files in temporary directories."""
+
+    def __init__(self, program, facts):
+        self.program = program
+        self.facts = facts
+
+    def __enter__(self):
+        self._input_tmp = TemporaryDirectory()
+        self._output_tmp = TemporaryDirectory()
+        self.input_directory = self._input_tmp.name
+        self.output_directory = self._output_tmp.name
+        write_facts(self.input_directory, self.facts)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._input_tmp.cleanup()
+        self._output_tmp.cleanup()
+
+    def output_facts(self) -> Set[Fact]:
+        """Returns the output facts after souffle has terminated."""
+        return load_facts(
+            self.output_directory, self.program.declarations, self.program.outputs
+        )
+
+
+class FactStreams:
+    """Exchanges facts with souffle through named pipes.
+
+    A named pipe is created for every input and output relation at the path where
+    souffle expects its fact file. Threads write input rows and parse output rows
+    while souffle is running, so no facts are stored on disk.
+    """
+
+    def __init__(self, program, facts):
+        self.program = program
+        self.facts = facts
+        self._threads = []
+        self._errors = []
+        self._results = []
+
+    def __enter__(self):
+        self._tmp = TemporaryDirectory()
+        self.input_directory = os.path.join(self._tmp.name, "input")
+        self.output_directory = os.path.join(self._tmp.name, "output")
+        os.mkdir(self.input_directory)
+        os.mkdir(self.output_directory)
+
+        # souffle only loads declared input relations
+        grouped_facts = {name: [] for name in self.program.inputs}
+        for fact in self.facts:
+            if fact.head.name in grouped_facts:
+                grouped_facts[fact.head.name].append(fact)
+
+        for name, relation_facts in grouped_facts.items():
+            path = os.path.join(self.input_directory, name + ".facts")
+            self._start(path, os.O_RDONLY, self._write_relation, path, relation_facts)
+
+        for name in self.program.outputs:
+            path = os.path.join(self.output_directory, name + ".csv")
+            self._start(path, os.O_WRONLY, self._read_relation, path, name)
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self._unblock()
+        self._tmp.cleanup()
+
+    def _start(self, path, counterpart_flag, target, *args):
+        os.mkfifo(path)
+
+        def guarded():
             try:
-                run(cmd, check=False, stdout=DEVNULL, stderr=DEVNULL)
-            except Exception as e:
-                logger.error(
-                    f"Error while running the program: {e.stdout.decode()}",
-                    exc_info=False,
-                )
-                exit(1)
-            return load_facts(output_directory, program.declarations, program.outputs)
+                target(*args)
+            except BaseException as e:
+                self._errors.append(e)
+
+        thread = threading.Thread(target=guarded, daemon=True)
+        thread.fifo_path = path
+        thread.counterpart_flag = counterpart_flag
+        thread.start()
+        self._threads.append(thread)
 
+    def _write_relation(self, path, relation_facts):
+        try:
+            with open(path, "w", newline="") as file:
+                writer = csv.writer(file, delimiter="\t")
+                for fact in relation_facts:
+                    writer.writerow(fact_to_row(fact))
+        except BrokenPipeError:
+            pass  # souffle stopped reading
+
+    def _read_relation(self, path, name):
+        with open(path, newline="") as file:
+            reader = csv.reader(file, delimiter="\t")
+            self._results.append(
+                set(rows_to_facts(name, reader, self.program.declarations))
+            )
+
+    def _unblock(self):
+        # threads whose pipe was never opened by souffle are blocked in `open`;
+        # opening the other end of the pipe releases them
+        for thread in self._threads:
+            while thread.is_alive():
+                try:
+                    fd = os.open(thread.fifo_path, thread.counterpart_flag | os.O_NONBLOCK)
+                    os.close(fd)
+                except OSError:
+                    pass  # the thread has not opened its end yet
+                thread.join(0.01)
+
+    def output_facts(self) -> Set[Fact]:
+        """Returns the output facts after souffle has terminated."""
+        self._unblock()
+        if self._errors:
+            raise self._errors[0]
+        return set().union(*self._results)
+
+
+def fact_io(program, facts, io_mode: Optional[str] = None):
+    """Returns the exchange of facts with souffle for the given IO mode."""
+    io_mode = SOUFFLE_IO_MODE if io_mode is None else io_mode
+    if io_mode == SOUFFLE_STREAM_IO:
+        return FactStreams(program, facts)
+    elif io_mode == SOUFFLE_FILE_IO:
+        return FactFiles(program, facts)
+    else:
+        raise ValueError(f"Unknown IO mode: {io_mode}")
+
+
+def _run_binary(binary_path, input_directory, output_directory):
+    cmd = [
+        str(binary_path),
+        "-F",
+        input_directory,
+        "-D",
+        output_directory,
+        "--jobs=auto",
+    ]
+
+    try:
+        run(cmd, check=False, stdout=DEVNULL, stderr=DEVNULL)
+    except Exception as e:
+        logger.error(
+            f"Error while running the program: {e}",
+            exc_info=False,
+        )
+        exit(1)
 
-def run_program(program, facts):
+
+def compile_and_run(
+    program, facts, cache: Optional[BinaryCache] = None, io_mode: Optional[str] = None
+):
+    cache = get_binary_cache() if cache is None else cache
+
+    binary_name, build = _compiled_binary(program)
+
+    # execute the binary
+    with cache.acquire(binary_name, build) as binary_path:
+        with fact_io(program, facts, io_mode) as io:
+            _run_binary(binary_path, io.input_directory, io.output_directory)
+            return io.output_facts()
+
+
+def compile_and_run_to(
+    program, facts, output_directory, cache: Optional[BinaryCache] = None
+):
+    """Like `compile_and_run`, but leaves the outputs in csv files of the directory."""
+    cache = get_binary_cache() if cache is None else cache
+
+    binary_name, build = _compiled_binary(program)
+
+    with cache.acquire(binary_name, build) as binary_path:
+        with FactFiles(program, facts) as io:
+            _run_binary(binary_path, io.input_directory, str(output_directory))
+
+
+def _interpret(program, facts, input_directory, output_directory):
     def run_cmd(cmd):
         try:
             run(cmd, check=True, stdout=DEVNULL)  # , stderr=DEVNULL)
@@ -709,24 +1210,29 @@ def run_program(program, facts):
             print("".join([pprint(fact) for fact in facts]))
             exit(1)
 
-    with NamedTemporaryFile() as datalog_script:
-        datalog_script.write(pprint(program).encode())
+    with NamedTemporaryFile(mode="w") as datalog_script:
+        pprint_to(program, datalog_script)
         datalog_script.flush()
-        with TemporaryDirectory() as input_directory:
-            write_facts(input_directory, facts)
-            with TemporaryDirectory() as output_directory:
-                cmd = [
-                    "souffle",
-                    datalog_script.name,
-                    "-F",
-                    input_directory,
-                    "-D",
-                    output_directory,
-                    "-w",
-                    "--jobs=auto",
-                ]
-                run_cmd(cmd)
-
-                return load_facts(
-                    output_directory, program.declarations, program.outputs
-                )
+        cmd = [
+            "souffle",
+            datalog_script.name,
+            "-F",
+            input_directory,
+            "-D",
+            output_directory,
+            "-w",
+            "--jobs=auto",
+        ]
+        run_cmd(cmd)
+
+
+def run_program(program, facts, io_mode: Optional[str] = None):
+    with fact_io(program, facts, io_mode) as io:
+        _interpret(program, facts, io.input_directory, io.output_directory)
+        return io.output_facts()
+
+
+def run_program_to(program, facts, output_directory):
+    """Like `run_program`, but leaves the outputs in csv files of the directory."""
+    with FactFiles(program, facts) as io:
+        _interpret(program, facts, io.input_directory, str(output_directory))
@@ -0,0 +1,318 @@
+from symlog.souffle import (
+    Program,
+    Fact,
+    pprint_to,
+    program_digest,
+    fact_to_row,
+    rows_to_facts,
+)
+from symlog.binary_cache import BinaryCache, get_binary_cache
+from symlog.logger import get_logger
+import symlog.common as common
+
+from collections import OrderedDict
+from pathlib import Path
+from subprocess import run, CalledProcessError
+from typing import Dict, Iterable, Optional, Set
+from collections import defaultdict
+import ctypes
+import csv
+import io
+import os
+import shlex
+import shutil
+import threading
+
+logger = get_logger(__name__)
+
+# the prefix of the names under which the generated programs register
+# themselves in souffle's program factory
+EMBEDDED_PROGRAM_PREFIX = "symlog_program_"
+
+CXX = os.environ.get("CXX", "g++")
+CXXFLAGS = shlex.split(
+    os.environ.get(
+        "SYMLOG_LIBRARY_CXXFLAGS", "-std=c++17 -O2 -fopenmp -D__EMBEDDED_SOUFFLE__"
+    )
+)
+
+# A thin C interface over souffle's SouffleInterface.h, loaded with ctypes.
+# Tuples are exchanged as tab separated rows, one per line, which is the format
+# souffle uses for its fact files.
+WRAPPER_SOURCE = r"""
+#include "souffle/SouffleInterface.h"
+
+#include <cstdlib>
+#include <cstring>
+#include <sstream>
+#include <string>
+
+using namespace souffle;
+
+static void write_attr(std::ostringstream& out, tuple& t, char type) {
+    switch (type) {
+        case 's': { std::string v; t >> v; out << v; break; }
+        case 'u': { RamUnsigned v; t >> v; out << v; break; }
+        case 'f': { RamFloat v; t >> v; out << v; break; }
+        default: { RamSigned v; t >> v; out << v; break; }
+    }
+}
+
+static void read_attr(tuple& t, const std::string& field, char type) {
+    switch (type) {
+        case 's': t << field; break;
+        case 'u': t << static_cast<RamUnsigned>(std::stoull(field)); break;
+        case 'f': t << static_cast<RamFloat>(std::stod(field)); break;
+        default: t << static_cast<RamSigned>(std::stoll(field)); break;
+    }
+}
+
+extern "C" {
+
+void* symlog_new_instance(const char* name) {
+    return ProgramFactory::newInstance(name);
+}
+
+void symlog_delete_instance(void* program) {
+    delete static_cast<SouffleProgram*>(program);
+}
+
+void symlog_set_num_threads(void* program, size_t num) {
+    static_cast<SouffleProgram*>(program)->setNumThreads(num);
+}
+
+void symlog_purge(void* program) {
+    auto* prog = static_cast<SouffleProgram*>(program);
+    prog->purgeInputRelations();
+    prog->purgeInternalRelations();
+    prog->purgeOutputRelations();
+}
+
+long symlog_insert(void* program, const char* relation, const char* rows) {
+    Relation* rel = static_cast<SouffleProgram*>(program)->getRelation(relation);
+    if (rel == nullptr) {
+        return -1;
+    }
+    std::istringstream lines(rows);
+    std::string line;
+    long count = 0;
+    while (std::getline(lines, line)) {
+        tuple t(rel);
+        std::istringstream fields(line);
+        std::string field;
+        for (std::size_t i = 0; i < rel->getArity(); ++i) {
+            std::getline(fields, field, '\t');
+            read_attr(t, field, rel->getAttrType(i)[0]);
+        }
+        rel->insert(t);
+        ++count;
+    }
+    return count;
+}
+
+void symlog_run(void* program) {
+    static_cast<SouffleProgram*>(program)->run();
+}
+
+char* symlog_read(void* program, const char* relation) {
+    Relation* rel = static_cast<SouffleProgram*>(program)->getRelation(relation);
+    if (rel == nullptr) {
+        return nullptr;
+    }
+    std::ostringstream out;
+    for (auto& t : *rel) {
+        for (std::size_t i = 0; i < rel->getArity(); ++i) {
+            if (i > 0) {
+                out << '\t';
+            }
+            write_attr(out, t, rel->getAttrType(i)[0]);
+        }
+        out << '\n';
+    }
+    std::string result = out.str();
+    char* buffer = static_cast<char*>(std::malloc(result.size() + 1));
+    std::memcpy(buffer, result.c_str(), result.size() + 1);
+    return buffer;
+}
+
+void symlog_free(char* buffer) {
+    std::free(buffer);
+}
+
+}
+"""
+
+
+def embedded_program_name(hex_dig: str) -> str:
+    """Returns the name of the program with the digest in souffle's factory.
+
+    Souffle derives it from the name of the generated source file. Libraries
+    loaded in the same process must register different names.
+    """
+    return f"{EMBEDDED_PROGRAM_PREFIX}{hex_dig[:32]}"
+
+
+def _build_library(program: Program, library_path: Path, name: str):
+    """Generates C++ code for the program and compiles it with the wrapper."""
+    build_dir = library_path.parent
+    source_path = build_dir / f"{name}.dl"
+    generated_path = build_dir / f"{name}.cpp"
+    wrapper_path = build_dir / "symlog_wrapper.cpp"
+
+    with source_path.open("w") as source_file:
+        pprint_to(program, source_file)
+    wrapper_path.write_text(WRAPPER_SOURCE)
+
+    generate_command = ["souffle", "-g", str(generated_path), str(source_path), "-w"]
+    compile_command = (
+        [CXX]
+        + CXXFLAGS
+        + ["-shared", "-fPIC", str(generated_path), str(wrapper_path)]
+        + ["-o", str(library_path)]
+    )
+
+    try:
+        logger.info(f"Compiling {library_path.name}...")
+        run(generate_command, check=True)
+        run(compile_command, check=True)
+    except CalledProcessError:
+        logger.error(
+            "Error while compiling the program into a library. Please check the"
+            " program and the C++ toolchain.",
+            exc_info=False,
+        )
+        exit(1)
+
+
+class SouffleLibrary:
+    """A Souffle program compiled into a shared library and loaded in-process."""
+
+    def __init__(self, program: Program, cache: Optional[BinaryCache] = None):
+        cache = get_binary_cache() if cache is None else cache
+
+        hex_dig = program_digest(program)
+        name = embedded_program_name(hex_dig)
+
+        self.declarations = program.declarations
+        self.inputs = list(program.inputs)
+        self.outputs = list(program.outputs)
+        self._lock = threading.Lock()
+
+        with cache.acquire(
+            f"library_{name}", lambda path: _build_library(program, path, name)
+        ) as library_path:
+            # the mapping outlives a later eviction of the file
+            self._lib = ctypes.CDLL(str(library_path))
+
+        self._declare_functions()
+        self._instance = self._lib.symlog_new_instance(name.encode())
+        if not self._instance:
+            raise RuntimeError(f"Failed to instantiate {name}. Bug?")
+        self._lib.symlog_set_num_threads(self._instance, os.cpu_count() or 1)
+
+    def _declare_functions(self):
+        lib = self._lib
+        lib.symlog_new_instance.argtypes = [ctypes.c_char_p]
+        lib.symlog_new_instance.restype = ctypes.c_void_p
+        lib.symlog_delete_instance.argtypes = [ctypes.c_void_p]
+        lib.symlog_set_num_threads.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
+        lib.symlog_purge.argtypes = [ctypes.c_void_p]
+        lib.symlog_insert.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.symlog_insert.restype = ctypes.c_long
+        lib.symlog_run.argtypes = [ctypes.c_void_p]
+        lib.symlog_read.argtypes = [ctypes.c_void_p, ctypes.c_char_p]
+        lib.symlog_read.restype = ctypes.c_void_p
+        lib.symlog_free.argtypes = [ctypes.c_void_p]
+
+    def run(self, facts: Iterable[Fact]) -> Set[Fact]:
+        """Evaluates the program on the given facts and returns the output facts."""
+
+        # like souffle's file IO, only facts of input relations are loaded
+        rows_by_relation = defaultdict(list)
+        for fact in facts:
+            if fact.head.name in self.inputs:
+                rows_by_relation[fact.head.name].append("\t".join(fact_to_row(fact)))
+
+        with self._lock:
+            lib = self._lib
+            lib.symlog_purge(self._instance)
+
+            for name, rows in rows_by_relation.items():
+                rows_str = "\n".join(rows) + "\n"
+                if lib.symlog_insert(self._instance, name.encode(), rows_str.encode()) < 0:
+                    raise ValueError(f"Relation {name} is not declared in the program.")
+
+            lib.symlog_run(self._instance)
+
+            output_facts = set()
+            for name in self.outputs:
+                buffer = lib.symlog_read(self._instance, name.encode())
+                if not buffer:
+                    continue
+                try:
+                    rows_str = ctypes.string_at(buffer).decode()
+                finally:
+                    lib.symlog_free(buffer)
+                reader = csv.reader(io.StringIO(rows_str), delimiter="\t")
+                output_facts.update(rows_to_facts(name, reader, self.declarations))
+
+            # an idle library keeps no tuples in memory
+            lib.symlog_purge(self._instance)
+
+        return output_facts
+
+    def __del__(self):
+        instance = getattr(self, "_instance", None)
+        if instance:
+            self._lib.symlog_delete_instance(instance)
+            self._instance = None
+
+
+# The most recently used libraries, up to common.LOADED_LIBRARY_MAX_NUM. Evicting
+# one deletes its program instance, but not the mapping of the shared library:
+# the statics of souffle's headers are unique symbols, and the dynamic loader
+# never unloads libraries defining them. The bound thus covers the instances,
+# and the code of every library loaded stays mapped until the process exits.
+_loaded_libraries: Dict[str, SouffleLibrary] = OrderedDict()
+_loaded_libraries_lock = threading.Lock()
+
+
+def _library_key(program: Program) -> str:
+    return program_digest(program)
+
+
+def is_toolchain_available() -> bool:
+    """Returns True if souffle, its headers and a C++ compiler are installed."""
+    souffle_path = shutil.which("souffle")
+    if souffle_path is None or shutil.which(CXX) is None:
+        return False
+    prefix = Path(souffle_path).resolve().parent.parent
+    return (prefix / "include" / "souffle" / "SouffleInterface.h").exists()
+
+
+def is_loaded(program: Program, hex_dig: Optional[str] = None) -> bool:
+    """Returns True if the library of the program is loaded in this process.
+
+    :param hex_dig: The `program_digest` of the program, if already computed
+    """
+    key = _library_key(program) if hex_dig is None else hex_dig
+    return key in _loaded_libraries
+
+
+def load_library(program: Program) -> SouffleLibrary:
+    """Returns the in-process library of the program, building it on first use."""
+    key = _library_key(program)
+    with _loaded_libraries_lock:
+        library = _loaded_libraries.get(key)
+        if library is None:
+            library = _loaded_libraries[key] = SouffleLibrary(program)
+        _loaded_libraries.move_to_end(key)
+        # an evicted library is released once its last run returns
+        while len(_loaded_libraries) > common.LOADED_LIBRARY_MAX_NUM:
+            _loaded_libraries.popitem(last=False)
+        return library
+
+
+def run_in_process(program: Program, facts: Iterable[Fact]) -> Set[Fact]:
+    """Evaluates the program inside the current process, without spawning souffle."""
+    return load_library(program).run(facts)
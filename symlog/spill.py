@@ -0,0 +1,70 @@
+from symlog.souffle import Fact, rows_to_facts
+
+from pathlib import Path
+from typing import Dict, Iterator, List, Union
+import csv
+import zlib
+
+# Output relations of a meta-program are partitioned on disk by the hash of
+# their binding columns, i.e., of the assignment of symbolic constants. All
+# tuples of an assignment end up in the same partition, so partitions can be
+# divided by assignment one at a time.
+
+
+class SpilledOutputs:
+    """Output relations partitioned into directories of csv files."""
+
+    def __init__(self, directory: Union[str, Path], partition_num: int):
+        self.directory = Path(directory)
+        self.partition_num = partition_num
+        self.row_num = 0
+
+    def _partition_directory(self, idx: int) -> Path:
+        return self.directory / f"partition_{idx}"
+
+    def add_relation(self, name: str, path: Union[str, Path], binding_num: int):
+        """Distributes the rows of the csv file of a relation to the partitions."""
+        files = {}
+        try:
+            with open(path, newline="") as file:
+                for row in csv.reader(file, delimiter="\t"):
+                    assignment = "\t".join(row[len(row) - binding_num :])
+                    idx = zlib.crc32(assignment.encode()) % self.partition_num
+                    writer = files.get(idx)
+                    if writer is None:
+                        partition_directory = self._partition_directory(idx)
+                        partition_directory.mkdir(parents=True, exist_ok=True)
+                        partition_file = open(
+                            partition_directory / f"{name}.csv", "a", newline=""
+                        )
+                        writer = files[idx] = (
+                            partition_file,
+                            csv.writer(partition_file, delimiter="\t"),
+                        )
+                    writer[1].writerow(row)
+                    self.row_num += 1
+        finally:
+            for partition_file, _ in files.values():
+                partition_file.close()
+
+    def read_partition(
+        self, idx: int, declarations: Dict[str, List[str]]
+    ) -> Iterator[Fact]:
+        for path in sorted(self._partition_directory(idx).glob("*.csv")):
+            with path.open(newline="") as file:
+                yield from rows_to_facts(
+                    path.stem, csv.reader(file, delimiter="\t"), declarations
+                )
+
+    def partition_indices(self) -> List[int]:
+        """Returns the indices of the partitions that have rows."""
+        return [
+            idx
+            for idx in range(self.partition_num)
+            if self._partition_directory(idx).exists()
+        ]
+
+    def partitions(self, declarations: Dict[str, List[str]]) -> Iterator[List[Fact]]:
+        """Yields the facts of one partition after another."""
+        for idx in self.partition_indices():
+            yield list(self.read_partition(idx, declarations))
@@ -1,5 +1,4 @@
 from symlog.souffle import (
-    run_program,
     transform,
     Program,
     Rule,
@@ -13,19 +12,36 @@ from symlog.souffle import (
     SymbolicStringWrapper,
 )
 from symlog.utils import is_sublist, flatten_lists_only, is_arg_symbolic
-from symlog.common import CONTAINS, DOES_NOT_CONTAIN
+from symlog.common import (
+    CONTAINS,
+    DOES_NOT_CONTAIN,
+    SYMEX_MEMORY_CACHE_SIZE,
+    MATCHED_PAIRS_CACHE_SIZE,
+    Z3_CONST_CACHE_SIZE,
+    FILTER_PREDICATE_PREFIX,
+)
+import symlog.common as common
 from symlog.program_builder import ProgramBuilder
-from symlog.transformer import transform_program
+from symlog.transformer import transform_program, create_output_filter_facts
 from symlog.provenance import Provenancer
+from symlog.backends import execute, execute_to
+from symlog.spill import SpilledOutputs
+from symlog.worker_pool import get_worker_pool
+from symlog.grouping import group_target_outputs
+from symlog.result_store import disable_result_store, get_result_store
+import symlog.instrumentation as instrumentation
 from symlog.logger import get_logger
 
-from typing import List, Dict, Tuple, Any, Set, FrozenSet
+from typing import List, Dict, Tuple, Any, Set, FrozenSet, Iterable, Iterator, Callable
 from collections import defaultdict, namedtuple
+from dataclasses import dataclass
 from itertools import chain
+from pathlib import Path
+from tempfile import TemporaryDirectory
 from functools import lru_cache
 from z3 import Or, And, simplify, Const, IntSort, StringSort, BoolSort
-from concurrent.futures import ProcessPoolExecutor, as_completed
-import os
+from concurrent.futures import Future, as_completed
+import sqlite3
 
 logger = get_logger(__name__)
 
@@ -34,27 +50,48 @@ _OutputCondition = namedtuple("OutputCondition", ["sub_conditions"])
 
 
 class OutputCondition(_OutputCondition):
-    """Represents an output condition for generating a Datalog output fact."""
+    """Represents an output condition for generating a Datalog output fact.
+
+    Conditions are compared and hashed by their structure. The z3 formula is
+    built on first use and kept, but neither pickled nor copied.
+    """
 
     def __init__(self, sub_conditions: List):
         self._sub_conditions = sub_conditions
 
     def to_z3(self):
         """Converts the output condition to an z3 formula."""
+        cached = self.__dict__.get("_z3")
+        if cached is None:
+            cached = self.__dict__["_z3"] = self._build_z3()
+        return cached
 
+    @instrumentation.timed("z3_conversion")
+    def _build_z3(self):
         formula = [cond.to_z3() for cond in self._sub_conditions]
 
         final_formula = simplify(Or(formula))
         return final_formula
 
     def __str__(self) -> str:
-        return self.to_z3().__str__()
+        cached = self.__dict__.get("_str")
+        if cached is None:
+            cached = self.__dict__["_str"] = self.to_z3().__str__()
+        return cached
 
     def __repr__(self) -> str:
         return self.__str__()
 
     def __hash__(self) -> int:
-        return hash(self.__str__())
+        cached = self.__dict__.get("_hash")
+        if cached is None:
+            cached = hash(tuple(self._sub_conditions))
+            self.__dict__["_hash"] = cached
+        return cached
+
+    def __reduce__(self):
+        # the cached hash differs between processes, and z3 formulas do not pickle
+        return (self.__class__, (self._sub_conditions,))
 
     @property
     def symbolic_assigns(self):
@@ -74,9 +111,19 @@ class OutputCondition(_OutputCondition):
 SymbolValueAssignment = namedtuple("SymbolValueAssignment", ["symbol", "value"])
 
 
+@lru_cache(maxsize=Z3_CONST_CACHE_SIZE)
+def _z3_const(name: str, sort) -> Const:
+    return Const(name, sort)
+
+
+_BOOL_SORT = BoolSort()
+
+
 class Condition(
     namedtuple("Condition", ["symbol_value_assigns", "dependent_facts_list"])
 ):
+    """A condition under one assignment of symbolic constants, see OutputCondition."""
+
     z3TypeMap = {
         Number: IntSort(),
         String: StringSort(),
@@ -88,13 +135,19 @@ class Condition(
 
     def _convert_symbol(self, sym_const) -> Const:
         try:
-            return Const(sym_const.name, self.z3TypeMap[type(sym_const)])
+            return _z3_const(sym_const.name, self.z3TypeMap[type(sym_const)])
         except KeyError:
             raise ValueError(f"Unknown type: {type(sym_const)}")
 
     def to_z3(self):
         """Converts the condition to an z3 formula."""
+        cached = self.__dict__.get("_z3")
+        if cached is None:
+            cached = self.__dict__["_z3"] = self._build_z3()
+        return cached
 
+    @instrumentation.timed("z3_conversion")
+    def _build_z3(self):
         sym_asssign_formula = And(
             [
                 (self._convert_symbol(sym_const) == assigned_val.value)
@@ -105,7 +158,7 @@ class Condition(
         fact_formula = (
             Or(
                 [
-                    And([Const(str(dep_fact), BoolSort()) for dep_fact in dep_facts])
+                    And([_z3_const(str(dep_fact), _BOOL_SORT) for dep_fact in dep_facts])
                     for dep_facts in self.dependent_facts_list
                 ]
             )
@@ -118,13 +171,145 @@ class Condition(
         return final_formula
 
     def __str__(self) -> str:
-        return str(self.to_z3())
+        cached = self.__dict__.get("_str")
+        if cached is None:
+            cached = self.__dict__["_str"] = str(self.to_z3())
+        return cached
 
     def __repr__(self) -> str:
         return self.__str__()
 
     def __hash__(self) -> int:
-        return hash(self.__str__())
+        cached = self.__dict__.get("_hash")
+        if cached is None:
+            cached = hash(
+                (
+                    frozenset(self.symbol_value_assigns),
+                    tuple(tuple(dep_facts) for dep_facts in self.dependent_facts_list),
+                )
+            )
+            self.__dict__["_hash"] = cached
+        return cached
+
+    def __reduce__(self):
+        # the cached hash differs between processes, and z3 formulas do not pickle
+        return (self.__class__, tuple(self))
+
+    def implies(self, other: "Condition") -> bool:
+        """Returns True if the condition implies the other one, judging by structure.
+
+        The assignments of the other condition must be among those of this one,
+        and every dependency set of this one must contain one of the other.
+        """
+        assigns, dep_sets = self._dependency_sets()
+        other_assigns, other_dep_sets = other._dependency_sets()
+        if not other_assigns <= assigns:
+            return False
+        if not other_dep_sets:
+            return True
+        if not dep_sets:
+            return False
+        return all(
+            any(other_set <= dep_set for other_set in other_dep_sets)
+            for dep_set in dep_sets
+        )
+
+    def _dependency_sets(self):
+        cached = self.__dict__.get("_sets")
+        if cached is None:
+            cached = (
+                frozenset(self.symbol_value_assigns),
+                tuple(map(frozenset, self.dependent_facts_list)),
+            )
+            self.__dict__["_sets"] = cached
+        return cached
+
+
+def normalise_dependencies(dependent_facts_list: List[List[Fact]]) -> List[List[Fact]]:
+    """Drops repeated facts, and dependency sets containing another one.
+
+    A dependency set is a conjunction, so a superset of another set adds nothing
+    to their disjunction. An empty set always holds, which the empty list means.
+    """
+    kept = []
+    for dep_facts in dependent_facts_list:
+        dep_facts = list(dict.fromkeys(dep_facts))
+        dep_set = frozenset(dep_facts)
+        if not dep_set:
+            return []
+        if any(kept_set <= dep_set for kept_set, _ in kept):
+            continue
+        kept = [(kept_set, facts) for kept_set, facts in kept if not dep_set < kept_set]
+        kept.append((dep_set, dep_facts))
+    return [dep_facts for _, dep_facts in kept]
+
+
+def remove_subsumed(conditions: Iterable[Condition]) -> List[Condition]:
+    """Drops the conditions implying another one, keeping the first of equal ones."""
+    # a condition only implies conditions with a subset of its assignments
+    kept = {}
+    by_assigns = defaultdict(dict)
+    for condition in conditions:
+        assigns = condition._dependency_sets()[0]
+        if any(
+            condition.implies(kept_condition)
+            for other_assigns, group in by_assigns.items()
+            if other_assigns <= assigns
+            for kept_condition in group.values()
+        ):
+            continue
+        for other_assigns, group in by_assigns.items():
+            if assigns <= other_assigns:
+                for key in [
+                    key
+                    for key, kept_condition in group.items()
+                    if kept_condition.implies(condition)
+                ]:
+                    del group[key]
+                    del kept[key]
+        kept[id(condition)] = by_assigns[assigns][id(condition)] = condition
+    return list(kept.values())
+
+
+def normalise_output_condition(assignment_conditions: List[OutputCondition]) -> OutputCondition:
+    """Removes subsumed conditions across the conditions of all assignments."""
+    kept = set(
+        map(
+            id,
+            remove_subsumed(
+                condition
+                for assignment_condition in assignment_conditions
+                for condition in assignment_condition.sub_conditions
+            ),
+        )
+    )
+
+    normalised = []
+    for assignment_condition in assignment_conditions:
+        sub_conditions = [
+            condition
+            for condition in assignment_condition.sub_conditions
+            if id(condition) in kept
+        ]
+        if sub_conditions:
+            normalised.append(OutputCondition(sub_conditions))
+    return OutputCondition(normalised)
+
+
+SYMBOL_WRAPPER_TYPES = (SymbolicStringWrapper, SymbolicNumberWrapper)
+
+
+@dataclass
+class SymexResult:
+    """The result of a symbolic execution, with what is needed to update it."""
+
+    rules_or_program: FrozenSet[Rule] | Program
+    input_facts: FrozenSet[Fact]
+    interested_output_facts: FrozenSet[Fact]
+    program: Program
+    # assignment of symbolic constants -> target output -> minimal dependent facts
+    dependencies: Dict[Tuple[SymbolValueAssignment, ...], Dict[Fact, List[List[Fact]]]]
+    constraints: Dict[Fact, OutputCondition]
 
 
 class SymbolicExecutor:
@@ -134,6 +319,124 @@ class SymbolicExecutor:
         input_facts: FrozenSet[Fact],
         interested_output_facts: FrozenSet[Fact],
     ):
+        if not interested_output_facts:
+            return {}
+
+        return SymbolicExecutor.symex_result(
+            rules_or_program, input_facts, interested_output_facts
+        ).constraints
+
+    @staticmethod
+    def symex_result(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> SymexResult:
+        """Like `symex`, but returns a result that `symex_incremental` can update."""
+        # all interested facts are handled by a single evaluation of the meta-program
+        return SymbolicExecutor._cached_symex(
+            *SymbolicExecutor._check_symex_args(
+                rules_or_program, input_facts, interested_output_facts
+            )
+        )
+
+    @staticmethod
+    def symex_iter(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+        stop: Callable[[Fact, Condition], bool] = None,
+    ) -> Iterator[Tuple[Fact, Condition]]:
+        """Like `symex`, but yields (interested fact, condition) pairs as soon as the
+        provenance under an assignment of symbolic constants is computed.
+
+        The disjunction of the conditions yielded for an interested fact is
+        equivalent to the output condition `symex` returns for it; conditions
+        implying a yielded one are skipped. Computations still pending are cancelled
+        once `stop` returns True for a yielded pair, or when the generator is closed.
+        """
+        args = SymbolicExecutor._check_symex_args(
+            rules_or_program, input_facts, interested_output_facts
+        )
+        if not interested_output_facts:
+            return
+
+        store, key, result = SymbolicExecutor._load_result(*args)
+        if result is not None:
+            # the output condition of a fact has one output condition per assignment
+            for fact, output_condition in result.constraints.items():
+                for assignment_condition in output_condition.sub_conditions:
+                    for condition in assignment_condition.sub_conditions:
+                        yield fact, condition
+                        if stop is not None and stop(fact, condition):
+                            return
+            return
+
+        program, targets_to_compute = SymbolicExecutor._prepare_symex(*args)
+        symbolic_facts = SymbolicExecutor._get_symbolic_facts(program)
+        dependencies = {}
+        assignment_constraints = {}
+        yielded = defaultdict(list)
+
+        futures = SymbolicExecutor._submit_dependencies(program, targets_to_compute)
+        try:
+            for future in as_completed(futures):
+                symbol_value_assigns = futures[future]
+                dependencies[symbol_value_assigns] = future.result()
+
+                constraints = SymbolicExecutor._assignment_constraints(
+                    symbolic_facts,
+                    symbol_value_assigns,
+                    dependencies[symbol_value_assigns],
+                    args[2],
+                )
+                assignment_constraints[symbol_value_assigns] = constraints
+                for fact, assignment_condition in constraints.items():
+                    for condition in assignment_condition.sub_conditions:
+                        # a condition implying a yielded one adds nothing
+                        if any(map(condition.implies, yielded[fact])):
+                            continue
+                        yielded[fact].append(condition)
+                        yield fact, condition
+                        if stop is not None and stop(fact, condition):
+                            return
+        finally:
+            for future in futures:
+                future.cancel()
+
+        # like symex, keep the conditions in the order of the assignments
+        constraints = defaultdict(list)
+        for symbol_value_assigns in targets_to_compute:
+            for fact, condition in assignment_constraints.get(
+                symbol_value_assigns, {}
+            ).items():
+                constraints[fact].append(condition)
+
+        SymbolicExecutor._store_result(
+            store,
+            key,
+            SymexResult(
+                *args,
+                program,
+                {
+                    symbol_value_assigns: dependencies[symbol_value_assigns]
+                    for symbol_value_assigns in targets_to_compute
+                    if dependencies.get(symbol_value_assigns)
+                },
+                {
+                    fact: normalise_output_condition(conditions)
+                    for fact, conditions in constraints.items()
+                },
+            ),
+        )
+
+    @staticmethod
+    def _check_symex_args(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Tuple[FrozenSet[Rule] | Program, FrozenSet[Fact], FrozenSet[Fact]]:
+        """Validates the arguments of a symbolic execution and freezes them."""
         if not isinstance(rules_or_program, Program):
             rules = rules_or_program
 
@@ -155,30 +458,98 @@ class SymbolicExecutor:
 
             rules_or_program = frozenset(rules)
 
-        constraints = {}
-        # check interested output facts one by one
         for fact in interested_output_facts:
             if any(arg for arg in fact.head.args if is_arg_symbolic(arg)):
                 raise ValueError(
                     "Arguments of interested facts are conflict with interal keywords."
                 )
-            constraints_of_fact = SymbolicExecutor._cached_symex(
-                rules_or_program, frozenset(input_facts), fact
-            )
-            constraints.update(constraints_of_fact)
-        return constraints
+
+        return (
+            rules_or_program,
+            frozenset(input_facts),
+            frozenset(interested_output_facts),
+        )
 
     @staticmethod
-    @lru_cache(maxsize=None)
+    def _load_result(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Tuple[Any, str, SymexResult]:
+        """Returns the result store, the key of the symbolic execution and its
+        stored result. The store is None if it is disabled or unreadable."""
+        store = get_result_store()
+        if store is None:
+            return None, None, None
+        try:
+            key = store.key_for(rules_or_program, input_facts, interested_output_facts)
+            return store, key, store.get(key)
+        except (sqlite3.Error, OSError) as e:
+            disable_result_store(e)
+            return None, None, None
+
+    @staticmethod
+    def _store_result(store, key: str, result: SymexResult):
+        if store is None:
+            return
+        try:
+            store.put(key, result)
+        except (sqlite3.Error, OSError) as e:
+            disable_result_store(e)
+
+    @staticmethod
+    @lru_cache(maxsize=SYMEX_MEMORY_CACHE_SIZE)
     def _cached_symex(
         rules_or_program: FrozenSet[Rule] | Program,
         input_facts: FrozenSet[Fact],
-        interested_output_fact: Fact,
+        interested_output_facts: FrozenSet[Fact],
     ):
         """Symbolic execution of the datalog program."""
 
-        # the outputs of the program should at least contain relation of the interested output fact
-        outputs = [interested_output_fact.head.name]
+        # results computed by earlier processes are kept in the result store
+        store, key, result = SymbolicExecutor._load_result(
+            rules_or_program, input_facts, interested_output_facts
+        )
+        if result is None:
+            result = SymbolicExecutor._compute_symex(
+                rules_or_program, input_facts, interested_output_facts
+            )
+            SymbolicExecutor._store_result(store, key, result)
+        return result
+
+    @staticmethod
+    def _compute_symex(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> SymexResult:
+        program, targets_to_compute = SymbolicExecutor._prepare_symex(
+            rules_or_program, input_facts, interested_output_facts
+        )
+        dependencies = SymbolicExecutor._compute_dependencies(
+            program, targets_to_compute
+        )
+
+        return SymexResult(
+            rules_or_program,
+            input_facts,
+            interested_output_facts,
+            program,
+            dependencies,
+            SymbolicExecutor._collect_constraints(
+                program, dependencies, interested_output_facts
+            ),
+        )
+
+    @staticmethod
+    def _prepare_symex(
+        rules_or_program: FrozenSet[Rule] | Program,
+        input_facts: FrozenSet[Fact],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Tuple[Program, Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]]]:
+        """Builds the program and finds the target outputs under each assignment."""
+        # the outputs of the program should at least contain the relations of the interested output facts
+        outputs = sorted(set(fact.head.name for fact in interested_output_facts))
 
         if isinstance(rules_or_program, frozenset):
             rules = rules_or_program
@@ -191,68 +562,351 @@ class SymbolicExecutor:
                 inp_program, input_facts, outputs=outputs
             )
 
-        meta_output_facts = SymbolicExecutor._transform_exec_meta_program(program)
+        targets_to_compute = SymbolicExecutor._compute_meta_targets(
+            program, interested_output_facts
+        )
+        instrumentation.count("assignments", len(targets_to_compute))
+        return program, targets_to_compute
+
+    @staticmethod
+    def _compute_meta_targets(
+        program: Program, interested_output_facts: FrozenSet[Fact]
+    ) -> Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]]:
+        """Runs the meta-program and divides its target outputs by assignment."""
+        if common.META_SPILL:
+            return SymbolicExecutor._compute_spilled_meta_targets(
+                program, interested_output_facts
+            )
+
+        meta_output_facts = SymbolicExecutor._transform_exec_meta_program(
+            program, interested_output_facts
+        )
+
+        # divide target outputs by assignments of symbolic constants and sort them by assignment
+        return SymbolicExecutor._divide_outputs_by_assignments(
+            meta_output_facts, program.symbols, interested_output_facts
+        )
+
+    @staticmethod
+    def _compute_spilled_meta_targets(
+        program: Program, interested_output_facts: FrozenSet[Fact]
+    ) -> Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]]:
+        """Like `_compute_meta_targets`, but keeps the meta outputs on disk.
+
+        The outputs are partitioned by assignment, and the workers read and
+        divide one partition each, so that only target outputs are sent back.
+        """
+        transformed_program, input_facts, filter_outputs = (
+            SymbolicExecutor._transform_meta_program(program, interested_output_facts)
+        )
+
+        targets_to_compute = {}
+        with TemporaryDirectory(dir=common.META_SPILL_DIR) as tmp_dir:
+            output_directory = Path(tmp_dir) / "output"
+            output_directory.mkdir()
+
+            logger.info("Computing the constraints of symbolic constants...")
+            with instrumentation.timer("meta_program_run"):
+                execute_to(transformed_program, input_facts, output_directory)
+
+            spilled = SpilledOutputs(
+                Path(tmp_dir) / "partitions", common.META_SPILL_PARTITIONS
+            )
+            prefix_len = len(FILTER_PREDICATE_PREFIX) if filter_outputs else 0
+            for path in output_directory.glob("*.csv"):
+                # the filter relations output the tuples of the original relations
+                spilled.add_relation(path.stem[prefix_len:], path, len(program.symbols))
+                path.unlink()
+            instrumentation.count("meta_output_facts", spilled.row_num)
+
+            args = (transformed_program.declarations, interested_output_facts)
+            if common.DISTRIBUTED_ADDRESS:
+                # remote workers do not share the spill directory
+                partition_targets = (
+                    SymbolicExecutor._divide_spilled_partition(
+                        program, spilled, idx, *args
+                    )
+                    for idx in spilled.partition_indices()
+                )
+            else:
+                executor = get_worker_pool(program)
+                futures = [
+                    executor.submit(
+                        SymbolicExecutor._divide_spilled_partition,
+                        program,
+                        spilled,
+                        idx,
+                        *args,
+                    )
+                    for idx in spilled.partition_indices()
+                ]
+                partition_targets = (future.result() for future in as_completed(futures))
+            # every assignment is in a single partition
+            for targets in partition_targets:
+                targets_to_compute.update(targets)
+            logger.info("Computing the constraints of symbolic constants...Done")
+
+        return dict(sorted(targets_to_compute.items()))
+
+    @staticmethod
+    def _divide_spilled_partition(
+        program: Program,
+        spilled: SpilledOutputs,
+        idx: int,
+        declarations: Dict[str, List[str]],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]]:
+        """Reads a partition of the spilled meta outputs and divides its target
+        outputs by assignment."""
+        return SymbolicExecutor._divide_outputs_by_assignments(
+            spilled.read_partition(idx, declarations),
+            program.symbols,
+            interested_output_facts,
+        )
+
+    @staticmethod
+    def symex_incremental(
+        previous: "SymexResult",
+        added_facts: Iterable[Fact] = (),
+        removed_facts: Iterable[Fact] = (),
+    ) -> "SymexResult":
+        """Updates the result of a symbolic execution after input facts changed.
+
+        Only the target outputs whose relations depend on added facts are computed
+        again. Removed facts drop the minimal sets of dependent facts containing
+        them, which leaves the other minimal sets minimal. Changes of facts with
+        symbolic constants, or of facts of undeclared relations, change the
+        meta-program in other ways and are computed from scratch.
+        """
+        added_facts = frozenset(added_facts) - previous.input_facts
+        removed_facts = frozenset(removed_facts) & previous.input_facts
+        if not added_facts and not removed_facts:
+            return previous
+
+        input_facts = (previous.input_facts - removed_facts) | added_facts
+        program = previous.program
+
+        if any(
+            is_arg_symbolic(arg) or isinstance(arg, SYMBOL_WRAPPER_TYPES)
+            for fact in chain(added_facts, removed_facts)
+            for arg in fact.head.args
+        ) or any(fact.head.name not in program.declarations for fact in added_facts):
+            return SymbolicExecutor._cached_symex(
+                previous.rules_or_program,
+                input_facts,
+                previous.interested_output_facts,
+            )
+
+        program = ProgramBuilder.update_program(
+            program,
+            facts=frozenset(program.facts).difference(removed_facts) | added_facts,
+        )
+        affected_relations = SymbolicExecutor._dependent_relations(
+            program, set(fact.head.name for fact in added_facts)
+        )
 
-        # divide output tuples by assignments of symbolic constants and sort them by assignment
-        assignment_outputs = {
-            k: v
-            for k, v in sorted(
-                SymbolicExecutor._divide_outputs_by_assignments(
-                    meta_output_facts, program.symbols
-                ).items()
+        if added_facts:
+            # new target outputs may be derivable under any assignment
+            candidates = SymbolicExecutor._compute_meta_targets(
+                program, previous.interested_output_facts
             )
+        else:
+            # removals only lose target outputs
+            candidates = {
+                symbol_value_assigns: set(target_dependencies)
+                for symbol_value_assigns, target_dependencies in previous.dependencies.items()
+            }
+
+        dependencies = {}
+        targets_to_compute = {}
+        for symbol_value_assigns, target_outputs in candidates.items():
+            previous_dependencies = previous.dependencies.get(symbol_value_assigns, {})
+            reused = {}
+            for target_output in target_outputs:
+                if (
+                    target_output.head.name in affected_relations
+                    or target_output not in previous_dependencies
+                ):
+                    targets_to_compute.setdefault(symbol_value_assigns, set()).add(
+                        target_output
+                    )
+                    continue
+
+                dependent_facts_list = previous_dependencies[target_output]
+                remaining = [
+                    dependent_facts
+                    for dependent_facts in dependent_facts_list
+                    if removed_facts.isdisjoint(dependent_facts)
+                ]
+                if dependent_facts_list and not remaining:
+                    continue  # the target output is not derivable anymore
+                reused[target_output] = remaining
+            dependencies[symbol_value_assigns] = reused
+
+        logger.info(
+            f"Recomputing {sum(map(len, targets_to_compute.values()))} target outputs"
+            f" under {len(targets_to_compute)} assignments..."
+        )
+        for symbol_value_assigns, target_dependencies in (
+            SymbolicExecutor._compute_dependencies(program, targets_to_compute).items()
+        ):
+            dependencies[symbol_value_assigns].update(target_dependencies)
+
+        dependencies = {
+            symbol_value_assigns: target_dependencies
+            for symbol_value_assigns, target_dependencies in dependencies.items()
+            if target_dependencies
         }
 
-        constraints = defaultdict(list)
+        return SymexResult(
+            previous.rules_or_program,
+            input_facts,
+            previous.interested_output_facts,
+            program,
+            dependencies,
+            SymbolicExecutor._collect_constraints(
+                program, dependencies, previous.interested_output_facts
+            ),
+        )
+
+    @staticmethod
+    def _dependent_relations(program: Program, relations: Set[str]) -> Set[str]:
+        """Returns the relations whose tuples may depend on the given relations."""
+        heads_by_body_relation = defaultdict(set)
+        for rule in program.rules:
+            for literal in rule.body:
+                heads_by_body_relation[literal.name].add(rule.head.name)
+
+        dependent = set(relations)
+        pending = list(relations)
+        while pending:
+            for head in heads_by_body_relation[pending.pop()]:
+                if head not in dependent:
+                    dependent.add(head)
+                    pending.append(head)
+        return dependent
+
+    @staticmethod
+    def _compute_dependencies(
+        program: Program,
+        targets_to_compute: Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]],
+    ) -> Dict[Tuple[SymbolValueAssignment, ...], Dict[Fact, List[List[Fact]]]]:
+        """Computes the minimal dependent facts of the target outputs under each assignment."""
 
         logger.info("Computing the constraints of symbolic signs...")
         # compute constraints under each assignment of symbolic constants
         completed_task_count = 0
-        total = len(assignment_outputs)
+        total = len(targets_to_compute)
 
-        with ProcessPoolExecutor(max_workers=os.cpu_count() // 2) as executor:
-            futuers = {
-                executor.submit(
-                    SymbolicExecutor._preprocess_and_compute_constraints,
-                    program,
-                    symbol_value_assigns,
-                    output_facts,
-                    interested_output_fact,
-                )
-                for symbol_value_assigns, output_facts in assignment_outputs.items()
-            }
+        # keep the order of the assignments
+        dependencies = {
+            symbol_value_assigns: {} for symbol_value_assigns in targets_to_compute
+        }
 
-            has_target_num = 0
-            for future in as_completed(futuers):
-                constraints_for_intrst_fact = future.result()
+        futuers = SymbolicExecutor._submit_dependencies(program, targets_to_compute)
+        for future in as_completed(futuers):
+            dependencies[futuers[future]] = future.result()
 
-                completed_task_count += 1
-                logger.info(f"completed_task_count: {completed_task_count}/{total}")
+            completed_task_count += 1
+            logger.info(f"completed_task_count: {completed_task_count}/{total}")
 
-                if constraints_for_intrst_fact:
-                    assert len(constraints_for_intrst_fact) == 1, (
-                        "More than one interested fact? "
-                        "Bug? "
-                        f"constraints_for_intrst_fact: {constraints_for_intrst_fact}"
-                    )
-                    for intrst_fact, condition in constraints_for_intrst_fact.items():
-                        constraints[intrst_fact].append(condition)
-                    has_target_num += 1
+        logger.info("Computing the constraints of symbolic signs...Done")
 
-                # logger.info(f"has_target_num: {has_target_num}/{total}")
+        return {
+            symbol_value_assigns: target_dependencies
+            for symbol_value_assigns, target_dependencies in dependencies.items()
+            if target_dependencies
+        }
 
-        # further encapulate the constraints
-        constraints = {
-            output_fact: OutputCondition(conditions)
+    @staticmethod
+    def _submit_dependencies(
+        program: Program,
+        targets_to_compute: Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]],
+    ) -> Dict[Future, Tuple[SymbolValueAssignment, ...]]:
+        """Submits the computation of the dependencies under each assignment."""
+        # the workers receive the program once and keep it across tasks
+        executor = get_worker_pool(program)
+        return {
+            executor.submit(
+                SymbolicExecutor._compute_target_dependencies,
+                program,
+                symbol_value_assigns,
+                frozenset(target_outputs),
+            ): symbol_value_assigns
+            for symbol_value_assigns, target_outputs in targets_to_compute.items()
+            if target_outputs
+        }
+
+    @staticmethod
+    def _collect_constraints(
+        program: Program,
+        dependencies: Dict[Tuple[SymbolValueAssignment, ...], Dict[Fact, List[List[Fact]]]],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Dict[Fact, OutputCondition]:
+        """Builds the conditions of the interested facts from the dependencies of their target outputs."""
+
+        symbolic_facts = SymbolicExecutor._get_symbolic_facts(program)
+
+        constraints = defaultdict(list)
+        for symbol_value_assigns, target_dependencies in dependencies.items():
+            # at most one condition per interested fact under an assignment
+            for intrst_fact, condition in SymbolicExecutor._assignment_constraints(
+                symbolic_facts,
+                symbol_value_assigns,
+                target_dependencies,
+                interested_output_facts,
+            ).items():
+                constraints[intrst_fact].append(condition)
+
+        # further encapulate the constraints, dropping redundant conditions
+        return {
+            output_fact: normalise_output_condition(conditions)
             for output_fact, conditions in constraints.items()
         }
 
-        logger.info("Computing the constraints of symbolic signs...Done")
+    @staticmethod
+    def _get_symbolic_facts(program: Program) -> List[Fact]:
+        """Returns the facts with symbolic constants, which carry symbol value assignments."""
+        payloads = set(symbol.payload for symbol in program.symbols)
+        return [
+            fact
+            for fact in program.facts
+            if any(arg in payloads for arg in fact.head.args)
+        ]
 
+    @staticmethod
+    def _assignment_constraints(
+        symbolic_facts: List[Fact],
+        symbol_value_assigns: Tuple[SymbolValueAssignment, ...],
+        target_dependencies: Dict[Fact, List[List[Fact]]],
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Dict[Fact, OutputCondition]:
+        """Builds the conditions of the interested facts under one assignment."""
+        _, facts_with_symbol_vals = SymbolicExecutor._concretise_facts(
+            symbolic_facts, dict(symbol_value_assigns)
+        )
+
+        constraints = {}
+        for interested_out_fact in interested_output_facts:
+            target_outputs = SymbolicExecutor._get_target_outputs(
+                target_dependencies, interested_out_fact
+            )
+            if not target_outputs:
+                continue
+            constraints.update(
+                SymbolicExecutor._dependencies_to_constraints(
+                    {
+                        target_output: target_dependencies[target_output]
+                        for target_output in target_outputs
+                    },
+                    facts_with_symbol_vals,
+                    interested_out_fact,
+                )
+            )
         return constraints
 
     @staticmethod
-    @lru_cache(maxsize=None)
+    @lru_cache(maxsize=MATCHED_PAIRS_CACHE_SIZE)
     def _get_matched_symbolic_pairs(output_fact, intrst_fact):
         """Get the matched symbolic pairs between the constraint fact and the target fact."""
         matched_pairs = []
@@ -298,33 +952,20 @@ class SymbolicExecutor:
         return target_outputs
 
     @staticmethod
-    def _preprocess_and_compute_constraints(
+    def _compute_target_dependencies(
         program: Program,
         symbol_value_assigns: Tuple[SymbolValueAssignment],
-        output_facts: List[Fact],
-        interested_out_fact: Fact,
-    ):
-        """Compute constraints for the interested fact under given assigned symbolic values."""
-
-        # get target outputs NOTE: compute constraints for each target output. Do not repeat the computation for the same target output, thus use set.
-        output_facts_set = frozenset(output_facts)
-
-        # get the target outputs that match the interested fact
-        target_outputs = SymbolicExecutor._get_target_outputs(
-            output_facts_set, interested_out_fact
-        )
-
-        if not target_outputs:
-            return None
+        target_outputs: FrozenSet[Fact],
+    ) -> Dict[Fact, List[List[Fact]]]:
+        """Compute the minimal dependent facts of the target outputs under given assigned symbolic values."""
 
         # map symbols to the assigned values
         symbol_value_map = dict(symbol_value_assigns)
 
         # concretise all facts with the assigned values to the symbols
-        (
-            concrete_facts,
-            concretised_facts_with_symbol_vals,
-        ) = SymbolicExecutor._concretise_facts(program.facts, symbol_value_map)
+        concrete_facts, _ = SymbolicExecutor._concretise_facts(
+            program.facts, symbol_value_map
+        )
 
         # create a bare program without facts
         bare_program = ProgramBuilder.update_program(
@@ -332,16 +973,14 @@ class SymbolicExecutor:
             facts=[],
         )
 
-        # compute the constraints
-        constraints_for_intrst_fact = SymbolicExecutor._compute_constraints(
-            bare_program,
-            concrete_facts,
-            concretised_facts_with_symbol_vals,
-            target_outputs,
-            interested_out_fact,
-        )
-
-        return constraints_for_intrst_fact
+        # the provenance of a target output is shared by the interested facts it matches
+        provenancer = Provenancer()
+        return {
+            target_output: provenancer.monotonic_all(
+                bare_program, target_output, concrete_facts
+            )
+            for target_output in target_outputs
+        }
 
     @staticmethod
     def _exists_target(input_facts, target_outputs, program):
@@ -350,21 +989,60 @@ class SymbolicExecutor:
         # flatten the input fatcs before running program
         input_facts = list(flatten_lists_only(input_facts))
 
-        output_facts = run_program(program, input_facts)
+        output_facts = execute(program, input_facts)
         if is_sublist(target_outputs, output_facts):
             return CONTAINS
         else:
             return DOES_NOT_CONTAIN
 
     @staticmethod
-    def _transform_exec_meta_program(program):
-        """Transform program to meta program and execute the meta program."""
+    def _transform_meta_program(
+        program: Program, interested_output_facts=None
+    ) -> Tuple[Program, List[Fact], bool]:
+        """Returns the meta-program, its input facts and whether it filters its outputs."""
+        magic_sets = interested_output_facts is not None and common.META_MAGIC_SETS
+        filter_outputs = magic_sets or (
+            interested_output_facts is not None and common.META_OUTPUT_FILTER
+        )
+        transformed_program = transform_program(
+            program, filter_outputs=filter_outputs, magic_sets=magic_sets
+        )
+        input_facts = (
+            create_output_filter_facts(program, interested_output_facts)
+            if filter_outputs
+            else []
+        )
+        return transformed_program, input_facts, filter_outputs
 
-        transformed_program = transform_program(program)
+    @staticmethod
+    def _transform_exec_meta_program(program, interested_output_facts=None):
+        """Transform program to meta program and execute the meta program.
+
+        Given the interested facts, the meta-program only outputs the tuples that
+        may match one of them, and with magic sets only derives those tuples.
+        """
+
+        transformed_program, input_facts, filter_outputs = (
+            SymbolicExecutor._transform_meta_program(program, interested_output_facts)
+        )
 
         logger.info("Computing the constraints of symbolic constants...")
         # run the transformed program, obtaining all possible outputs
-        output_facts = run_program(transformed_program, [])
+        with instrumentation.timer("meta_program_run"):
+            output_facts = execute(transformed_program, input_facts)
+        instrumentation.count("meta_output_facts", len(output_facts))
+
+        if filter_outputs:
+            # the filter relations output the tuples of the original relations
+            prefix_len = len(FILTER_PREDICATE_PREFIX)
+            output_facts = {
+                Fact(
+                    Literal(fact.head.name[prefix_len:], fact.head.args, True),
+                    [],
+                    fact.symbolic_sign,
+                )
+                for fact in output_facts
+            }
 
         # output fact predicates should only include IDB
         assert is_sublist(
@@ -383,20 +1061,38 @@ class SymbolicExecutor:
         facts_with_symbol_vals: Set[Fact],
         target_outputs: Set[Fact],
         interested_out_fact: Fact,
+        provenancer: Provenancer = None,
     ):
         """
         Compute constraints for the the interested fact that match the target_outputs under given symbol_value_assigns.
         """
 
+        provenancer = Provenancer() if provenancer is None else provenancer
+        return SymbolicExecutor._dependencies_to_constraints(
+            {
+                target_output: provenancer.monotonic_all(
+                    bare_program, target_output, all_facts
+                )
+                for target_output in target_outputs
+            },
+            facts_with_symbol_vals,
+            interested_out_fact,
+        )
+
+    @staticmethod
+    def _dependencies_to_constraints(
+        target_dependencies: Dict[Fact, List[List[Fact]]],
+        facts_with_symbol_vals: Dict[Fact, Set[Any]],
+        interested_out_fact: Fact,
+    ):
+        """
+        Compute constraints for the the interested fact from the minimal dependent facts of its target outputs.
+        """
+
         # constraints for interested_out_fact
         constraints = defaultdict(list)
-        provenancer = Provenancer()
         # handle the matched target outputs one by one
-        for target_output in target_outputs:
-            dependent_facts_list = provenancer.monotonic_all(
-                bare_program, target_output, all_facts
-            )
-
+        for target_output, dependent_facts_list in target_dependencies.items():
             # get the used symbol value assigns set from the dependent facts
             symbol_value_assigns = set(
                 chain.from_iterable(
@@ -443,64 +1139,51 @@ class SymbolicExecutor:
                     for dependent_facts in symsign_dependent_facts_list
                 ]
                 condition = Condition(
-                    new_symbol_value_assigns, new_symsign_dependent_facts_list
+                    new_symbol_value_assigns,
+                    normalise_dependencies(new_symsign_dependent_facts_list),
                 )
             else:
                 condition = Condition(
-                    symbol_value_assigns, symsign_dependent_facts_list
+                    symbol_value_assigns,
+                    normalise_dependencies(symsign_dependent_facts_list),
                 )
 
             constraints[interested_out_fact].append(condition)
 
         # further encapulate the constraints
         constraints = {
-            output_fact: OutputCondition(conditions)
+            output_fact: OutputCondition(remove_subsumed(conditions))
             for output_fact, conditions in constraints.items()
         }
 
         return constraints
 
     @staticmethod
+    @instrumentation.timed("divide_outputs_by_assignments")
     def _divide_outputs_by_assignments(
-        output_facts: List[Rule],
+        output_facts: Iterable[Fact],
         symbols: List[SymbolicNumberWrapper | SymbolicStringWrapper],
-    ) -> Dict[Tuple[Any, ...], List[Rule]]:
+        interested_output_facts: FrozenSet[Fact],
+    ) -> Dict[Tuple[SymbolValueAssignment, ...], Set[Fact]]:
         """
-        Divides output tuples by assignments of symbolic constants.
+        Divides the target outputs, i.e., the output tuples matching an
+        interested fact, by assignments of symbolic constants.
 
-        :param output_facts: A list of output facts to process.
-        :return: A dictionary mapping assigned values to simplified output facts.
+        :param output_facts: The output facts of the meta-program.
+        :return: A dictionary mapping assignments, in order, to simplified target outputs.
         """
-        assignment_outputs = defaultdict(list)
-        symbol_num = len(symbols)
-
-        for output_fact in output_facts:
-            output_arg_num = len(output_fact.head.args)
-
-            assert (
-                output_arg_num > symbol_num
-            ), "Output tuple has less args than the number of symbols?"
-
-            # get last len(symbol_list) args
-            assigned_values = tuple(
-                output_fact.head.args[output_arg_num - symbol_num :]
-            )
-            # the rest args are the real output args
-            output_args = output_fact.head.args[: output_arg_num - symbol_num]
-            simplified_oup_fact = Fact(
-                Literal(output_fact.head.name, output_args, True),
-                [],
-                output_fact.symbolic_sign,
-            )
-
-            # map symbols to the assigned values
-            symbol_value_tuple = SymbolicExecutor._create_symbol_value_tuple(
-                symbols, assigned_values
+        assigned_targets = group_target_outputs(
+            output_facts, len(symbols), interested_output_facts
+        )
+        return dict(
+            sorted(
+                (
+                    SymbolicExecutor._create_symbol_value_tuple(symbols, assigned_values),
+                    target_outputs,
+                )
+                for assigned_values, target_outputs in assigned_targets.items()
             )
-
-            assignment_outputs[symbol_value_tuple].append(simplified_oup_fact)
-
-        return assignment_outputs
+        )
 
     @staticmethod
     def _create_symbol_value_tuple(symbolic_constants, assigned_values):
@@ -568,3 +1251,32 @@ def symex(
     return SymbolicExecutor.symex(
         rules_or_program, input_facts, interested_output_facts
     )
+
+
+def symex_iter(
+    rules_or_program: List[Rule] | Program,
+    input_facts: List[Fact],
+    interested_output_facts: List[Fact],
+    stop: Callable[[Fact, Condition], bool] = None,
+) -> Iterator[Tuple[Fact, Condition]]:
+    return SymbolicExecutor.symex_iter(
+        rules_or_program, input_facts, interested_output_facts, stop
+    )
+
+
+def symex_result(
+    rules_or_program: List[Rule] | Program,
+    input_facts: List[Fact],
+    interested_output_facts: List[Fact],
+) -> SymexResult:
+    return SymbolicExecutor.symex_result(
+        rules_or_program, input_facts, interested_output_facts
+    )
+
+
+def symex_incremental(
+    previous: SymexResult,
+    added_facts: Iterable[Fact] = (),
+    removed_facts: Iterable[Fact] = (),
+) -> SymexResult:
+    return SymbolicExecutor.symex_incremental(previous, added_facts, removed_facts)
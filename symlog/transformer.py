@@ -5,6 +5,7 @@ from symlog.souffle import (
     transform,
     pprint,
     Variable,
+    Underscore,
     Literal,
     Rule,
     Fact,
@@ -17,6 +18,7 @@ from symlog.souffle import (
     SymbolicStringWrapper,
 )
 import symlog.utils as utils
+import symlog.instrumentation as instrumentation
 from typing import Any, List, Dict, Set, Tuple, Optional, DefaultDict, Union
 import itertools
 from more_itertools import unique_everseen
@@ -507,10 +509,299 @@ def symvalue_for_name(x: Number | String | SymbolicNumber | SymbolicString) -> s
         assert False, "Illegal node. Bug?"
 
 
+def filter_relation_name(name: str) -> str:
+    return f"{common.FILTER_PREDICATE_PREFIX}{name}"
+
+
+def _filter_arg_relation_name(name: str, idx: int) -> str:
+    return f"{common.FILTER_PREDICATE_PREFIX}{name}_{idx}"
+
+
+def add_output_filters(
+    transformed: Program, output_types: Dict[str, List[str]]
+) -> Program:
+    # Replaces each output relation of the meta-program with a filter relation
+    # that only keeps the tuples matching an interested fact, e.g.,
+    #
+    # symlog_filter_t(X0, X1, B) :- t(X0, X1, B), symlog_filter_t_0(K, X0), symlog_filter_t_1(K, X1).
+    #
+    # where symlog_filter_t_i(k, v) holds if the i-th argument of the k-th
+    # interested fact is v, or v is a symbolic constant. The interested facts
+    # are input facts, see `create_output_filter_facts`, so that the
+    # meta-program stays the same for all interested facts of the outputs.
+    declarations = dict(transformed.declarations)
+    rules = list(transformed.rules)
+    inputs = list(transformed.inputs)
+    outputs = []
+    key_var = Variable(f"{common.FILTER_PREDICATE_PREFIX}key")
+
+    for name in transformed.outputs:
+        meta_types = declarations[name]
+        args = [
+            Variable(f"{common.FILTER_PREDICATE_PREFIX}arg_{idx}")
+            for idx in range(len(meta_types))
+        ]
+        body = [Literal(name, args, True)]
+        for idx, type in enumerate(output_types[name]):
+            arg_relation = _filter_arg_relation_name(name, idx)
+            declarations[arg_relation] = [common.SOUFFLE_NUMBER, type]
+            inputs.append(arg_relation)
+            body.append(Literal(arg_relation, [key_var, args[idx]], True))
+
+        declarations[filter_relation_name(name)] = list(meta_types)
+        rules.append(Rule(Literal(filter_relation_name(name), args, True), body))
+        outputs.append(filter_relation_name(name))
+
+    return Program(
+        declarations, inputs, outputs, rules, transformed.facts, transformed.symbols
+    )
+
+
+def create_output_filter_facts(
+    program: Program, interested_facts: List[Fact]
+) -> List[Fact]:
+    # The input facts of the filter relations added by `add_output_filters`.
+    symbolic_payloads = [s.payload for s in program.symbols]
+    symbolic_values = {
+        common.SOUFFLE_SYMBOL: [
+            String(x.name) for x in symbolic_payloads if isinstance(x, SymbolicString)
+        ],
+        common.SOUFFLE_NUMBER: [
+            Number(x.name) for x in symbolic_payloads if isinstance(x, SymbolicNumber)
+        ],
+    }
+
+    facts = []
+    for key, fact in enumerate(sorted(interested_facts, key=str)):
+        name = fact.head.name
+        for idx, (arg, type) in enumerate(
+            zip(fact.head.args, program.declarations[name])
+        ):
+            values = symbolic_values.get(type, [])
+            # souffle cannot read a symbol as a number, nor would it match
+            if type != common.SOUFFLE_NUMBER or isinstance(arg, Number):
+                values = [arg] + values
+            for value in values:
+                facts.append(
+                    Fact(
+                        Literal(
+                            _filter_arg_relation_name(name, idx),
+                            [Number(key), value],
+                            True,
+                        ),
+                        [],
+                        False,
+                    )
+                )
+    return facts
+
+
+def demanded_relations(program: Program) -> Set[str]:
+    # The relations of the program whose rules `add_magic_sets` rewrites. A
+    # relation with facts, an input relation, or a relation used under
+    # negation is evaluated in full, and so is every relation it depends on.
+    rules_by_head = defaultdict(list)
+    for rule in program.rules:
+        rules_by_head[rule.head.name].append(rule)
+
+    negated = set(
+        l.name
+        for rule in program.rules
+        for l in rule.body
+        if isinstance(l, Literal) and not l.positive
+    )
+    full = (
+        set(f.head.name for f in program.facts) | set(program.inputs) | negated
+    ) & set(rules_by_head)
+    pending = list(full)
+    while pending:
+        for rule in rules_by_head[pending.pop()]:
+            for l in rule.body:
+                if (
+                    isinstance(l, Literal)
+                    and l.name in rules_by_head
+                    and l.name not in full
+                ):
+                    full.add(l.name)
+                    pending.append(l.name)
+
+    return set(rules_by_head) - full
+
+
+def magic_relation_name(name: str, adornment: str) -> str:
+    return f"{common.MAGIC_PREDICATE_PREFIX}{name}_{adornment}"
+
+
+def _adorned_relation_name(name: str, adornment: str, queries: Dict[str, str]) -> str:
+    # the queried outputs keep their names
+    if queries.get(name) == adornment:
+        return name
+    return f"{common.ADORNED_PREDICATE_PREFIX}{name}_{adornment}"
+
+
+def _is_bound(arg, bound_vars: Set[str]) -> bool:
+    if isinstance(arg, Variable):
+        return arg.name in bound_vars
+    return not isinstance(arg, Underscore)
+
+
+def _adornment(args, bound_vars: Set[str]) -> str:
+    return "".join("b" if _is_bound(arg, bound_vars) else "f" for arg in args)
+
+
+def _bound_args(args, adornment: str) -> list:
+    return [arg for arg, a in zip(args, adornment) if a == "b"]
+
+
+def _arg_vars(args) -> Set[str]:
+    return {
+        arg.name
+        for arg in args
+        if isinstance(arg, Variable) and arg.name != common.DL_UNDERSCORE
+    }
+
+
+def add_magic_sets(
+    transformed: Program, output_types: Dict[str, List[str]], demanded: Set[str]
+) -> Program:
+    # Rewrites the rules of the demanded relations of the meta-program with
+    # magic sets, so that it only derives the tuples needed for the outputs. An
+    # output is queried with its original arguments bound and its binding
+    # variables free, e.g., for t(X, Z) :- r(X, Y), t(Y, Z).
+    #
+    # symlog_magic_t_bbf(X0, X1) :- symlog_filter_t_0(K, X0), symlog_filter_t_1(K, X1).
+    # t(X, Z, B) :- symlog_magic_t_bbf(X, Z), r(X, Y, B), symlog_adorned_t_bff(Y, Z, B), ...
+    # symlog_magic_t_bff(Y) :- symlog_magic_t_bbf(X, Z), r(X, Y, B).
+    #
+    # Bindings pass from left to right through the positive literals of the
+    # bodies. Negated literals are left out of the magic rules, which only
+    # widens the magic sets. The magic sets are seeded by the filter relations
+    # of `add_output_filters`, hence by the interested facts given as input
+    # facts.
+    declarations = dict(transformed.declarations)
+    rules_by_head = defaultdict(list)
+    rules = []
+    for rule in transformed.rules:
+        if rule.head.name in demanded:
+            rules_by_head[rule.head.name].append(rule)
+        else:
+            rules.append(rule)
+    facts = list(transformed.facts)
+
+    queries = {
+        name: "b" * len(output_types[name])
+        + "f" * (len(declarations[name]) - len(output_types[name]))
+        for name in transformed.outputs
+        if name in demanded
+    }
+
+    # seed the magic sets of the outputs with the interested facts
+    key_var = Variable(f"{common.FILTER_PREDICATE_PREFIX}key")
+    for name, adornment in queries.items():
+        if "b" not in adornment:
+            continue
+        args = [
+            Variable(f"{common.FILTER_PREDICATE_PREFIX}arg_{idx}")
+            for idx in range(len(output_types[name]))
+        ]
+        body = [
+            Literal(_filter_arg_relation_name(name, idx), [key_var, arg], True)
+            for idx, arg in enumerate(args)
+        ]
+        rules.append(Rule(Literal(magic_relation_name(name, adornment), args, True), body))
+
+    pending = list(queries.items())
+    seen = set(pending)
+    while pending:
+        name, adornment = pending.pop()
+        declarations[_adorned_relation_name(name, adornment, queries)] = declarations[
+            name
+        ]
+        if "b" in adornment:
+            declarations[magic_relation_name(name, adornment)] = _bound_args(
+                declarations[name], adornment
+            )
+
+        for rule in rules_by_head[name]:
+            bound_vars = _arg_vars(_bound_args(rule.head.args, adornment))
+            body = []
+            if "b" in adornment:
+                body.append(
+                    Literal(
+                        magic_relation_name(name, adornment),
+                        _bound_args(rule.head.args, adornment),
+                        True,
+                    )
+                )
+            magic_body = list(body)
+
+            for l in rule.body:
+                if isinstance(l, Literal) and l.name in demanded:
+                    l_adornment = _adornment(l.args, bound_vars)
+                    if (l.name, l_adornment) not in seen:
+                        seen.add((l.name, l_adornment))
+                        pending.append((l.name, l_adornment))
+                    if "b" in l_adornment:
+                        # the demanded tuples of the body literal
+                        magic_head = Literal(
+                            magic_relation_name(l.name, l_adornment),
+                            _bound_args(l.args, l_adornment),
+                            True,
+                        )
+                        if magic_body:
+                            rules.append(Rule(magic_head, list(magic_body)))
+                        else:
+                            facts.append(Fact(magic_head, [], False))
+                    l = Literal(
+                        _adorned_relation_name(l.name, l_adornment, queries),
+                        l.args,
+                        l.positive,
+                    )
+                body.append(l)
+                if not isinstance(l, Literal):
+                    magic_body.append(l)
+                elif l.positive:
+                    magic_body.append(l)
+                    bound_vars |= _arg_vars(l.args)
+
+            rules.append(
+                Rule(
+                    Literal(
+                        _adorned_relation_name(name, adornment, queries),
+                        rule.head.args,
+                        rule.head.positive,
+                    ),
+                    body,
+                )
+            )
+
+    return Program(
+        declarations,
+        transformed.inputs,
+        transformed.outputs,
+        rules,
+        facts,
+        transformed.symbols,
+    )
+
+
+@instrumentation.timed("transform_program")
 def transform_program(
     program: Program,
     is_store=True,
+    filter_outputs=False,
+    magic_sets=False,
 ) -> Program:
+    """Transforms the program into its meta-program.
+
+    With `filter_outputs`, the outputs only keep the tuples matching the
+    interested facts given as input facts, see `add_output_filters`. With
+    `magic_sets`, the meta-program only derives the tuples these outputs
+    depend on, see `add_magic_sets`; this requires `filter_outputs`.
+    """
+    if magic_sets and not filter_outputs:
+        raise ValueError("Magic sets are seeded by the output filters.")
+
     program = copy.deepcopy(program)
 
     # extract symbolic constants from the program
@@ -520,6 +811,8 @@ def transform_program(
     ), "Symbols must be SymbolicNumberWrapper or SymbolicStringWrapper. Bug?"
 
     symbolic_payloads = list(s.payload for s in program.symbols)
+    # the meta-program extends the declarations of the program
+    output_types = {name: list(program.declarations[name]) for name in program.outputs}
 
     output_file = os.path.join(common.TMP_DIR, f"transformed.dl")
 
@@ -530,6 +823,13 @@ def transform_program(
     abstract_facts = create_abstract_domain_facts(program)
     transformed.facts.extend(abstract_facts)
 
+    if magic_sets:
+        transformed = add_magic_sets(
+            transformed, output_types, demanded_relations(program)
+        )
+    if filter_outputs:
+        transformed = add_output_filters(transformed, output_types)
+
     dir_name = os.path.dirname(output_file)
     if not os.path.exists(dir_name):
         os.makedirs(dir_name)
@@ -7,7 +7,7 @@ from symlog.souffle import (
     Number,
     SYM,
     NUM,
-    collect,
+    iter_collect,
     Literal,
     Rule,
     Fact,
@@ -37,7 +37,8 @@ class TypeAnalyser:
     def _create_init_declarations(self, rules: FrozenSet[Rule], facts: FrozenSet[Fact]):
         # get all literals from rules and facts
         literals = chain.from_iterable(
-            collect(r, lambda x: isinstance(x, Literal)) for r in rules.union(facts)
+            iter_collect(r, lambda x: isinstance(x, Literal))
+            for r in rules.union(facts)
         )
 
         # set the arg type of each literal according to the type of the arg
@@ -0,0 +1,212 @@
+import symlog.common as common
+from symlog.souffle import (
+    Program,
+    SymbolicString,
+    SymbolicNumber,
+    String,
+    Number,
+    compile_program,
+    is_compiled,
+    pprint,
+    program_digest,
+    user_load_facts,
+)
+from symlog.program_builder import ProgramBuilder
+from symlog.transformer import transform_program
+from symlog.binary_cache import BinaryCache, get_binary_cache
+from symlog.parse_cache import get_parse_cache
+from symlog.logger import get_logger
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+import json
+import os
+
+logger = get_logger(__name__)
+
+# Example of a manifest; paths are relative to the manifest file:
+#
+# {
+#   "programs": [
+#     {
+#       "program": "reachability.dl",
+#       "facts": ".",
+#       "symbols": {"alpha": "symbol"},
+#       "substitute": {"a": "alpha"},
+#       "symbolic_signs": ["edge"],
+#       "outputs": ["reachable"]
+#     }
+#   ]
+# }
+#
+# "rules" may replace "program" to symbolically execute the rules of the file
+# as a rule set, i.e., with inferred declarations. "symbolic_signs" lists
+# relations whose facts all have a symbolic sign, or single facts such as
+# 'edge("b", "c").'. Each output relation is symbolically executed on its own,
+# hence yields its own programs.
+
+
+@dataclass
+class WarmupReport:
+    compiled: List[str] = field(default_factory=list)
+    cached: List[str] = field(default_factory=list)
+    failed: List[str] = field(default_factory=list)
+
+
+def load_manifest(manifest_path: Union[str, Path]) -> List[dict]:
+    try:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        raise ValueError(f"File not found: {manifest_path}")
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid manifest {manifest_path}: {e}")
+
+    entries = manifest.get("programs") if isinstance(manifest, dict) else None
+    if not isinstance(entries, list):
+        raise ValueError(f"Manifest {manifest_path} has no list of programs.")
+    for entry in entries:
+        if ("program" in entry) == ("rules" in entry):
+            raise ValueError(f"Exactly one of program and rules is required: {entry}")
+        if not entry.get("outputs"):
+            raise ValueError(f"No outputs given: {entry}")
+    return entries
+
+
+def _to_term(value, symbols: Dict):
+    if isinstance(value, str) and value in symbols:
+        return symbols[value]
+    if isinstance(value, str):
+        return String(value)
+    return Number(value)
+
+
+@contextmanager
+def _fresh_symbol_ids():
+    # The programs contain the internal names of symbolic constants, which are
+    # numbered in creation order. Like a fresh process creating the symbols of
+    # the entry in the order of the manifest, number them from the first one,
+    # and leave the numbering of the calling process as it was.
+    saved = SymbolicString._next_free_id, SymbolicNumber._next_free_id
+    SymbolicString._next_free_id = 1
+    SymbolicNumber._next_free_id = 1
+    try:
+        yield
+    finally:
+        SymbolicString._next_free_id, SymbolicNumber._next_free_id = saved
+
+
+def _create_symbols(symbol_types: Dict[str, str]) -> Dict:
+    return {
+        name: ProgramBuilder.SymbolicConstant(name, symbol_type)
+        for name, symbol_type in symbol_types.items()
+    }
+
+
+def entry_programs(entry: dict, base_dir: Union[str, Path] = ".") -> List[Program]:
+    """Returns the programs `symex` evaluates for the manifest entry.
+
+    These are the bare program used by the provenance computation and the
+    meta-program, for each output relation.
+    """
+    with _fresh_symbol_ids():
+        return _entry_programs(entry, base_dir)
+
+
+def _entry_programs(entry: dict, base_dir: Union[str, Path]) -> List[Program]:
+    base_dir = Path(base_dir)
+    path = base_dir / entry.get("program", entry.get("rules"))
+    parsed = get_parse_cache().parse(str(path), path.read_text())
+
+    # like symex, only the given facts are used, not those of the file
+    facts = []
+    if "facts" in entry:
+        facts = user_load_facts(base_dir / entry["facts"], parsed.declarations, None)
+
+    symbols = _create_symbols(entry.get("symbols", {}))
+    subs = {
+        _to_term(constant, {}): symbols[name]
+        for constant, name in entry.get("substitute", {}).items()
+    }
+    signs = set(entry.get("symbolic_signs", []))
+
+    input_facts = []
+    for fact in facts:
+        is_symbolic = fact.head.name in signs or pprint(fact).strip() in signs
+        if subs:
+            fact = ProgramBuilder.substitute(fact, subs)
+        if is_symbolic:
+            fact = ProgramBuilder.SymbolicSign(fact)
+        input_facts.append(fact)
+    input_facts = frozenset(input_facts)
+
+    programs = []
+    for output in entry["outputs"]:
+        if "rules" in entry:
+            program = ProgramBuilder.infer_whole_program(
+                frozenset(parsed.rules), input_facts, outputs=[output]
+            )
+        else:
+            program = ProgramBuilder.preprocess_parsed_program(
+                parsed, input_facts, outputs=[output]
+            )
+        programs.append(ProgramBuilder.update_program(program, facts=[]))
+        # the interested facts are input facts of the filtered meta-program
+        programs.append(
+            transform_program(
+                program,
+                filter_outputs=common.META_OUTPUT_FILTER or common.META_MAGIC_SETS,
+                magic_sets=common.META_MAGIC_SETS,
+            )
+        )
+    return programs
+
+
+def warm(
+    manifest_path: Union[str, Path],
+    jobs: Optional[int] = None,
+    cache: Optional[BinaryCache] = None,
+) -> WarmupReport:
+    """Compiles the programs of the manifest into the binary cache.
+
+    :param jobs: The number of programs compiled in parallel
+    """
+    cache = get_binary_cache() if cache is None else cache
+    entries = load_manifest(manifest_path)
+    base_dir = Path(manifest_path).parent
+
+    programs = {}
+    for entry in entries:
+        for program in entry_programs(entry, base_dir):
+            programs.setdefault(program_digest(program), program)
+
+    report = WarmupReport()
+    pending = {}
+    for digest, program in programs.items():
+        if is_compiled(program, cache):
+            report.cached.append(digest)
+        else:
+            pending[digest] = program
+
+    logger.info(
+        f"Compiling {len(pending)} programs, {len(report.cached)} are cached..."
+    )
+    # compilation runs in souffle and the C++ compiler, so threads suffice
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count() or 1) as executor:
+        futures = {
+            executor.submit(compile_program, program, cache): digest
+            for digest, program in pending.items()
+        }
+        for future in as_completed(futures):
+            digest = futures[future]
+            try:
+                future.result()
+                report.compiled.append(digest)
+            except (Exception, SystemExit) as e:
+                logger.error(f"Failed to compile program {digest}: {e}")
+                report.failed.append(digest)
+
+    return report
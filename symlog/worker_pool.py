@@ -0,0 +1,227 @@
+import symlog.common as common
+from symlog.souffle import Program, stable_digest
+from symlog.logger import get_logger
+import symlog.instrumentation as instrumentation
+
+from collections import Counter, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from typing import Callable, Iterable, Optional
+import os
+import pickle
+import threading
+
+logger = get_logger(__name__)
+
+# state of a worker process
+_program_dir: Optional[str] = None
+_programs: "OrderedDict[str, Program]" = OrderedDict()
+_load_count = 0
+
+
+def _program_path(program_dir: str, fingerprint: str) -> str:
+    return os.path.join(program_dir, f"{fingerprint}.pickle")
+
+
+def _load_program(fingerprint: str) -> Program:
+    global _load_count
+    with open(_program_path(_program_dir, fingerprint), "rb") as file:
+        program = pickle.load(file)
+    _load_count += 1
+    return program
+
+
+def _init_worker(program_dir: str, fingerprints: Iterable[str]):
+    global _program_dir
+    _program_dir = program_dir
+    _programs.clear()
+    for fingerprint in fingerprints:
+        _programs[fingerprint] = _load_program(fingerprint)
+
+
+def get_worker_program(fingerprint: str) -> Program:
+    """Returns the program with the fingerprint inside a worker process."""
+    program = _programs.get(fingerprint)
+    if program is None:
+        program = _programs[fingerprint] = _load_program(fingerprint)
+        while len(_programs) > common.WORKER_PROGRAM_CACHE_SIZE:
+            _programs.popitem(last=False)
+    else:
+        _programs.move_to_end(fingerprint)
+    return program
+
+
+def _call_with_program(fn: Callable, fingerprint: str, args, kwargs):
+    return fn(get_worker_program(fingerprint), *args, **kwargs)
+
+
+class _MergingFuture(Future):
+    """The future of an instrumented task, merging the stats of the worker."""
+
+    def __init__(self, future: Future):
+        super().__init__()
+        self._future = future
+        future.add_done_callback(self._set_from)
+
+    def cancel(self) -> bool:
+        return self._future.cancel()
+
+    def _set_from(self, future: Future):
+        if future.cancelled():
+            super().cancel()
+            self.set_running_or_notify_cancel()
+        elif future.exception() is not None:
+            self.set_exception(future.exception())
+        else:
+            result, stats = future.result()
+            instrumentation.merge(stats)
+            self.set_result(result)
+
+
+class WorkerPool:
+    """A long-lived process pool whose tasks refer to programs by fingerprint.
+
+    A program is pickled once, into a directory shared with the workers, and
+    each worker loads it at most once. The programs given at construction are
+    loaded by the workers when they start. The file of a program is removed
+    once no task refers to it and it is not among the programs the workers
+    keep, and is written again if the program is submitted later.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, programs: Iterable[Program] = ()
+    ):
+        self.max_workers = common.SYMEX_MAX_WORKERS if max_workers is None else max_workers
+        self._program_dir = TemporaryDirectory(prefix="symlog_programs_")
+        self._published = OrderedDict()
+        # the number of unfinished tasks of each published program
+        self._pending = Counter()
+        # the fingerprint of the latest program, which is usually submitted
+        # again; submitted programs are not modified
+        self._latest = (None, None)
+        self._lock = threading.Lock()
+        for program in programs:
+            self.publish(program)
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=_init_worker,
+            initargs=(
+                self._program_dir.name,
+                tuple(self._published)[-common.WORKER_PROGRAM_CACHE_SIZE :],
+            ),
+        )
+
+    def _publish(self, program: Program) -> str:
+        # requires the lock
+        latest_program, fingerprint = self._latest
+        if latest_program is not program:
+            fingerprint = stable_digest(program)
+            self._latest = (program, fingerprint)
+
+        if fingerprint not in self._published:
+            path = Path(_program_path(self._program_dir.name, fingerprint))
+            temp_path = path.with_suffix(".tmp")
+            with temp_path.open("wb") as file:
+                pickle.dump(program, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+            self._published[fingerprint] = path
+        self._published.move_to_end(fingerprint)
+        return fingerprint
+
+    def _evict(self):
+        # requires the lock; the workers started by `_create_executor` load the
+        # most recently published programs
+        kept = list(self._published)[-common.WORKER_PROGRAM_CACHE_SIZE :]
+        for fingerprint in list(self._published):
+            if fingerprint not in kept and not self._pending[fingerprint]:
+                self._published.pop(fingerprint).unlink(missing_ok=True)
+
+    def _release(self, fingerprint: str):
+        with self._lock:
+            self._pending[fingerprint] -= 1
+            if not self._pending[fingerprint]:
+                del self._pending[fingerprint]
+                self._evict()
+
+    def publish(self, program: Program) -> str:
+        """Makes the program available to the workers and returns its fingerprint."""
+        with self._lock:
+            fingerprint = self._publish(program)
+            self._evict()
+        return fingerprint
+
+    def submit(self, fn: Callable, program: Program, *args, **kwargs) -> Future:
+        """Schedules fn(program, *args, **kwargs) in a worker."""
+        with self._lock:
+            fingerprint = self._publish(program)
+            self._pending[fingerprint] += 1
+        task = (_call_with_program, fn, fingerprint, args, kwargs)
+        # the workers record the stats of instrumented tasks and send them back
+        if instrumentation.is_enabled():
+            task = (instrumentation.call_collecting,) + task
+
+        try:
+            try:
+                future = self._executor.submit(*task)
+            except BrokenProcessPool:
+                logger.warning("A worker died unexpectedly. Restarting the worker pool.")
+                with self._lock:
+                    self._executor.shutdown(wait=False)
+                    self._executor = self._create_executor()
+                future = self._executor.submit(*task)
+        except Exception:
+            self._release(fingerprint)
+            raise
+        future.add_done_callback(lambda _: self._release(fingerprint))
+
+        if instrumentation.is_enabled():
+            return _MergingFuture(future)
+        return future
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        self._program_dir.cleanup()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+_default_pool = None
+_default_pool_lock = threading.Lock()
+
+
+def get_worker_pool(program: Optional[Program] = None) -> WorkerPool:
+    """Returns the process-wide worker pool.
+
+    The pool is created on first use; its workers preload the given program.
+    With SYMLOG_DISTRIBUTED_ADDRESS, it is a coordinator of remote workers.
+    """
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is None:
+            if common.DISTRIBUTED_ADDRESS:
+                from symlog.distributed import Coordinator
+
+                _default_pool = Coordinator()
+            else:
+                _default_pool = WorkerPool(
+                    programs=[] if program is None else [program]
+                )
+        return _default_pool
+
+
+def shutdown_worker_pool():
+    """Stops the workers of the process-wide pool."""
+    global _default_pool
+    with _default_pool_lock:
+        if _default_pool is not None:
+            _default_pool.shutdown()
+            _default_pool = None
@@ -0,0 +1,14 @@
+from symlog.result_store import ResultStore, set_result_store
+import symlog.common as common
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def result_store(tmp_path, monkeypatch):
+    """Keeps the results of every test out of the user's result store."""
+    monkeypatch.setattr(common, "RESULT_STORE", True)
+    store = ResultStore(tmp_path / "results.sqlite")
+    set_result_store(store)
+    yield store
+    set_result_store(None)
@@ -0,0 +1,158 @@
+from symlog.backends import Backend, BackendSelector, get_backend
+from symlog.common import NATIVE_MODE, SOUFFLE_COMPILE_MODE, SOUFFLE_LIBRARY_MODE
+import symlog.common as common
+from symlog.souffle import parse, Fact, Literal, Rule, String, Variable
+import symlog.souffle as souffle
+import symlog.souffle_library as souffle_library
+
+import pytest
+
+
+PROGRAM = parse(
+    """
+    .decl edge(x: symbol, y: symbol)
+    .decl reachable(x: symbol, y: symbol)
+    .input edge
+    .output reachable
+    reachable(x, y) :- edge(x, y).
+    """
+)
+
+EDGE = Fact(Literal("edge", [String("a"), String("b")], True), [], False)
+REACHABLE = Fact(Literal("reachable", [String("a"), String("b")], True), [], False)
+
+
+class FakeBackend(Backend):
+    def __init__(self, name, prepare_time, run_time):
+        self.name = name
+        self.default_prepare_time = prepare_time
+        self.default_run_time = run_time
+        self.prepared = False
+        self.runs = 0
+
+    def is_prepared(self, program, fingerprint=None):
+        return self.prepared
+
+    def prepare(self, program):
+        self.prepared = True
+
+    def run(self, program, facts):
+        self.runs += 1
+        return {REACHABLE}
+
+
+def test_native_backend_is_registered():
+    assert get_backend(NATIVE_MODE).run(PROGRAM, [EDGE]) == {REACHABLE}
+
+
+def test_unknown_backend():
+    with pytest.raises(ValueError):
+        get_backend("unknown")
+
+
+def test_select_cheapest_backend_for_single_use():
+    interpreter = FakeBackend("interpreter", 0.0, 0.1)
+    compiler = FakeBackend("compiler", 30.0, 0.01)
+    selector = BackendSelector([interpreter, compiler])
+
+    assert selector.execute(PROGRAM, [EDGE]) == {REACHABLE}
+    assert (interpreter.runs, compiler.runs) == (1, 0)
+
+
+def test_select_amortises_preparation_over_reuse():
+    interpreter = FakeBackend("interpreter", 0.0, 0.1)
+    compiler = FakeBackend("compiler", 30.0, 0.01)
+    selector = BackendSelector([interpreter, compiler])
+
+    selector.execute(PROGRAM, [EDGE], reuse=1000)
+    assert compiler.prepared
+    # once prepared, the compiled program is always cheaper
+    selector.execute(PROGRAM, [EDGE])
+    assert (interpreter.runs, compiler.runs) == (0, 2)
+
+
+def test_select_uses_observed_timings():
+    slow = FakeBackend("slow", 0.0, 0.0)
+    fast = FakeBackend("fast", 0.0, 0.001)
+    selector = BackendSelector([slow, fast])
+    fingerprint = "program"
+
+    assert selector.select(PROGRAM, fingerprint, 1) is slow
+    selector.record(slow, fingerprint, 1, None, 1.0)
+    assert selector.select(PROGRAM, fingerprint, 1) is fast
+
+
+def test_forced_mode():
+    interpreter = FakeBackend("interpreter", 0.0, 0.1)
+    compiler = FakeBackend("compiler", 30.0, 0.01)
+    selector = BackendSelector([interpreter, compiler])
+
+    selector.execute(PROGRAM, [EDGE], mode="compiler")
+    assert (interpreter.runs, compiler.runs) == (0, 1)
+
+
+def test_forced_mode_falls_back_if_not_applicable(monkeypatch):
+    native = FakeBackend("native", 0.0, 0.0)
+    native.is_applicable = lambda program, input_size: False
+    interpreter = FakeBackend("interpreter", 0.0, 0.1)
+    selector = BackendSelector([native, interpreter])
+    monkeypatch.setattr(common, "EXECUTION_MODE", "native")
+
+    assert selector.execute(PROGRAM, [EDGE]) == {REACHABLE}
+    selector.execute(PROGRAM, [EDGE], mode="native")
+    assert (native.runs, interpreter.runs) == (0, 2)
+
+
+def test_library_backend_is_opt_in(monkeypatch):
+    monkeypatch.setattr(souffle_library, "is_toolchain_available", lambda: True)
+    library = get_backend(SOUFFLE_LIBRARY_MODE)
+
+    monkeypatch.setattr(common, "LIBRARY_BACKEND", False)
+    assert not library.is_available()
+    monkeypatch.setattr(common, "LIBRARY_BACKEND", True)
+    assert library.is_available()
+
+
+def test_outputs_are_written_by_a_writing_backend(monkeypatch, tmp_path):
+    native = FakeBackend("native", 0.0, 0.0)
+    souffle = FakeBackend("souffle", 0.0, 0.1)
+    souffle.writes_outputs = True
+    selector = BackendSelector([native, souffle])
+    monkeypatch.setattr(common, "EXECUTION_MODE", "native")
+
+    selector.execute_to(PROGRAM, [EDGE], tmp_path)
+    assert (native.runs, souffle.runs) == (0, 1)
+    assert (tmp_path / "reachable.csv").read_text() == "a\tb\n"
+
+    # a given mode is used anyway
+    selector.execute_to(PROGRAM, [EDGE], tmp_path, mode="native")
+    assert (native.runs, souffle.runs) == (1, 1)
+
+
+def test_native_backend_rejects_negation():
+    x, y = Variable("x"), Variable("y")
+    # negated atoms are built by the transformations, not parsed
+    program = PROGRAM._replace(
+        rules=[
+            Rule(
+                Literal("reachable", [x, y], True),
+                [Literal("edge", [x, y], True), Literal("edge", [y, x], False)],
+            )
+        ]
+    )
+    native = get_backend(NATIVE_MODE)
+
+    assert native.is_applicable(PROGRAM, 1)
+    assert not native.is_applicable(program, 1)
+
+
+def test_prepared_backends_reuse_the_fingerprint(monkeypatch):
+    digests = []
+    for module in (souffle, souffle_library):
+        monkeypatch.setattr(
+            module, "program_digest", lambda program: digests.append(program) or "0"
+        )
+
+    for mode in (SOUFFLE_COMPILE_MODE, SOUFFLE_LIBRARY_MODE):
+        assert not get_backend(mode).is_prepared(PROGRAM, "1" * 64)
+    assert not digests
@@ -0,0 +1,142 @@
+from symlog.binary_cache import BinaryCache
+
+import fcntl
+import os
+import time
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+
+def make_build(content, calls=None, delay=0):
+    def build(path):
+        if calls is not None:
+            calls.append(path.name)
+        time.sleep(delay)
+        path.write_bytes(content)
+
+    return build
+
+
+def test_build_once_then_hit(tmp_path):
+    cache = BinaryCache(tmp_path)
+    calls = []
+
+    with cache.acquire("binary_a", make_build(b"a", calls)) as path:
+        assert path.read_bytes() == b"a"
+    with cache.acquire("binary_a", make_build(b"a", calls)) as path:
+        assert path.read_bytes() == b"a"
+
+    assert calls == ["binary_a"]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.builds) == (1, 1, 1)
+
+
+def test_single_flight_build(tmp_path):
+    calls = []
+
+    def use(_):
+        cache = BinaryCache(tmp_path)
+        with cache.acquire("binary_a", make_build(b"a", calls, delay=0.2)) as path:
+            return path.read_bytes()
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(use, range(4)))
+
+    assert results == [b"a"] * 4
+    assert len(calls) == 1
+
+
+def test_evict_by_count(tmp_path):
+    cache = BinaryCache(tmp_path, max_entries=2)
+
+    for i, key in enumerate(["binary_a", "binary_b", "binary_c"]):
+        with cache.acquire(key, make_build(b"x")):
+            pass
+        # make the access order visible to the file system timestamps
+        os.utime(cache.path_for(key), (i, i))
+
+    cache.evict()
+    remaining = sorted(path.name for path, _, _ in cache.entries())
+    assert remaining == ["binary_b", "binary_c"]
+    assert cache.stats.evictions == 1
+    # the lock file of the evicted entry is removed with it
+    assert not (tmp_path / "binary_a.lock").exists()
+
+    # an evicted entry is built again
+    calls = []
+    with cache.acquire("binary_a", make_build(b"a", calls)) as path:
+        assert path.read_bytes() == b"a"
+    assert calls == ["binary_a"]
+
+
+def test_evict_by_size_skips_entries_in_use(tmp_path):
+    cache = BinaryCache(tmp_path, max_bytes=4)
+
+    with cache.acquire("binary_a", make_build(b"aaaa")) as path_a:
+        with cache.acquire("binary_b", make_build(b"bbbb")):
+            pass
+        # binary_a is in use, so binary_b is evicted instead
+        assert path_a.exists()
+
+    remaining = [path.name for path, _, _ in cache.entries()]
+    assert remaining == ["binary_a"]
+
+
+def test_failed_build_leaves_no_entry(tmp_path):
+    cache = BinaryCache(tmp_path)
+
+    def build(path):
+        raise RuntimeError("compile error")
+
+    with pytest.raises(RuntimeError):
+        with cache.acquire("binary_a", build):
+            pass
+
+    assert cache.entries() == []
+    assert not (tmp_path / "binary_a.lock").exists()
+
+
+def test_waiting_for_an_evicted_entry(tmp_path):
+    cache = BinaryCache(tmp_path)
+    with cache.acquire("binary_a", make_build(b"a")):
+        pass
+    calls = []
+
+    def use(_):
+        with BinaryCache(tmp_path).acquire(
+            "binary_a", make_build(b"b", calls, delay=0.1)
+        ) as path:
+            return path.read_bytes()
+
+    # the users wait for the lock of the entry while it is evicted
+    with open(tmp_path / "binary_a.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = executor.map(use, range(4))
+            time.sleep(0.1)
+            (tmp_path / "binary_a").unlink()
+            (tmp_path / "binary_a.lock").unlink()
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            results = list(results)
+
+    # they lock the new lock file, hence the entry is built once
+    assert results == [b"b"] * 4
+    assert calls == ["binary_a"]
+
+
+def test_evict_after_the_body_raises(tmp_path):
+    cache = BinaryCache(tmp_path, max_entries=1)
+    with cache.acquire("binary_a", make_build(b"a")):
+        pass
+    os.utime(cache.path_for("binary_a"), (0, 0))
+
+    with pytest.raises(RuntimeError):
+        with cache.acquire("binary_b", make_build(b"b")):
+            raise RuntimeError("body failed")
+    assert cache.stats.evictions == 1
+    assert [path.name for path, _, _ in cache.entries()] == ["binary_b"]
+
+
+def test_invalid_key(tmp_path):
+    cache = BinaryCache(tmp_path)
+    with pytest.raises(ValueError):
+        cache.path_for("../binary_a")
@@ -0,0 +1,163 @@
+from symlog.souffle import parse, stable_digest
+from symlog.distributed import Coordinator, run_worker
+from symlog.cli import main
+import symlog.common as common
+import symlog.instrumentation as instrumentation
+
+from multiprocessing import Process
+import os
+import socket
+import threading
+import time
+import pytest
+
+AUTHKEY = b"test"
+
+
+def describe(program, suffix):
+    instrumentation.count("described")
+    return stable_digest(program), suffix
+
+
+def fail(program):
+    raise ValueError("failed")
+
+
+def sleep(program, seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def die(program):
+    os._exit(1)
+
+
+def make_program(fact_num):
+    facts = "".join(f'edge("a", "{i}").\n' for i in range(fact_num))
+    return parse(".decl edge(x: symbol, y: symbol)\n" + facts)
+
+
+def start_workers(address, num):
+    workers = [
+        threading.Thread(target=run_worker, args=(address, AUTHKEY), daemon=True)
+        for _ in range(num)
+    ]
+    for worker in workers:
+        worker.start()
+    return workers
+
+
+@pytest.mark.parametrize("address", ["tcp://127.0.0.1:0", "unix"])
+def test_coordinator_runs_tasks_on_workers(address, tmp_path):
+    if address == "unix":
+        address = f"unix://{tmp_path / 'coordinator.sock'}"
+    first, second = make_program(3), make_program(4)
+
+    with Coordinator(address, AUTHKEY) as coordinator:
+        futures = [coordinator.submit(describe, first, i) for i in range(10)]
+        futures += [coordinator.submit(describe, second, i) for i in range(10)]
+        workers = start_workers(coordinator.address, 2)
+        results = [future.result(timeout=30) for future in futures]
+
+        with pytest.raises(ValueError):
+            coordinator.submit(fail, first).result(timeout=30)
+
+    for worker in workers:
+        worker.join(timeout=30)
+        assert not worker.is_alive()
+
+    assert [suffix for _, suffix in results] == list(range(10)) * 2
+    assert {digest for digest, _ in results[:10]} == {stable_digest(first)}
+    assert {digest for digest, _ in results[10:]} == {stable_digest(second)}
+
+
+def test_coordinator_merges_worker_stats():
+    program = make_program(1)
+
+    instrumentation.enable()
+    instrumentation.reset()
+    try:
+        with Coordinator("tcp://127.0.0.1:0", AUTHKEY) as coordinator:
+            # the stats are recorded in the process of the worker
+            worker = Process(target=run_worker, args=(coordinator.address, AUTHKEY))
+            worker.start()
+            for i in range(3):
+                assert coordinator.submit(describe, program, i).result(timeout=30)[1] == i
+        worker.join(timeout=30)
+        assert instrumentation.snapshot()["counters"] == {"described": 3}
+    finally:
+        instrumentation.disable()
+        instrumentation.reset()
+
+
+def test_coordinator_survives_dropped_connections():
+    with Coordinator("tcp://127.0.0.1:0", AUTHKEY) as coordinator:
+        # e.g., a port probe
+        host, port = coordinator.address[len("tcp://") :].rsplit(":", 1)
+        socket.create_connection((host, int(port))).close()
+
+        start_workers(coordinator.address, 1)
+        assert coordinator.submit(describe, make_program(1), 0).result(timeout=30)[1] == 0
+
+
+def test_coordinator_shutdown_waits_for_running_tasks():
+    coordinator = Coordinator("tcp://127.0.0.1:0", AUTHKEY)
+    start_workers(coordinator.address, 1)
+    future = coordinator.submit(sleep, make_program(1), 0.5)
+    # the worker takes the task before the shutdown
+    while not coordinator._tasks.empty():
+        time.sleep(0.01)
+    coordinator.shutdown()
+
+    assert future.done() and future.result() == 0.5
+
+
+def test_coordinator_cancels_pending_tasks_on_shutdown():
+    coordinator = Coordinator("tcp://127.0.0.1:0", AUTHKEY)
+    future = coordinator.submit(describe, make_program(1), 0)
+    coordinator.shutdown()
+
+    assert future.cancelled()
+
+
+def test_coordinator_fails_tasks_killing_workers(monkeypatch):
+    monkeypatch.setattr(common, "DISTRIBUTED_MAX_ATTEMPTS", 2)
+
+    with Coordinator("tcp://127.0.0.1:0", AUTHKEY) as coordinator:
+        future = coordinator.submit(die, make_program(1))
+        workers = [
+            Process(target=run_worker, args=(coordinator.address, AUTHKEY))
+            for _ in range(2)
+        ]
+        for worker in workers:
+            worker.start()
+        with pytest.raises(RuntimeError):
+            future.result(timeout=30)
+
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 1
+
+
+def test_coordinator_drops_unused_programs(monkeypatch):
+    monkeypatch.setattr(common, "WORKER_PROGRAM_CACHE_SIZE", 1)
+    programs = [make_program(i) for i in range(3)]
+
+    with Coordinator("tcp://127.0.0.1:0", AUTHKEY) as coordinator:
+        start_workers(coordinator.address, 1)
+        # an evicted program is published again
+        for program in programs + programs[:1] * 2:
+            assert coordinator.submit(describe, program, 0).result(timeout=30) == (
+                stable_digest(program),
+                0,
+            )
+        # the single worker finished the previous tasks before taking the last
+        assert list(coordinator._programs) == [stable_digest(programs[0])]
+
+
+def test_distributed_execution_requires_a_key(monkeypatch):
+    monkeypatch.setattr(common, "DISTRIBUTED_AUTHKEY", "")
+
+    with pytest.raises(ValueError):
+        Coordinator("tcp://127.0.0.1:0")
+    assert main(["worker", "tcp://127.0.0.1:7100"]) == 1
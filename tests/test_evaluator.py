@@ -0,0 +1,131 @@
+from symlog.souffle import parse, run_program, Rule, Fact, Literal, String, Number
+from symlog.evaluator import evaluate_program
+
+import shutil
+import pytest
+
+
+REACHABILITY = """
+.decl edge(x: symbol, y: symbol)
+.decl reachable(x: symbol, y: symbol)
+.input edge
+.output reachable
+reachable(x, y) :- edge(x, y).
+reachable(x, z) :- edge(x, y), reachable(y, z).
+"""
+
+SAME_GENERATION = """
+.decl parent(x: symbol, y: symbol)
+.decl person(x: symbol)
+.decl sg(x: symbol, y: symbol)
+.input parent
+.output sg
+person("a").
+person("b").
+sg(x, x) :- person(x).
+sg(x, y) :- parent(x, xp), sg(xp, yp), parent(y, yp).
+"""
+
+CONSTANTS_AND_REPEATS = """
+.decl r(x: symbol, y: number)
+.decl s(x: symbol, y: symbol)
+.decl t(x: symbol, y: number)
+.decl loop(x: symbol)
+.input r
+.input s
+.output t
+.output loop
+t(x, 1) :- r(x, 1), s(x, _).
+t("c", y) :- r("c", y).
+loop(x) :- s(x, x).
+"""
+
+
+def fact(name, *args):
+    return Fact(
+        Literal(
+            name,
+            [String(a) if isinstance(a, str) else Number(a) for a in args],
+            True,
+        ),
+        [],
+        False,
+    )
+
+
+CASES = [
+    (
+        REACHABILITY,
+        [fact("edge", "a", "b"), fact("edge", "b", "c"), fact("edge", "c", "a")],
+    ),
+    (
+        SAME_GENERATION,
+        [fact("parent", "c", "a"), fact("parent", "d", "b"), fact("parent", "e", "c")],
+    ),
+    (
+        CONSTANTS_AND_REPEATS,
+        [
+            fact("r", "a", 1),
+            fact("r", "b", 1),
+            fact("r", "c", 2),
+            fact("s", "a", "z"),
+            fact("s", "d", "d"),
+        ],
+    ),
+]
+
+
+def test_evaluate_reachability():
+    program = parse(REACHABILITY)
+    facts = [fact("edge", "a", "b"), fact("edge", "b", "c")]
+
+    assert evaluate_program(program, facts) == {
+        fact("reachable", "a", "b"),
+        fact("reachable", "b", "c"),
+        fact("reachable", "a", "c"),
+    }
+
+
+def test_evaluate_constants_and_repeated_variables():
+    program, facts = CASES[2]
+
+    assert evaluate_program(parse(program), facts) == {
+        fact("t", "a", 1),
+        fact("t", "c", 2),
+        fact("loop", "d"),
+    }
+
+
+def test_evaluate_inline_facts():
+    program, facts = CASES[1]
+
+    assert evaluate_program(parse(program), facts) == {
+        fact("sg", "a", "a"),
+        fact("sg", "b", "b"),
+        fact("sg", "c", "c"),
+        fact("sg", "d", "d"),
+        fact("sg", "e", "e"),
+    }
+
+
+def test_evaluate_ignores_non_input_facts():
+    program = parse(REACHABILITY)
+    facts = [fact("edge", "a", "b"), fact("reachable", "x", "y")]
+
+    assert evaluate_program(program, facts) == {fact("reachable", "a", "b")}
+
+
+def test_evaluate_negation_is_not_supported():
+    program = parse(REACHABILITY)
+    head = program.rules[0].head
+    program.rules.append(Rule(head, [Literal("edge", head.args, False)]))
+
+    with pytest.raises(NotImplementedError):
+        evaluate_program(program, [])
+
+
+@pytest.mark.skipif(shutil.which("souffle") is None, reason="souffle is not installed")
+@pytest.mark.parametrize("program, facts", CASES)
+def test_evaluate_equivalent_to_souffle(program, facts):
+    program = parse(program)
+    assert evaluate_program(program, facts) == run_program(program, facts)
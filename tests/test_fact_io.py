@@ -0,0 +1,108 @@
+from symlog.souffle import (
+    parse,
+    fact_io,
+    fact_to_row,
+    load_facts,
+    write_facts,
+    Fact,
+    Literal,
+    String,
+    Number,
+)
+from symlog.common import SOUFFLE_FILE_IO, SOUFFLE_STREAM_IO
+
+import sys
+import pytest
+from subprocess import run
+
+PROGRAM = parse(
+    """
+    .decl edge(x: symbol, y: number)
+    .decl unused(x: symbol)
+    .decl reachable(x: symbol, y: number)
+    .decl empty(x: symbol)
+    .input edge
+    .input unused
+    .output reachable
+    .output empty
+    """
+)
+
+# stands in for souffle: copies the edges to the reachable relation
+COPY_SCRIPT = """
+import sys, os
+input_directory, output_directory = sys.argv[1:]
+with open(os.path.join(input_directory, "edge.facts")) as source:
+    rows = source.read()
+with open(os.path.join(output_directory, "reachable.csv"), "w") as target:
+    target.write(rows)
+with open(os.path.join(output_directory, "empty.csv"), "w") as target:
+    pass
+"""
+
+
+def fact(name, *args):
+    return Fact(
+        Literal(
+            name,
+            [String(a) if isinstance(a, str) else Number(a) for a in args],
+            True,
+        ),
+        [],
+        False,
+    )
+
+
+@pytest.mark.parametrize("io_mode", [SOUFFLE_FILE_IO, SOUFFLE_STREAM_IO])
+def test_exchange_facts(io_mode):
+    facts = [fact("edge", "a", 1), fact("edge", "b", 2), fact("other", "c")]
+
+    with fact_io(PROGRAM, facts, io_mode) as io:
+        cmd = [sys.executable, "-c", COPY_SCRIPT, io.input_directory, io.output_directory]
+        run(cmd, check=True)
+        output_facts = io.output_facts()
+
+    assert output_facts == {fact("reachable", "a", 1), fact("reachable", "b", 2)}
+
+
+def test_stream_without_reader_or_writer():
+    # a failing souffle never opens its pipes, which must not block
+    with fact_io(PROGRAM, [fact("edge", "a", 1)], SOUFFLE_STREAM_IO) as io:
+        run([sys.executable, "-c", "pass"], check=True)
+        assert io.output_facts() == set()
+
+
+def test_unknown_io_mode():
+    with pytest.raises(ValueError):
+        fact_io(PROGRAM, [], "unknown")
+
+
+def test_write_and_load_facts(tmp_path):
+    facts = {
+        fact("edge", "a", 1),
+        fact("edge", "b", 1),
+        fact("reachable", "a", 1),
+        fact("reachable", "1", 2),
+    }
+
+    write_facts(tmp_path, facts)
+    loaded = load_facts(tmp_path, PROGRAM.declarations, [])
+
+    assert loaded == facts
+    # equal raw values of a column share one term
+    edge_numbers = [f.head.args[1] for f in loaded if f.head.name == "edge"]
+    assert edge_numbers[0] is edge_numbers[1]
+
+
+def test_fact_to_row():
+    row = fact_to_row(
+        Fact(Literal("r", [String('"a\'b"'), Number(-3)], True), [], False)
+    )
+    assert row == ["ab", "-3"]
+
+
+def test_load_facts_with_too_many_arguments(tmp_path):
+    (tmp_path / "edge.facts").write_text("a\t1\textra\n")
+
+    with pytest.raises(SystemExit):
+        load_facts(tmp_path, PROGRAM.declarations, [])
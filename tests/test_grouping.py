@@ -0,0 +1,74 @@
+from symlog.souffle import Fact, Literal, String, Number
+from symlog.grouping import group_target_outputs
+import symlog.grouping as grouping
+
+from collections import defaultdict
+import random
+import pytest
+
+
+def _output_facts():
+    random.seed(0)
+    constants = [String(f"c{i}") for i in range(5)] + [String("symlog_symbolic_1")]
+    facts = []
+    for _ in range(3000):
+        args = [random.choice(constants) for _ in range(2)]
+        # the binding columns of two symbolic constants
+        args += [random.choice(constants), Number(random.randrange(3))]
+        facts.append(Fact(Literal("t", args, True), [], False))
+    facts.append(Fact(Literal("s", [String("c1")] * 3, True), [], False))
+    return facts
+
+
+INTERESTED_FACTS = frozenset(
+    {
+        Fact(Literal("t", [String("c1"), String("c2")], True), [], False),
+        Fact(Literal("t", [String("c3"), String("c3")], True), [], False),
+        Fact(Literal("s", [String("c1")], True), [], False),
+    }
+)
+
+
+def _expected(output_facts):
+    expected = defaultdict(set)
+    for fact in output_facts:
+        args = fact.head.args[:-2]
+        target = Fact(Literal(fact.head.name, args, True), [], False)
+        if any(
+            target.head.name == interested.head.name
+            and len(args) == len(interested.head.args)
+            and all(
+                arg == value or arg == String("symlog_symbolic_1")
+                for arg, value in zip(args, interested.head.args)
+            )
+            for interested in INTERESTED_FACTS
+        ):
+            expected[tuple(fact.head.args[-2:])].add(target)
+    return expected
+
+
+def test_group_target_outputs():
+    output_facts = _output_facts()
+
+    assert group_target_outputs(output_facts, 2, INTERESTED_FACTS, columnar=False) == (
+        _expected(output_facts)
+    )
+
+
+def test_group_target_outputs_columnar():
+    pytest.importorskip("numpy")
+    output_facts = _output_facts()
+
+    assert group_target_outputs(output_facts, 2, INTERESTED_FACTS, columnar=True) == (
+        _expected(output_facts)
+    )
+    assert group_target_outputs(output_facts[:1], 0, INTERESTED_FACTS) == (
+        group_target_outputs(output_facts[:1], 0, INTERESTED_FACTS, columnar=True)
+    )
+
+
+def test_group_target_outputs_without_numpy(monkeypatch):
+    monkeypatch.setattr(grouping, "np", None)
+
+    with pytest.raises(ValueError):
+        group_target_outputs(_output_facts(), 2, INTERESTED_FACTS, columnar=True)
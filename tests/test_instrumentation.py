@@ -0,0 +1,71 @@
+import symlog.instrumentation as instrumentation
+from symlog.worker_pool import WorkerPool
+from symlog.souffle import parse
+
+import json
+import pstats
+import pytest
+
+
+@pytest.fixture
+def instrumented():
+    instrumentation.reset()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.reset()
+
+
+@instrumentation.timed("recurse")
+def recurse(n):
+    instrumentation.count("recurse_calls")
+    return 0 if n == 0 else recurse(n - 1)
+
+
+def test_disabled_records_nothing():
+    instrumentation.reset()
+    recurse(3)
+    with instrumentation.timer("stage"):
+        pass
+
+    assert instrumentation.snapshot() == {"counters": {}, "timers": {}}
+
+
+def test_counters_and_nested_timers(instrumented):
+    recurse(3)
+    recurse(0)
+
+    stats = instrumentation.snapshot()
+    assert stats["counters"] == {"recurse_calls": 5}
+    # nested calls are part of the outermost one
+    assert stats["timers"]["recurse"]["calls"] == 2
+
+
+def test_export(instrumented, tmp_path):
+    with instrumentation.timer("stage"):
+        instrumentation.count("facts", 3)
+
+    instrumentation.export_json(tmp_path / "stats.json")
+    assert json.loads((tmp_path / "stats.json").read_text())["counters"] == {"facts": 3}
+
+    instrumentation.dump_stats(tmp_path / "stats.prof")
+    stats = pstats.Stats(str(tmp_path / "stats.prof"))
+    assert [name for _, _, name in stats.stats] == ["stage"]
+
+
+def count_facts(program, n):
+    with instrumentation.timer("task"):
+        instrumentation.count("facts", len(program.facts) * n)
+    return n
+
+
+def test_merge_worker_stats(instrumented):
+    program = parse('.decl edge(x: symbol, y: symbol)\nedge("a", "b").\n')
+
+    with WorkerPool(max_workers=2) as pool:
+        results = [pool.submit(count_facts, program, n).result() for n in range(4)]
+
+    assert results == list(range(4))
+    stats = instrumentation.snapshot()
+    assert stats["counters"] == {"facts": 6}
+    assert stats["timers"]["task"]["calls"] == 4
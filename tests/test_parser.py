@@ -1,6 +1,12 @@
 from symlog.souffle import Rule, Literal, Variable
-from symlog.souffle import parse
-
+from symlog.souffle import parse, pprint, pprint_to, program_digest
+from symlog.parse_cache import ParseCache
+import symlog.souffle as souffle
+import symlog.parse_cache as parse_cache
+
+import hashlib
+import io
+import os
 import pytest
 from lark.exceptions import UnexpectedInput
 
@@ -84,5 +90,106 @@ def test_program_with_parse_error():
         parse(program_str)
 
 
+def test_pprint_round_trip():
+    program_str = (
+        ".decl edge(v0:number, v1:symbol)\n"
+        ".input edge\n"
+        ".output path\n"
+        "path(x, y) :- edge(x, y).\n"
+        'edge(1, "a").\n'
+    )
+
+    ast = parse(program_str)
+    stream = io.StringIO()
+    pprint_to(ast, stream)
+
+    assert pprint(ast) == program_str
+    assert stream.getvalue() == program_str
+    assert program_digest(ast) == hashlib.sha256(program_str.encode()).hexdigest()
+
+
+def test_program_digest_ignores_order():
+    program = parse(PROGRAM_STR)
+    reordered = program._replace(
+        rules=program.rules[::-1], facts=program.facts[::-1]
+    )
+
+    assert program_digest(reordered) == program_digest(program)
+    assert program_digest(program._replace(outputs=["edge"])) != program_digest(program)
+
+
+PROGRAM_STR = """
+    .decl edge(x: symbol, y: symbol)
+    .input edge
+    .output path
+
+    path(x, y) :- edge(x, y).
+    path(x, z) :- path(x, y), edge(y, z), edge(z, "a").
+    edge("b", "a").
+"""
+
+
+def test_lalr_and_earley_agree():
+    assert parse(PROGRAM_STR, "lalr") == parse(PROGRAM_STR, "earley")
+
+
+def test_parse_cache(tmp_path, monkeypatch):
+    cache = ParseCache(tmp_path / "parsed")
+    program_path = str(tmp_path / "program.dl")
+
+    assert cache.parse(program_path, PROGRAM_STR) == parse(PROGRAM_STR)
+
+    def fail(*args):
+        raise AssertionError("the cached program was parsed again")
+
+    monkeypatch.setattr(parse_cache, "parse", fail)
+    assert cache.parse(program_path, PROGRAM_STR) == parse(PROGRAM_STR)
+
+    # a different content or path is a different entry
+    with pytest.raises(AssertionError):
+        cache.parse(program_path, PROGRAM_STR + "\n.output edge\n")
+    with pytest.raises(AssertionError):
+        cache.parse(str(tmp_path / "other.dl"), PROGRAM_STR)
+
+
+def test_parse_cache_ignores_corrupted_entries(tmp_path):
+    cache = ParseCache(tmp_path)
+    program_path = str(tmp_path / "program.dl")
+    key = cache.key_for(program_path, PROGRAM_STR, "lalr")
+
+    cache.parse(program_path, PROGRAM_STR)
+    (tmp_path / f"{key}.pickle").write_bytes(b"not a pickle")
+
+    assert cache.get(key) is None
+    assert cache.parse(program_path, PROGRAM_STR) == parse(PROGRAM_STR)
+    assert cache.get(key) == parse(PROGRAM_STR)
+
+
+def test_parse_cache_evicts_least_recently_used(tmp_path):
+    cache = ParseCache(tmp_path)
+    paths = [str(tmp_path / f"program_{i}.dl") for i in range(3)]
+    keys = [cache.key_for(path, PROGRAM_STR, "lalr") for path in paths]
+    for idx in range(2):
+        cache.parse(paths[idx], PROGRAM_STR)
+        os.utime(tmp_path / f"{keys[idx]}.pickle", (idx, idx))
+    # the first entry is used again, hence the second one is evicted
+    assert cache.get(keys[0]) == parse(PROGRAM_STR)
+
+    cache.max_bytes = 2 * (tmp_path / f"{keys[0]}.pickle").stat().st_size
+    cache.parse(paths[2], PROGRAM_STR)
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]) is not None
+
+
+def test_unwritable_grammar_cache(tmp_path, monkeypatch):
+    (tmp_path / "file").touch()
+    monkeypatch.setattr(souffle, "GRAMMAR_CACHE_DIR", str(tmp_path / "file" / "grammar"))
+    monkeypatch.setattr(souffle, "_parsers", {})
+
+    assert parse(PROGRAM_STR) == souffle.parse(PROGRAM_STR, parser="earley")
+
+
 if __name__ == "__main__":
     test_program_with_parse_error()
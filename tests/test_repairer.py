@@ -0,0 +1,34 @@
+import symlog.repairer as repairer
+
+from z3 import Bool, is_true
+
+
+class FakeCondition:
+    def __init__(self, expr):
+        self.expr = expr
+
+    def to_z3(self):
+        return self.expr
+
+
+def test_repair(monkeypatch):
+    a, b = Bool("a"), Bool("b")
+    yielded = []
+
+    def symex_iter(rules, facts, interested_output_facts):
+        for expr in (b, a, b):
+            yielded.append(expr)
+            yield None, FakeCondition(expr)
+
+    monkeypatch.setattr(repairer, "symex", lambda *args: {None: FakeCondition(a)})
+    monkeypatch.setattr(repairer, "symex_iter", symex_iter)
+
+    # the second condition of an unwanted fact conflicts with the wanted one
+    assert repairer.repair([], [], set(), set()) is None
+    assert yielded == [b, a]
+
+    monkeypatch.setattr(repairer, "symex", lambda *args: {})
+    yielded.clear()
+    model = repairer.repair([], [], set(), set())
+    assert yielded == [b, a, b]
+    assert not is_true(model.eval(a, model_completion=True))
@@ -0,0 +1,146 @@
+from symlog.result_store import ResultStore, get_result_store, set_result_store
+from symlog.shortcuts import Fact, Rule, Literal, Variable, SymbolicSign
+from symlog.symbolic_executor import SymbolicExecutor
+import symlog.common as common
+
+import os
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+RULES = frozenset(
+    [
+        Rule(
+            Literal("reachable", [Variable("X"), Variable("Y")]),
+            [Literal("edge", [Variable("X"), Variable("Y")])],
+        )
+    ]
+)
+FACTS = frozenset([SymbolicSign(Fact("edge", ["a", "b"])), Fact("edge", ["b", "c"])])
+INTERESTED = frozenset([Fact("reachable", ["a", "b"])])
+
+
+def test_put_then_get(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite")
+    key = store.key_for(RULES, FACTS, INTERESTED)
+
+    assert store.get(key) is None
+    store.put(key, {"facts": FACTS})
+
+    assert store.get(key) == {"facts": FACTS}
+    assert (store.stats.hits, store.stats.misses) == (1, 1)
+
+
+def test_key_is_stable_across_processes(tmp_path):
+    key = ResultStore(tmp_path / "results.sqlite").key_for(RULES, FACTS, INTERESTED)
+
+    # hash randomization differs between interpreters
+    other_key = subprocess.run(
+        [sys.executable, "-c", f"import {__name__} as t; print(t.make_key())"],
+        cwd=os.path.dirname(__file__),
+        env={
+            **os.environ,
+            "PYTHONHASHSEED": "random",
+            "PYTHONPATH": os.pathsep.join(sys.path),
+        },
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+
+    assert key == other_key
+    assert key != ResultStore(tmp_path / "results.sqlite").key_for(
+        RULES, FACTS, frozenset([Fact("reachable", ["b", "c"])])
+    )
+
+
+def make_key():
+    return ResultStore(":memory:").key_for(RULES, FACTS, INTERESTED)
+
+
+def test_evict_least_recently_used(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite", max_entries=2)
+
+    store.put("a", 1)
+    store.put("b", 2)
+    store.get("a")
+    store.put("c", 3)
+
+    assert (store.get("a"), store.get("b"), store.get("c")) == (1, None, 3)
+    assert len(store) == 2
+    assert store.stats.evictions == 1
+
+
+def test_evict_by_size(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite", max_bytes=300)
+
+    for key in "abc":
+        store.put(key, key * 100)
+
+    assert len(store) == 2
+    assert store.get("a") is None
+
+
+def test_corrupted_entry_is_a_miss(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite")
+    store._connection().execute(
+        "INSERT INTO results VALUES (?, ?, ?, ?)", ("a", b"garbage", 7, 0.0)
+    )
+
+    assert store.get("a") is None
+    assert len(store) == 0
+
+
+def put_many(path, worker):
+    store = ResultStore(path)
+    for i in range(20):
+        store.put(f"{worker}_{i}", i)
+    return [store.get(f"{worker}_{i}") for i in range(20)]
+
+
+def test_concurrent_writers(tmp_path):
+    path = tmp_path / "results.sqlite"
+
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(put_many, [path] * 4, range(4)))
+
+    assert results == [list(range(20))] * 4
+    assert len(ResultStore(path)) == 80
+
+
+def test_symex_reads_the_result_store(result_store, monkeypatch):
+    computed = []
+
+    def compute_symex(*args):
+        computed.append(args)
+        return "result"
+
+    monkeypatch.setattr(SymbolicExecutor, "_compute_symex", compute_symex)
+    SymbolicExecutor._cached_symex.cache_clear()
+    assert SymbolicExecutor._cached_symex(RULES, FACTS, INTERESTED) == "result"
+
+    # a new process only has the result store
+    SymbolicExecutor._cached_symex.cache_clear()
+    assert SymbolicExecutor._cached_symex(RULES, FACTS, INTERESTED) == "result"
+    assert len(computed) == 1
+
+    monkeypatch.setattr(common, "RESULT_STORE", False)
+    SymbolicExecutor._cached_symex.cache_clear()
+    SymbolicExecutor._cached_symex(RULES, FACTS, INTERESTED)
+    assert len(computed) == 2
+
+
+def test_an_unwritable_result_store_is_disabled(tmp_path, monkeypatch):
+    computed = []
+
+    def compute_symex(*args):
+        computed.append(args)
+        return "result"
+
+    monkeypatch.setattr(SymbolicExecutor, "_compute_symex", compute_symex)
+    (tmp_path / "file").touch()
+    set_result_store(ResultStore(tmp_path / "file" / "results.sqlite"))
+    SymbolicExecutor._cached_symex.cache_clear()
+
+    assert SymbolicExecutor._cached_symex(RULES, FACTS, INTERESTED) == "result"
+    assert get_result_store() is None
@@ -0,0 +1,188 @@
+from symlog.souffle import (
+    parse,
+    stable_digest,
+    Rule,
+    Literal,
+    Fact,
+    Variable,
+    String,
+    Number,
+    set_interning,
+    clear_intern_pools,
+    intern_pool_sizes,
+    transform,
+    collect,
+    iter_collect,
+    walk,
+)
+import symlog.souffle as souffle
+
+import copy
+import pickle
+import pytest
+import subprocess
+import sys
+
+
+def make_fact(*args):
+    return Fact(Literal("edge", [String(a) for a in args], True), [], False)
+
+
+def make_tuple_fact(*args):
+    return Fact(Literal("edge", tuple(String(a) for a in args), True), (), False)
+
+
+def test_hash_is_structural_and_cached():
+    fact = make_fact("a", "b")
+
+    assert hash(fact) == hash(make_fact("a", "b"))
+    assert fact.__dict__["_hash"] == hash(fact)
+    assert len({fact, make_fact("a", "b"), make_fact("b", "a")}) == 2
+
+
+def test_program_hash_is_not_cached():
+    program = parse(".decl edge(x: symbol, y: symbol)")
+    old_hash = hash(program)
+
+    program.facts.append(make_fact("a", "b"))
+
+    assert "_hash" not in program.__dict__
+    assert hash(program) != old_hash
+
+
+def test_copies_drop_cached_values():
+    fact = make_fact("a", "b")
+    payload = pickle.dumps(fact)
+    hash(fact)
+    str(fact)
+
+    assert pickle.dumps(fact) == payload
+    for fact_copy in (copy.deepcopy(fact), pickle.loads(pickle.dumps(fact))):
+        assert fact_copy == fact
+        assert hash(fact_copy) == hash(fact)
+
+
+@pytest.fixture
+def no_interning():
+    set_interning(False)
+    yield
+    set_interning(True)
+
+
+def test_interning():
+    fact = make_tuple_fact("a", "b")
+
+    assert make_tuple_fact("a", "b") is fact
+    assert Number(1) is Number(1)
+    assert pickle.loads(pickle.dumps(fact)) is fact
+    assert Literal("edge", [Variable("a")], True) is not fact.head
+    # literals of mutable arguments are not interned
+    args = [String("a")]
+    assert Literal("edge", args, True) is not Literal("edge", args, True)
+    # equal values of different types are different terms
+    assert Number(1) is not Number(1.0)
+    assert Number(1) is not Number(True)
+
+    clear_intern_pools()
+    assert make_tuple_fact("a", "b") is not fact
+    assert make_tuple_fact("a", "b") == fact
+
+
+def test_interning_drops_least_recently_used(monkeypatch):
+    monkeypatch.setattr(souffle, "INTERN_POOL_MAX_SIZE", 2)
+    clear_intern_pools()
+    a, b = Number(1), Number(2)
+    assert Number(1) is a
+
+    Number(3)
+    assert Number(1) is a
+    assert Number(2) is not b
+    assert intern_pool_sizes()["Number"] == 2
+
+
+def test_without_interning(no_interning):
+    fact = make_fact("a", "b")
+
+    assert make_fact("a", "b") is not fact
+    assert make_fact("a", "b") == fact
+    assert fact.__dict__ == {}
+
+
+@pytest.mark.parametrize("interning", [True, False])
+def test_interning_keeps_equality(interning):
+    set_interning(interning)
+    try:
+        args = [Variable("x")]
+        literals = [
+            Literal("e", tuple(args), True),
+            Literal("e", args, True),
+            Literal("e", list(args), True),
+        ]
+        facts = [Fact(literals[0], (), False), Fact(literals[0], [], False)]
+
+        assert literals[0] != literals[1]
+        assert literals[1] == literals[2]
+        assert type(literals[1].args) is list
+        assert facts[0] != facts[1]
+    finally:
+        set_interning(True)
+
+
+def test_stable_digest():
+    rule = Rule(
+        Literal("path", [Variable("x"), Number(1)], True),
+        [Literal("edge", [Variable("x"), Number(1)], True)],
+    )
+
+    assert stable_digest(frozenset([make_fact("a", "b"), make_fact("c", "d")])) == (
+        stable_digest(frozenset([make_fact("c", "d"), make_fact("a", "b")]))
+    )
+    assert stable_digest(make_fact("a", "b")) != stable_digest(make_fact("b", "a"))
+    # variables and strings with the same name differ
+    assert stable_digest(Variable("x")) != stable_digest(String("x"))
+
+    # the digest does not depend on the process, e.g. on its string hashes
+    script = (
+        "from symlog.souffle import *;"
+        "print(stable_digest(Rule(Literal('path', [Variable('x'), Number(1)], True),"
+        " [Literal('edge', [Variable('x'), Number(1)], True)])))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", script], capture_output=True, text=True, check=True
+    )
+    assert output.stdout.strip() == stable_digest(rule)
+
+
+def test_transform_shares_unchanged_nodes():
+    program = parse(
+        """
+        .decl edge(x: symbol, y: symbol)
+        path(x, y) :- edge(x, y).
+        edge("a", "b").
+        edge("c", "d").
+        """
+    )
+
+    same = transform(program, lambda x: x)
+    assert same == program and same is not program
+    for node, original in zip(same.rules + same.facts, program.rules + program.facts):
+        assert node is original
+
+    renamed = transform(program, lambda x: String("e") if x == String("c") else x)
+    assert renamed.facts[0] is program.facts[0]
+    assert renamed.facts[1] == make_fact("e", "d")
+    assert renamed.rules[0] is program.rules[0]
+
+
+def test_traversal_order():
+    fact = make_fact("a", "b")
+    expected = [String("a"), String("b"), fact.head, fact]
+
+    assert collect(fact, lambda x: True) == expected
+    visited = []
+    walk(fact, visited.append)
+    assert visited == expected
+
+    literals = iter_collect(fact, lambda x: isinstance(x, Literal))
+    assert next(literals) is fact.head
+    assert list(literals) == []
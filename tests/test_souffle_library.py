@@ -0,0 +1,73 @@
+from symlog.souffle import parse, Fact, Literal, String
+
+from collections import OrderedDict
+import shutil
+import pytest
+
+
+@pytest.mark.skipif(shutil.which("souffle") is None, reason="souffle is not installed")
+def test_run_in_process(tmp_path):
+    from symlog.binary_cache import BinaryCache, set_binary_cache
+    from symlog.souffle_library import run_in_process
+
+    set_binary_cache(BinaryCache(tmp_path))
+    try:
+        program = parse(
+            """
+            .decl edge(x: symbol, y: symbol)
+            .decl reachable(x: symbol, y: symbol)
+            .input edge
+            .output reachable
+            reachable(x, y) :- edge(x, y).
+            reachable(x, z) :- edge(x, y), reachable(y, z).
+            """
+        )
+
+        def edge(x, y):
+            return Fact(Literal("edge", [String(x), String(y)], True), [], False)
+
+        def reachable(x, y):
+            return Fact(Literal("reachable", [String(x), String(y)], True), [], False)
+
+        assert run_in_process(program, [edge("a", "b"), edge("b", "c")]) == {
+            reachable("a", "b"),
+            reachable("b", "c"),
+            reachable("a", "c"),
+        }
+        # the loaded program is reused without leaking the previous facts
+        assert run_in_process(program, [edge("c", "d")]) == {reachable("c", "d")}
+    finally:
+        set_binary_cache(None)
+
+
+def test_library_names_and_cache(monkeypatch):
+    import symlog.common as common
+    import symlog.souffle_library as souffle_library
+    from symlog.souffle import program_digest
+
+    class FakeLibrary:
+        def __init__(self, program):
+            self.program = program
+
+    monkeypatch.setattr(souffle_library, "SouffleLibrary", FakeLibrary)
+    monkeypatch.setattr(souffle_library, "_loaded_libraries", OrderedDict())
+    monkeypatch.setattr(common, "LOADED_LIBRARY_MAX_NUM", 2)
+    programs = [parse(f".decl r{i}(x: symbol)\n.output r{i}") for i in range(3)]
+
+    # libraries loaded in the same process register different names
+    names = {
+        souffle_library.embedded_program_name(program_digest(program))
+        for program in programs
+    }
+    assert len(names) == 3
+    assert all(name.isidentifier() for name in names)
+
+    library = souffle_library.load_library(programs[0])
+    assert souffle_library.load_library(programs[0]) is library
+    souffle_library.load_library(programs[1])
+    # the least recently used library is evicted
+    souffle_library.load_library(programs[0])
+    souffle_library.load_library(programs[2])
+    assert souffle_library.is_loaded(programs[0])
+    assert not souffle_library.is_loaded(programs[1])
+    assert souffle_library.is_loaded(programs[2])
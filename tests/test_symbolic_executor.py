@@ -1,4 +1,24 @@
 from symlog.souffle import NUM, SYM
+import symlog.souffle as souffle
+from symlog.symbolic_executor import (
+    SymbolicExecutor,
+    symex_result,
+    symex_incremental,
+    symex_iter,
+    Condition,
+    OutputCondition,
+    SymbolValueAssignment,
+    remove_subsumed,
+    normalise_dependencies,
+    normalise_output_condition,
+)
+from symlog.evaluator import Evaluator, evaluate_program
+from symlog.program_builder import ProgramBuilder
+from symlog.backends import get_backend
+from symlog.worker_pool import WorkerPool
+from symlog.transformer import demanded_relations, transform_program
+import symlog.common as common
+import symlog.symbolic_executor as symbolic_executor
 from symlog.shortcuts import (
     Rule,
     Fact,
@@ -14,6 +34,12 @@ from symlog.shortcuts import (
 )
 
 from z3 import And, Bool, Const, StringSort, BoolVal, simplify
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import combinations
+import pickle
+import pytest
+import shutil
+import time
 
 
 def test_symex_with_sym_sign():
@@ -207,3 +233,518 @@ def test_symex_with_number_types():
     }
 
     assert updated_constraints == answer
+
+
+def test_symex_evaluates_meta_program_once(monkeypatch):
+    rule = Rule(
+        Literal("t", [Variable("X"), Variable("Z")], True),
+        [
+            Literal("r", [Variable("X"), Variable("Y")], True),
+            Literal("s", [Variable("Y"), Variable("Z")], True),
+        ],
+    )
+    facts = [
+        SymbolicSign(Fact("r", [String("a"), String("b")])),
+        Fact("s", [String("b"), String("c")]),
+    ]
+    interested_output_facts = {
+        Fact("t", [String("a"), String("c")]),
+        Fact("t", [String("a"), String("d")]),
+        Fact("r", [String("a"), String("b")]),
+    }
+
+    evaluated_outputs = []
+
+    def transform_exec_meta_program(program, interested_output_facts=None):
+        evaluated_outputs.append(program.outputs)
+        return []
+
+    monkeypatch.setattr(
+        SymbolicExecutor, "_transform_exec_meta_program", transform_exec_meta_program
+    )
+    SymbolicExecutor._cached_symex.cache_clear()
+
+    assert symex([rule], facts, interested_output_facts) == {}
+    assert evaluated_outputs == [["r", "t"]]
+
+
+class InlineExecutor:
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+
+@pytest.fixture
+def python_symex(monkeypatch):
+    """Runs symex in this process with the native evaluator and brute-force provenance."""
+    computed_targets = []
+
+    def compute_target_dependencies(program, symbol_value_assigns, target_outputs):
+        facts, _ = SymbolicExecutor._concretise_facts(
+            program.facts, dict(symbol_value_assigns)
+        )
+        facts = sorted(facts, key=str)
+        bare_program = ProgramBuilder.update_program(program, facts=[])
+
+        dependencies = {}
+        for target_output in target_outputs:
+            computed_targets.append(target_output)
+            minimal = []
+            for size in range(len(facts) + 1):
+                for subset in combinations(facts, size):
+                    if any(set(m) <= set(subset) for m in minimal):
+                        continue
+                    if target_output in evaluate_program(bare_program, subset):
+                        minimal.append(list(subset))
+            dependencies[target_output] = minimal
+        return dependencies
+
+    monkeypatch.setattr(common, "EXECUTION_MODE", "native")
+    monkeypatch.setattr(
+        symbolic_executor, "get_worker_pool", lambda program=None: InlineExecutor()
+    )
+    monkeypatch.setattr(
+        SymbolicExecutor,
+        "_compute_target_dependencies",
+        staticmethod(compute_target_dependencies),
+    )
+    SymbolicExecutor._cached_symex.cache_clear()
+    yield computed_targets
+    SymbolicExecutor._cached_symex.cache_clear()
+
+
+def normalise(condition):
+    if hasattr(condition, "sub_conditions"):
+        return frozenset(map(normalise, condition.sub_conditions))
+    return (
+        frozenset(condition.symbol_value_assigns),
+        frozenset(map(frozenset, condition.dependent_facts_list)),
+    )
+
+
+def test_symex_incremental(python_symex):
+    rules = [
+        Rule(
+            Literal("t", [Variable("X"), Variable("Z")], True),
+            [
+                Literal("r", [Variable("X"), Variable("Y")], True),
+                Literal("s", [Variable("Y"), Variable("Z")], True),
+            ],
+        ),
+        Rule(
+            Literal("u", [Variable("X")], True),
+            [Literal("q", [Variable("X")], True)],
+        ),
+    ]
+    facts = [
+        Fact("r", [SymbolicConstant("alpha", type=SYM), String("b")]),
+        SymbolicSign(Fact("r", [String("a"), String("b")])),
+        Fact("s", [String("b"), String("c")]),
+        SymbolicSign(Fact("s", [String("b"), String("d")])),
+        Fact("q", [String("a")]),
+    ]
+    interested_output_facts = {
+        Fact("t", [String("a"), String("c")]),
+        Fact("t", [String("a"), String("d")]),
+        Fact("u", [String("a")]),
+    }
+    previous = symex_result(rules, facts, interested_output_facts)
+
+    deltas = [
+        ([], [Fact("s", [String("b"), String("c")])]),
+        ([Fact("q", [String("b")])], [SymbolicSign(Fact("s", [String("b"), String("d")]))]),
+        ([Fact("s", [String("b"), String("a")])], [Fact("q", [String("a")])]),
+    ]
+    # removals reuse all dependencies; additions recompute the targets of
+    # dependent relations under every assignment
+    expected_computed_nums = [0, 2, 6]
+
+    for (added, removed), expected_computed_num in zip(deltas, expected_computed_nums):
+        python_symex.clear()
+        result = symex_incremental(previous, added, removed)
+        assert len(python_symex) == expected_computed_num
+
+        SymbolicExecutor._cached_symex.cache_clear()
+        expected = symex_result(
+            rules, (set(facts) - set(removed)) | set(added), interested_output_facts
+        )
+        assert {fact: normalise(c) for fact, c in result.constraints.items()} == {
+            fact: normalise(c) for fact, c in expected.constraints.items()
+        }
+
+
+def test_symex_iter(python_symex, monkeypatch):
+    rules = [
+        Rule(
+            Literal("t", [Variable("X"), Variable("Z")], True),
+            [
+                Literal("r", [Variable("X"), Variable("Y")], True),
+                Literal("s", [Variable("Y"), Variable("Z")], True),
+            ],
+        )
+    ]
+    facts = [
+        Fact("r", [SymbolicConstant("alpha", type=SYM), String("b")]),
+        SymbolicSign(Fact("s", [String("b"), String("c")])),
+        Fact("s", [String("b"), String("d")]),
+        Fact("r", [String("e"), String("b")]),
+        Fact("r", [String("f"), String("b")]),
+    ]
+    interested_output_facts = {
+        Fact("t", [String("a"), String("c")]),
+        Fact("t", [String("e"), String("d")]),
+    }
+
+    monkeypatch.setattr(common, "RESULT_STORE", False)
+    constraints = symex(rules, facts, interested_output_facts)
+    python_symex.clear()
+
+    # every task waits, so that the pending ones are cancelled on stop
+    executor = ThreadPoolExecutor(max_workers=1)
+    compute = SymbolicExecutor._compute_target_dependencies
+
+    def compute_target_dependencies(*args):
+        time.sleep(0.1)
+        return compute(*args)
+
+    monkeypatch.setattr(
+        symbolic_executor, "get_worker_pool", lambda program=None: executor
+    )
+    monkeypatch.setattr(
+        SymbolicExecutor,
+        "_compute_target_dependencies",
+        staticmethod(compute_target_dependencies),
+    )
+
+    pairs = list(symex_iter(rules, facts, interested_output_facts))
+    task_num = len(python_symex)
+    # the stream may yield a condition before one it implies
+    assert {
+        fact: frozenset(
+            map(normalise, remove_subsumed(c for f, c in pairs if f == fact))
+        )
+        for fact, _ in pairs
+    } == {
+        fact: frozenset(
+            normalise(condition)
+            for assignment_condition in output_condition.sub_conditions
+            for condition in assignment_condition.sub_conditions
+        )
+        for fact, output_condition in constraints.items()
+    }
+
+    python_symex.clear()
+    stopped = list(
+        symex_iter(rules, facts, interested_output_facts, stop=lambda *_: True)
+    )
+    executor.shutdown(wait=True)
+
+    assert len(stopped) == 1
+    assert len(python_symex) < task_num
+
+
+def test_condition_builds_z3_once(monkeypatch):
+    alpha = SymbolicConstant("alpha", type=SYM)
+    fact = SymbolicSign(Fact("r", [String("a"), String("b")]))
+
+    def make_condition():
+        return OutputCondition(
+            [
+                OutputCondition(
+                    [Condition({SymbolValueAssignment(alpha, String("a"))}, [[fact]])]
+                )
+            ]
+        )
+
+    def fail(*_):
+        assert False, "z3 is not needed"
+
+    # hashing and comparing do not involve z3
+    monkeypatch.setattr(symbolic_executor, "simplify", fail)
+    condition = make_condition()
+    assert condition == make_condition()
+    assert len({condition, make_condition()}) == 1
+    monkeypatch.undo()
+
+    simplified = []
+
+    def counting_simplify(formula):
+        simplified.append(formula)
+        return simplify(formula)
+
+    monkeypatch.setattr(symbolic_executor, "simplify", counting_simplify)
+    assert condition.to_z3() is condition.to_z3()
+    str(condition), repr(condition)
+    assert len(simplified) == 3
+
+    copied = pickle.loads(pickle.dumps(condition))
+    assert copied == condition and "_z3" not in copied.__dict__
+    assert str(copied) == str(condition)
+
+
+def test_remove_redundant_conditions():
+    alpha = SymbolicConstant("alpha", type=SYM)
+    beta = SymbolicConstant("beta", type=SYM)
+    a, b, c = (SymbolicSign(Fact("r", [String(x), String("x")])) for x in "abc")
+    alpha_a = SymbolValueAssignment(alpha, String("a"))
+    beta_b = SymbolValueAssignment(beta, String("b"))
+
+    assert normalise_dependencies([[a, b], [a, a], [b, a, c], [a]]) == [[a]]
+    assert normalise_dependencies([[a, b], [], [c]]) == []
+
+    weak = Condition({alpha_a}, [[a], [b]])
+    conditions = [
+        Condition({alpha_a, beta_b}, [[a]]),
+        weak,
+        Condition({alpha_a}, [[b, c]]),
+        Condition({alpha_a}, [[a], [b]]),
+        Condition({beta_b}, [[c]]),
+        Condition({beta_b}, []),
+    ]
+    assert remove_subsumed(conditions) == [weak, Condition({beta_b}, [])]
+
+    normalised = normalise_output_condition(
+        [OutputCondition(conditions[:2]), OutputCondition(conditions[2:4])]
+    )
+    assert normalised == OutputCondition([OutputCondition([weak])])
+
+
+def _join_program(fact_num, facts=()):
+    """Returns the rules, the facts and the interested facts of a join.
+
+    t(X, Z) :- r(X, Y), s(Y, Z) joins the given facts and fact_num tuples of r
+    with fact_num symbolic tuples of s, where a symbolic constant stands for X.
+    """
+    rules = [
+        Rule(
+            Literal("t", [Variable("X"), Variable("Z")], True),
+            [
+                Literal("r", [Variable("X"), Variable("Y")], True),
+                Literal("s", [Variable("Y"), Variable("Z")], True),
+            ],
+        )
+    ]
+    facts = [Fact("r", [SymbolicConstant("alpha", type=SYM), String("b")])] + list(facts)
+    facts += [Fact("r", [String(f"e{i}"), String("b")]) for i in range(fact_num)]
+    facts += [
+        SymbolicSign(Fact("s", [String("b"), String(f"c{i}")]))
+        for i in range(fact_num)
+    ]
+    interested_output_facts = frozenset(
+        {
+            Fact("t", [String("e1"), String("c1")]),
+            Fact("t", [String("a"), String("c2")]),
+        }
+    )
+    return rules, facts, interested_output_facts
+
+
+def test_meta_output_filter(monkeypatch):
+    rules, facts, interested_output_facts = _join_program(10)
+
+    meta_output_nums = []
+    transform_exec_meta_program = SymbolicExecutor._transform_exec_meta_program
+
+    def counting_transform_exec_meta_program(*args):
+        output_facts = transform_exec_meta_program(*args)
+        meta_output_nums.append(len(output_facts))
+        return output_facts
+
+    monkeypatch.setattr(common, "EXECUTION_MODE", common.NATIVE_MODE)
+    monkeypatch.setattr(
+        SymbolicExecutor,
+        "_transform_exec_meta_program",
+        staticmethod(counting_transform_exec_meta_program),
+    )
+
+    def prepare():
+        _, targets_to_compute = SymbolicExecutor._prepare_symex(
+            frozenset(rules), frozenset(facts), interested_output_facts
+        )
+        return {
+            assignments: targets
+            for assignments, targets in targets_to_compute.items()
+            if targets
+        }
+
+    targets_to_compute = prepare()
+    monkeypatch.setattr(common, "META_OUTPUT_FILTER", False)
+    unfiltered_targets_to_compute = prepare()
+
+    assert targets_to_compute == unfiltered_targets_to_compute
+    targets = set().union(*targets_to_compute.values())
+    assert Fact("t", [String("e1"), String("c1")]) in targets
+    assert {fact.head.args[1] for fact in targets} == {String("c1"), String("c2")}
+    # the filtered meta-program outputs the matching tuples only
+    assert meta_output_nums[0] * 10 <= meta_output_nums[1]
+
+
+def test_meta_magic_sets(monkeypatch):
+    X, Y, Z = Variable("X"), Variable("Y"), Variable("Z")
+    rules = [
+        Rule(Literal("path", [X, Y], True), [Literal("edge", [X, Y], True)]),
+        Rule(
+            Literal("path", [X, Z], True),
+            [Literal("edge", [X, Y], True), Literal("path", [Y, Z], True)],
+        ),
+    ]
+    # two chains, of which only the first one is demanded
+    facts = [Fact("edge", [SymbolicConstant("alpha", type=SYM), String("a1")])]
+    for chain in "ab":
+        facts += [
+            Fact("edge", [String(f"{chain}{i}"), String(f"{chain}{i + 1}")])
+            for i in range(10)
+        ]
+    interested_output_facts = frozenset(
+        {
+            Fact("path", [String("a0"), String("a10")]),
+            Fact("path", [String("b9"), String("a5")]),
+        }
+    )
+    program = ProgramBuilder.infer_whole_program(
+        frozenset(rules), frozenset(facts), outputs=["path"]
+    )
+
+    derived_nums = []
+    evaluate = symbolic_executor.execute
+
+    def counting_execute(program, facts):
+        relations = Evaluator(program).evaluate(facts)
+        derived_nums.append(sum(map(len, relations.values())))
+        return evaluate(program, facts)
+
+    monkeypatch.setattr(common, "EXECUTION_MODE", common.NATIVE_MODE)
+    monkeypatch.setattr(symbolic_executor, "execute", counting_execute)
+
+    monkeypatch.setattr(common, "META_MAGIC_SETS", True)
+    output_facts = SymbolicExecutor._transform_exec_meta_program(
+        program, interested_output_facts
+    )
+    monkeypatch.setattr(common, "META_MAGIC_SETS", False)
+    unrewritten_output_facts = SymbolicExecutor._transform_exec_meta_program(
+        program, interested_output_facts
+    )
+
+    assert output_facts == unrewritten_output_facts
+    assert Fact("path", [String("a0"), String("a10"), String("a0")]) in output_facts
+    # the chain b is not derived
+    assert derived_nums[0] < derived_nums[1]
+
+
+def test_meta_magic_sets_with_negation():
+    X, Y = Variable("X"), Variable("Y")
+    rules = [
+        Rule(
+            Literal("p", [X], True),
+            [
+                Literal("r", [X], True),
+                Literal("q", [X], False),
+                Literal("s", [X, Y], True),
+                Literal("p", [Y], True),
+            ],
+        ),
+        Rule(Literal("p", [X], True), [Literal("u", [X], True)]),
+        Rule(Literal("q", [X], True), [Literal("v", [X], True)]),
+    ]
+    facts = [
+        Fact("r", [SymbolicConstant("alpha", type=SYM)]),
+        Fact("s", [String("a"), String("b")]),
+        Fact("u", [String("b")]),
+        Fact("v", [String("c")]),
+    ]
+    program = ProgramBuilder.infer_whole_program(
+        frozenset(rules), frozenset(facts), outputs=["p"]
+    )
+
+    # the negated relation is evaluated in full
+    assert demanded_relations(program) == {"p"}
+
+    # the native evaluator rejects negation, hence only the rules are checked
+    transformed = transform_program(
+        program, is_store=False, filter_outputs=True, magic_sets=True
+    )
+    # the types of the AST, not the builders of symlog.shortcuts
+    literal_type, variable_type = souffle.Literal, souffle.Variable
+    magic_rules = [
+        rule
+        for rule in transformed.rules
+        if rule.head.name.startswith(common.MAGIC_PREDICATE_PREFIX)
+    ]
+    assert magic_rules
+    for rule in magic_rules:
+        assert all(l.positive for l in rule.body if isinstance(l, literal_type))
+    for rule in transformed.rules:
+        positive_vars = {
+            arg
+            for l in rule.body
+            if isinstance(l, literal_type) and l.positive
+            for arg in l.args
+            if isinstance(arg, variable_type)
+        }
+        for l in rule.body:
+            if isinstance(l, literal_type) and not l.positive:
+                assert l.name == "q"
+                negated_vars = {a for a in l.args if isinstance(a, variable_type)}
+                assert negated_vars <= positive_vars
+
+
+@pytest.mark.skipif(shutil.which("souffle") is None, reason="souffle is not installed")
+def test_meta_spill(monkeypatch, tmp_path):
+    rules, facts, interested_output_facts = _join_program(
+        5, [Fact("r", [String("a"), SymbolicConstant("beta", type=SYM)])]
+    )
+
+    def prepare():
+        return SymbolicExecutor._prepare_symex(
+            frozenset(rules), frozenset(facts), interested_output_facts
+        )[1]
+
+    monkeypatch.setattr(common, "EXECUTION_MODE", common.NATIVE_MODE)
+    targets_to_compute = prepare()
+
+    monkeypatch.setattr(common, "META_SPILL", True)
+    monkeypatch.setattr(common, "META_SPILL_PARTITIONS", 4)
+    monkeypatch.setattr(common, "META_SPILL_DIR", str(tmp_path))
+    spilled_targets_to_compute = prepare()
+
+    assert spilled_targets_to_compute == targets_to_compute
+    assert list(spilled_targets_to_compute) == list(targets_to_compute)
+    assert len(targets_to_compute) > 4
+    # the spilled outputs are removed
+    assert not list(tmp_path.iterdir())
+
+
+def test_meta_spill_partitions_are_divided_by_the_workers(monkeypatch, tmp_path):
+    rules, facts, interested_output_facts = _join_program(
+        5, [Fact("r", [String("a"), SymbolicConstant("beta", type=SYM)])]
+    )
+
+    def prepare():
+        return SymbolicExecutor._prepare_symex(
+            frozenset(rules), frozenset(facts), interested_output_facts
+        )[1]
+
+    monkeypatch.setattr(common, "EXECUTION_MODE", common.NATIVE_MODE)
+    targets_to_compute = prepare()
+
+    # the native backend writes the outputs to files, too
+    native = get_backend(common.NATIVE_MODE)
+    monkeypatch.setattr(symbolic_executor, "execute_to", native.run_to)
+    monkeypatch.setattr(common, "META_SPILL", True)
+    monkeypatch.setattr(common, "META_SPILL_PARTITIONS", 4)
+    monkeypatch.setattr(common, "META_SPILL_DIR", str(tmp_path))
+    divided = []
+    submit = WorkerPool.submit
+    monkeypatch.setattr(
+        WorkerPool,
+        "submit",
+        lambda self, fn, *args: divided.append(fn) or submit(self, fn, *args),
+    )
+    spilled_targets_to_compute = prepare()
+
+    assert spilled_targets_to_compute == targets_to_compute
+    assert list(spilled_targets_to_compute) == list(targets_to_compute)
+    assert divided == [SymbolicExecutor._divide_spilled_partition] * len(divided)
+    assert 0 < len(divided) <= 4
+    assert not list(tmp_path.iterdir())
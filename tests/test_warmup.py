@@ -0,0 +1,99 @@
+from symlog.souffle import program_digest, SymbolicString
+from symlog.shortcuts import (
+    SymbolicConstant,
+    SymbolicSign,
+    String,
+    Fact,
+    symex,
+    load_facts,
+    parse,
+    substitute,
+)
+import symlog.symbolic_executor as symbolic_executor
+import symlog.warmup as warmup
+
+import json
+import os
+import pytest
+import shutil
+
+EXAMPLE_DIR = os.path.join(os.path.dirname(__file__), "..", "example")
+
+ENTRY = {
+    "program": "reachability.dl",
+    "facts": ".",
+    "symbols": {"alpha": "symbol"},
+    "substitute": {"a": "alpha"},
+    "symbolic_signs": ["edge"],
+    "outputs": ["reachable"],
+}
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    for name in os.listdir(EXAMPLE_DIR):
+        shutil.copy(os.path.join(EXAMPLE_DIR, name), tmp_path)
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"programs": [ENTRY, {**ENTRY, "outputs": ["edge"]}]}))
+    return path
+
+
+def test_entry_programs_match_symex(manifest, monkeypatch):
+    executed = []
+
+    def execute(program, facts, *args, **kwargs):
+        executed.append(program_digest(program))
+        raise InterruptedError
+
+    monkeypatch.setattr(symbolic_executor, "execute", execute)
+    monkeypatch.setattr(SymbolicString, "_next_free_id", 1)
+
+    rules = parse(str(manifest.parent / "reachability.dl"))
+    facts = load_facts(str(manifest.parent), rules.declarations)
+    alpha = SymbolicConstant("alpha")
+    facts = {SymbolicSign(substitute(fact, {String("a"): alpha})) for fact in facts}
+    with pytest.raises(InterruptedError):
+        symex(rules, facts, {Fact("reachable", [String("a"), String("b")])})
+
+    bare_program, meta_program = warmup.entry_programs(ENTRY, manifest.parent)
+    assert executed == [program_digest(meta_program)]
+    assert bare_program.facts == []
+
+
+def test_entry_programs_keep_symbol_ids(manifest, monkeypatch):
+    monkeypatch.setattr(SymbolicString, "_next_free_id", 1)
+    programs = warmup.entry_programs(ENTRY, manifest.parent)
+
+    monkeypatch.setattr(SymbolicString, "_next_free_id", 7)
+    assert list(map(program_digest, warmup.entry_programs(ENTRY, manifest.parent))) == (
+        list(map(program_digest, programs))
+    )
+    # the numbering of the process is left as it was
+    assert SymbolicString._next_free_id == 7
+
+
+def test_warm_compiles_missing_programs(manifest, monkeypatch):
+    compiled = set()
+    monkeypatch.setattr(
+        warmup, "is_compiled", lambda program, cache: program_digest(program) in compiled
+    )
+    monkeypatch.setattr(
+        warmup,
+        "compile_program",
+        lambda program, cache: compiled.add(program_digest(program)),
+    )
+
+    report = warmup.warm(manifest, jobs=2, cache=object())
+    # a bare program and a meta-program per output
+    assert len(report.compiled) == 4 and not report.cached and not report.failed
+
+    report = warmup.warm(manifest, cache=object())
+    assert len(report.cached) == 4 and not report.compiled
+
+
+def test_invalid_manifest(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps({"programs": [{"outputs": ["reachable"]}]}))
+
+    with pytest.raises(ValueError):
+        warmup.load_manifest(path)
@@ -0,0 +1,52 @@
+from symlog.souffle import parse, stable_digest
+from symlog.worker_pool import WorkerPool
+import symlog.worker_pool as worker_pool
+import symlog.common as common
+
+import os
+
+
+def describe(program, suffix):
+    return os.getpid(), worker_pool._load_count, stable_digest(program), suffix
+
+
+def make_program(fact_num):
+    facts = "".join(f'edge("a", "{i}").\n' for i in range(fact_num))
+    return parse(".decl edge(x: symbol, y: symbol)\n" + facts)
+
+
+def test_workers_load_each_program_once():
+    first, second = make_program(3), make_program(4)
+
+    with WorkerPool(max_workers=2, programs=[first]) as pool:
+        results = [pool.submit(describe, first, i).result() for i in range(10)]
+        results += [pool.submit(describe, second, i).result() for i in range(10)]
+
+    assert [suffix for *_, suffix in results] == list(range(10)) * 2
+    assert {digest for _, _, digest, _ in results[:10]} == {stable_digest(first)}
+    assert {digest for _, _, digest, _ in results[10:]} == {stable_digest(second)}
+
+    # the first program is loaded at startup, the second one on first use
+    pids = {pid for pid, *_ in results}
+    assert len(pids) <= 2
+    assert max(load_count for _, load_count, *_ in results) == 2
+
+
+def test_unused_programs_are_evicted(monkeypatch):
+    monkeypatch.setattr(common, "WORKER_PROGRAM_CACHE_SIZE", 1)
+    programs = [make_program(i) for i in range(3)]
+
+    pool = WorkerPool(max_workers=1)
+    try:
+        # an evicted program is published again
+        for program in programs + programs[:1]:
+            assert pool.submit(describe, program, 0).result()[2] == (
+                stable_digest(program)
+            )
+        # shutting down the executor waits for the callbacks of the tasks
+        pool._executor.shutdown()
+        assert os.listdir(pool._program_dir.name) == [
+            f"{stable_digest(programs[0])}.pickle"
+        ]
+    finally:
+        pool.shutdown()